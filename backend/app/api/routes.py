@@ -1,140 +1,682 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from typing import List
-from app.services.azure_vision import get_image_analysis, extract_rich_vision_context
-
-from app.services.voice_service import transcribe_audio 
+from app.core.config import settings
+from app.core.pipeline import StagePipeline
+from app.core.telemetry import span, start_trace, use_trace, render_prometheus, register_gauges
+from app.core.uploads import spool_upload, spool_uploads, close_all
+from app.services.azure_vision import get_vision_summary, get_vision_stats
+
+from app.services.voice_service import transcribe_audio_async
+from app.services.audio_prep import prepare_audio
+from app.services.voice_stream import VoiceStreamSession
+from app.services.market_spy import get_market_stats
+from app.services.llm_service import get_llm_cache_stats, generate_fused_bundle_async
 from app.services.business_logic import (
-    get_product_info,
-    calculate_smart_price, 
-    generate_advice, 
-    generate_listings,
-    analyze_image_quality,
+    get_product_info_async,
+    extract_keywords_async,
+    price_from_market_async,
+    generate_advice_async,
+    generate_listings_async,
+    fetch_market_stats_async,
+    fused_price_async,
+    fused_advice_async,
+    fused_listings_async,
+    calculate_smart_price_async,
 )
+from app.services.image_quality import submit_quality_batch, best_quality, metrics_as_dict
+from app.services.image_dedup import match_representative
+from app.services.job_queue import job_queue, QueueFull
+from app.services.catalog_batch import catalog_batches, parse_manifest, ManifestError, BatchBusy
+from app.core.registry import registry, lazy_module
+
+np = lazy_module("numpy")
 
 router = APIRouter()
 
 @router.post("/analyze-voice")
 async def analyze_voice_endpoint(file: UploadFile = File(...)):
+    audio = None
     try:
-        # 1. READ AUDIO
-        audio_data = await file.read()
-        
-        # 2. TRANSCRIBE & TRANSLATE (The Magic Step)
-        english_text = transcribe_audio(audio_data)
+        # 1. READ AUDIO (spooled, capped at Whisper's upload limit)
+        audio = await spool_upload(file, settings.AUDIO_MAX_BYTES)
+
+        # 2. SHRINK IT (mono 16 kHz, silence trimmed) unless that doesn't help
+        payload, upload_name, audio_stats = None, "input.wav", None
+        if settings.AUDIO_PREP_ENABLED:
+            with span("audio_prep", upload_bytes=audio.size):
+                payload, upload_name, audio_stats = await asyncio.to_thread(prepare_audio, audio.source, file.filename)
+
+        # 3. TRANSCRIBE & TRANSLATE (The Magic Step)
+        if payload is not None:
+            english_text = await transcribe_audio_async(payload, upload_name)
+        else:
+            with audio.open() as audio_stream:
+                english_text = await transcribe_audio_async(audio_stream, upload_name)
         
         if not english_text:
-            return {"status": "error", "message": "Could not understand audio."}
+            return {"status": "error", "message": "Could not understand audio.", "audio": audio_stats}
 
-        # 3. NOW ACT AS IF THE USER TYPED THIS
+        # 4. NOW ACT AS IF THE USER TYPED THIS
         # We just return the text to the frontend so the user can verify it,
         # OR we can immediately trigger the analysis logic here.
         # For better UX, let's return it so the user sees what was heard.
         return {
             "status": "success",
             "detected_text": english_text, # "I have a red banarasi saree..."
-            "original_language_hint": "Processed via Whisper-Large"
+            "original_language_hint": "Processed via Whisper-Large",
+            "audio": audio_stats,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         return {"status": "error", "message": str(e)}
+    finally:
+        if audio:
+            audio.close()
+
+@router.websocket("/ws/voice")
+async def voice_stream_endpoint(websocket: WebSocket):
+    """
+    Live voice notes: PCM chunks in while the seller talks, English text out as
+    each pause-delimited utterance is transcribed (protocol in voice_stream.py).
+    """
+    await websocket.accept()
+    await websocket.send_json({"type": "ready", "sample_rate": settings.AUDIO_SAMPLE_RATE})
+    session = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                session = session or VoiceStreamSession(websocket.send_json, settings.AUDIO_SAMPLE_RATE)
+                await session.feed(message["bytes"])
+                continue
+
+            control = json.loads(message.get("text") or "{}")
+            if control.get("type") == "start" and session is None:
+                rate = int(control.get("sample_rate") or settings.AUDIO_SAMPLE_RATE)
+                if not 8000 <= rate <= 192000:
+                    raise ValueError(f"Unsupported sample rate {rate}")
+                session = VoiceStreamSession(websocket.send_json, rate)
+            elif control.get("type") == "stop":
+                session = session or VoiceStreamSession(websocket.send_json, settings.AUDIO_SAMPLE_RATE)
+                await session.send(await session.finish())
+                break
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"❌ Voice stream error: {e}")
+        try:
+            await websocket.send_json({"type": "error", "message": str(e)})
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+    finally:
+        # Seller hung up mid-recording: don't keep paying for their segments
+        if session:
+            session.cancel()
+
+@router.get("/market/stats")
+def market_stats_endpoint():
+    """Market cache hit/miss counters (per worker) for TTL tuning."""
+    return {"cache": get_market_stats()}
+
+@router.get("/vision/stats")
+def vision_stats_endpoint():
+    """Vision cache hit rate per tier (memory LRU + SQLite)."""
+    return {"cache": get_vision_stats()}
+
+@router.get("/llm/stats")
+def llm_stats_endpoint():
+    """LLM response cache hit rate (per worker)."""
+    return {"cache": get_llm_cache_stats()}
+
+def _cache_gauges(field):
+    def source():
+        return {
+            "market": get_market_stats().get(field, 0),
+            "vision": get_vision_stats().get(field, 0),
+            "llm": get_llm_cache_stats().get(field, 0),
+        }
+    return source
+
+register_gauges("setu_cache_hit_rate", "Cache hit rate per cache (per worker).", _cache_gauges("hit_rate"), label="cache")
+register_gauges("setu_jobs", "Background job queue counters (per worker).", lambda: job_queue.get_stats(), label="field")
+register_gauges("setu_catalog", "Catalog batch counters (per worker).", lambda: catalog_batches.get_stats(), label="field")
+register_gauges(
+    "setu_service_loaded", "1 once a lazily created client/module has been built (per worker).",
+    lambda: {name: int(entry["loaded"]) for name, entry in registry.get_stats().items()}, label="service",
+)
+
+@router.get("/services/stats")
+def services_stats_endpoint():
+    """Which SDK clients / heavy modules this worker has built so far, and how long each took."""
+    return {"services": registry.get_stats()}
+
+@router.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition: stage latency histograms, external calls, fallbacks, cache hit rates."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+def timings_breakdown(trace, pipeline):
+    """Per-request breakdown returned when ?timings=true."""
+    trace_data = trace.to_dict()
+    return {
+        "total": trace_data["total"],
+        **pipeline.breakdown(),
+        "spans": trace_data["spans"],
+    }
 
 @router.post("/analyze")
 async def analyze_endpoint(
     files: List[UploadFile] = File(...),
     user_features: str = Form(""),
-    user_price: str = Form("0")
+    user_price: str = Form("0"),
+    timings: bool = False,
+    mode: str = "sync"
 ):
+    """
+    mode=sync (default): runs the analysis and returns the result.
+    mode=job: queues it and returns 202 with a job id to poll at GET /jobs/{id}.
+    """
+    images = []
     try:
+        trace = start_trace() if timings else None
         try:
             expected_price = int(user_price)
         except:
             expected_price = 0
 
-        # Data Containers
-        all_tags = set()
-        all_captions = []
-        collected_brands = set() # <--- NEW: Store brands here
-        best_quality = (0, 0)
-        final_confidence = 0.0
-
         print(f"📸 Processing {len(files)} images...")
-        vision_contexts = []
+        with span("file_read"):
+            images = await spool_uploads(files)
+
+        if mode == "job":
+            # The job owns the uploads from here on
+            uploads, images = images, []
+            return submit_analyze_job(uploads, user_features, expected_price)
+
+        pipeline = build_analyze_pipeline(images, user_features, expected_price)
+        results = await pipeline.run()
+        print(pipeline.report())
+
+        response = build_analyze_response(results)
+        if trace:
+            response["timings"] = timings_breakdown(trace, pipeline)
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error: {e}")
+        return {"status": "error", "message": str(e)}
+    finally:
+        close_all(images)
+
+def submit_analyze_job(images, user_features, expected_price):
+    async def handler(job):
+        async def emit(event, data):
+            if event == "image":
+                job.partial.setdefault("images", []).append(data)
+            else:
+                job.partial[event] = data
+            job.progress = {"stages_done": len(pipeline.timings), "stages_total": len(pipeline.stages)}
 
-        
-        for file in files:
-            image_data = await file.read()
-            
-            # 1. Analyze
-            analysis = get_image_analysis(image_data)
-            quality_stats = analyze_image_quality(image_data)
-            rich_context = extract_rich_vision_context(analysis)
-            vision_contexts.append(rich_context)
-
-            
-            # 2. Collect Tags
-            if analysis.tags:
-                for tag in analysis.tags:
-                    all_tags.add(tag.name.lower())                 
-                if analysis.tags[0].confidence > final_confidence:
-                    final_confidence = analysis.tags[0].confidence
-
-            # 3. Collect Captions
-            if analysis.description.captions:
-                all_captions.append(analysis.description.captions[0].text.capitalize())
-
-            # 4. Collect Brands (NEW)
-            # detected_brands = extract_brands(analysis)
-            # if detected_brands:
-            #     for brand in detected_brands:
-            #         collected_brands.add(brand) # Add to brand set
-            #         all_tags.add(brand.lower()) # Add to tags for AI context
-            #     print(f"🏷️ Brand Detected: {detected_brands}")
-
-            # 5. Quality Check
-            if quality_stats[1] > best_quality[1]:
-                best_quality = quality_stats
-
-        # --- MERGE ---
-
-        merged_vision = merge_vision_contexts(vision_contexts)
-        vision_prompt = format_vision_context(merged_vision, user_features)
-
-        if all_captions:
-            master_caption = "\n".join([f"[Image {i+1}]: {cap}" for i, cap in enumerate(all_captions)])
-        else:
-            master_caption = "Handmade item"
-            
-        master_tags = list(all_tags)
-        
-        print(f"🧠 Merged Context:\n{master_caption}")
-        # Format Brand String (e.g. "Nike" or "Nike, Adidas")
-        brand_str = ", ".join(list(collected_brands)) if collected_brands else "Unknown Brand"
+        try:
+            pipeline = build_analyze_pipeline(images, user_features, expected_price, emit=emit)
+            job.progress = {"stages_done": 0, "stages_total": len(pipeline.stages)}
+            results = await pipeline.run()
+            job.progress["stages_done"] = len(pipeline.timings)
+            print(pipeline.report())
+            return build_analyze_response(results)
+        finally:
+            close_all(images)
+
+    try:
+        job = job_queue.submit("analyze", handler, discard=lambda: close_all(images))
+    except QueueFull as e:
+        close_all(images)
+        print(f"🚦 Job queue full: {e}")
+        raise HTTPException(status_code=503, detail="Analysis queue is full, retry shortly.", headers={"Retry-After": "10"})
+
+    print(f"📥 Queued analysis job {job.id}")
+    return JSONResponse(status_code=202, content={
+        "status": "queued",
+        "job_id": job.id,
+        "poll_url": f"/jobs/{job.id}",
+    })
+
+@router.get("/jobs/stats")
+def jobs_stats_endpoint():
+    """Job queue depth, workers and completion counters (per worker)."""
+    return {"jobs": job_queue.get_stats()}
+
+@router.get("/jobs/{job_id}")
+def job_status_endpoint(job_id: str):
+    """Status (queued / running / done / failed), progress, partial results and the final payload."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    return job
+
+@router.post("/analyze/stream")
+async def analyze_stream_endpoint(
+    files: List[UploadFile] = File(...),
+    user_features: str = Form(""),
+    user_price: str = Form("0"),
+    timings: bool = False
+):
+    """
+    Same analysis as /analyze, streamed as NDJSON: one {"event", "data"} line per
+    partial result (image, product, photo_advice, market_stats, price, listings)
+    as soon as it is ready, then a final "result" event with the /analyze payload.
+    """
+    try:
+        expected_price = int(user_price)
+    except:
+        expected_price = 0
 
-        # --- LOGIC ---
-        main_object, material, exclusions = get_product_info(master_tags,master_caption,vision_prompt)
+    print(f"📸 Streaming analysis of {len(files)} images...")
+    trace = start_trace() if timings else None
+    with span("file_read"):
+        images = await spool_uploads(files)
+    queue = asyncio.Queue()
 
-        pricing_data = calculate_smart_price(main_object, material, exclusions, user_features, expected_price)
-        advice = generate_advice(final_confidence, best_quality, master_tags, main_object) 
-        listings = generate_listings(main_object, material, master_tags, pricing_data["price"], master_caption)
-        
-        return {
-            "status": "success",
-            "product_name": main_object,
-            "brand": brand_str, # <--- NEW FIELD RETURNED
-            "material": material,
-            "suggested_price": pricing_data["price"],     
-            "price_uplift": pricing_data["uplift"],       
-            "pricing_reason": pricing_data["explanation"],
-            "unique_tags": pricing_data["keywords_detected"],
-            "market_stats": pricing_data["market_stats"], 
-            "raw_price": pricing_data["raw_price"],
-            "photo_advice": advice,
-            "listings": listings
+    async def emit(event, data):
+        await queue.put({"event": event, "data": data})
+
+    async def produce(trace):
+        try:
+            # The body is streamed after this endpoint returns, outside its context
+            if trace:
+                use_trace(trace)
+            pipeline = build_analyze_pipeline(images, user_features, expected_price, emit=emit)
+            results = await pipeline.run()
+            print(pipeline.report())
+            response = build_analyze_response(results)
+            if trace:
+                response["timings"] = timings_breakdown(trace, pipeline)
+            await emit("result", response)
+        except Exception as e:
+            print(f"Error: {e}")
+            await emit("result", {"status": "error", "message": str(e)})
+        finally:
+            close_all(images)
+            await queue.put(None)
+
+    async def stream():
+        producer = asyncio.create_task(produce(trace))
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield json.dumps(event, default=str) + "\n"
+        finally:
+            # Client went away: stop spending upstream calls on it
+            if not producer.done():
+                producer.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.post("/catalog/batch")
+async def catalog_batch_endpoint(
+    manifest: UploadFile = File(...),
+    files: List[UploadFile] = File([]),
+):
+    """
+    Prices and lists every SKU of a CSV/JSON manifest (name, material, features,
+    expected_price, images, exclusions), streamed as NDJSON: a "batch" event with
+    the batch id, one "item" per SKU as soon as it finishes, then a "summary".
+    `images` name files uploaded alongside the manifest as `files`.
+    """
+    manifest_upload = await spool_upload(manifest, settings.BATCH_MANIFEST_MAX_BYTES)
+    try:
+        rows = parse_manifest(manifest_upload.view, manifest.filename or "")
+    except ManifestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        manifest_upload.close()
+
+    images = await spool_uploads(files, max_files=settings.BATCH_MAX_FILES)
+    batch_id = await asyncio.to_thread(catalog_batches.create, rows)
+    print(f"📦 Catalog batch {batch_id} with {len(rows)} SKUs and {len(images)} images")
+    return stream_catalog_batch(batch_id, images)
+
+@router.post("/catalog/batch/{batch_id}/resume")
+async def catalog_batch_resume_endpoint(batch_id: str, files: List[UploadFile] = File([])):
+    """
+    Continues a batch: replays the SKUs that already succeeded, then processes the
+    rest (failed rows are retried). Re-upload the images the remaining rows need.
+    """
+    if await asyncio.to_thread(catalog_batches.load, batch_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch id.")
+    if catalog_batches.is_running(batch_id):
+        raise HTTPException(status_code=409, detail="Batch is already running.")
+
+    images = await spool_uploads(files, max_files=settings.BATCH_MAX_FILES)
+    print(f"📦 Resuming catalog batch {batch_id}")
+    return stream_catalog_batch(batch_id, images, resumed=True)
+
+@router.get("/catalog/stats")
+def catalog_stats_endpoint():
+    """Catalog batch counters (per worker)."""
+    return {"catalog": catalog_batches.get_stats()}
+
+@router.get("/catalog/batch/{batch_id}")
+def catalog_batch_status_endpoint(batch_id: str, results: bool = False):
+    """Done / failed / pending counts; ?results=true adds every finished row."""
+    status = catalog_batches.status(batch_id, include_results=results)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired batch id.")
+    return status
+
+def stream_catalog_batch(batch_id, images, resumed=False):
+    uploads_by_name = {image.filename: image for image in images}
+
+    async def process_row(row):
+        return await process_catalog_row(row, uploads_by_name)
+
+    async def stream():
+        events = catalog_batches.run(batch_id, process_row, resumed=resumed)
+        try:
+            async for event in events:
+                yield json.dumps(event, default=str) + "\n"
+        except BatchBusy:
+            # Lost a race with another resume of the same batch
+            yield json.dumps({"event": "error", "data": {"batch_id": batch_id, "message": "Batch is already running."}}) + "\n"
+        finally:
+            # Also runs when the client goes away: stops the batch's workers
+            await events.aclose()
+            close_all(images)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+async def process_catalog_row(row, uploads_by_name):
+    """
+    One manifest row: vision on its images (if any were uploaded), product
+    details only for what the row leaves out, then pricing and listings.
+    """
+    images = [uploads_by_name[name] for name in row["images"] if name in uploads_by_name]
+    missing = [name for name in row["images"] if name not in uploads_by_name]
+    name, material, exclusions = row["name"], row["material"], row["exclusions"]
+
+    vision = None
+    if images:
+        vision = await run_vision(images, row["features"])
+        if not (name and material):
+            detected_name, detected_material, detected_exclusions = await get_product_info_async(
+                vision["tags"], vision["caption"], vision["vision_prompt"]
+            )
+            name = name or detected_name
+            material = material or detected_material
+            exclusions = exclusions or detected_exclusions
+    if not name:
+        raise ValueError(f"No product name, and its images were not uploaded: {missing}")
+    material = material or "Standard Material"
+
+    pricing_data = await calculate_smart_price_async(
+        name, material, exclusions, row["features"], row["expected_price"] or None
+    )
+    tags = vision["tags"] if vision else pricing_data["keywords_detected"]
+    caption = vision["caption"] if vision else (row["features"] or name)
+    listings = await generate_listings_async(name, material, tags, pricing_data["price"], caption)
+
+    result = {
+        "product_name": name,
+        "material": material,
+        "suggested_price": pricing_data["price"],
+        "price_uplift": pricing_data["uplift"],
+        "pricing_reason": pricing_data["explanation"],
+        "unique_tags": pricing_data["keywords_detected"],
+        "market_stats": pricing_data["market_stats"],
+        "raw_price": pricing_data["raw_price"],
+        "listings": listings,
+    }
+    if missing:
+        result["missing_images"] = missing
+    return result
+
+def stage_event(name, result):
+    """Maps a finished pipeline stage to the streaming event it produces (if any)."""
+    if name == "product":
+        main_object, material, exclusions = result
+        return "product", {"product_name": main_object, "material": material, "exclusions": exclusions}
+    if name == "advice":
+        return "photo_advice", result
+    if name == "market":
+        return "market_stats", result
+    if name == "pricing":
+        return "price", {
+            "suggested_price": result["price"],
+            "price_uplift": result["uplift"],
+            "pricing_reason": result["explanation"],
+            "unique_tags": result["keywords_detected"],
+            "raw_price": result["raw_price"],
         }
-    except Exception as e:
-        print(f"Error: {e}")
-        return {"status": "error", "message": str(e)}
-    
+    if name == "listings":
+        return "listings", result
+    return None
+
+def build_analyze_pipeline(images, user_features, expected_price, emit=None):
+    """
+    Stage graph for /analyze. Each stage starts as soon as its inputs are ready:
+
+        vision ──► product ──┬──► market ──► pricing ──► listings
+        keywords ────────────┘
+                  product ──────► advice
+
+    `emit(event, data)` (async) receives partial results for streaming.
+    """
+    async def vision_stage():
+        return await run_vision(images, user_features, emit=emit)
+
+    async def keywords_stage():
+        return await extract_keywords_async(user_features)
+
+    async def product_stage(vision):
+        return await get_product_info_async(vision["tags"], vision["caption"], vision["vision_prompt"])
+
+    async def market_stage(product, keywords):
+        main_object, material, exclusions = product
+        return await fetch_market_stats_async(main_object, material, exclusions, keywords, expected_price)
+
+    async def pricing_stage(product, keywords, market):
+        main_object, material, _ = product
+        return await price_from_market_async(main_object, material, market, keywords)
+
+    async def advice_stage(vision, product):
+        return await generate_advice_async(vision["confidence"], vision["best_quality"], vision["tags"], product[0])
+
+    async def listings_stage(vision, product, pricing):
+        main_object, material, _ = product
+        return await generate_listings_async(main_object, material, vision["tags"], pricing["price"], vision["caption"])
+
+    async def on_stage_done(name, result):
+        event = stage_event(name, result)
+        if emit and event:
+            await emit(*event)
+
+    pipeline = StagePipeline("analyze", on_stage_done=on_stage_done)
+    pipeline.add("vision", vision_stage)
+    pipeline.add("keywords", keywords_stage)
+    pipeline.add("product", product_stage, deps=["vision"])
+    pipeline.add("market", market_stage, deps=["product", "keywords"])
+
+    if settings.LLM_FUSED_MODE:
+        return add_fused_stages(pipeline)
+
+    pipeline.add("pricing", pricing_stage, deps=["product", "keywords", "market"])
+    pipeline.add("advice", advice_stage, deps=["vision", "product"])
+    pipeline.add("listings", listings_stage, deps=["vision", "product", "pricing"])
+    return pipeline
+
+def add_fused_stages(pipeline):
+    """
+    Fused mode: one LLM call returns pricing strategy, listings and photo tips.
+
+        market ──► fused ──┬──► pricing ──► listings
+                           └──► advice
+    """
+    async def fused_stage(vision, product, market):
+        main_object, material, _ = product
+        return await generate_fused_bundle_async(main_object, material, market, vision["caption"], vision["best_quality"])
+
+    async def pricing_stage(product, keywords, market, fused):
+        main_object, material, _ = product
+        return await fused_price_async(fused, main_object, material, market, keywords)
+
+    async def advice_stage(vision, product, fused):
+        return await fused_advice_async(fused, vision["best_quality"], vision["tags"], product[0])
+
+    async def listings_stage(vision, product, pricing, fused):
+        main_object, material, _ = product
+        return await fused_listings_async(fused, main_object, material, vision["tags"], pricing["price"], vision["caption"])
+
+    pipeline.add("fused", fused_stage, deps=["vision", "product", "market"])
+    pipeline.add("pricing", pricing_stage, deps=["product", "keywords", "market", "fused"])
+    pipeline.add("advice", advice_stage, deps=["vision", "product", "fused"])
+    pipeline.add("listings", listings_stage, deps=["vision", "product", "pricing", "fused"])
+    return pipeline
+
+def build_analyze_response(results):
+    vision = results["vision"]
+    main_object, material, _ = results["product"]
+    pricing_data = results["pricing"]
+
+    return {
+        "status": "success",
+        "product_name": main_object,
+        "brand": vision["brand"], # <--- NEW FIELD RETURNED
+        "material": material,
+        "suggested_price": pricing_data["price"],     
+        "price_uplift": pricing_data["uplift"],       
+        "pricing_reason": pricing_data["explanation"],
+        "unique_tags": pricing_data["keywords_detected"],
+        "market_stats": pricing_data["market_stats"], 
+        "raw_price": pricing_data["raw_price"],
+        "vision_calls_saved": vision["vision_calls_saved"],
+        "photo_advice": results["advice"],
+        "listings": results["listings"]
+    }
+
+async def run_vision(images, user_features="", emit=None):
+    """
+    Analyzes every image and merges tags, captions, best quality and confidence
+    (in upload order) into the context the LLM stages need.
+    Near-duplicate shots reuse the vision result of whichever of them decoded first.
+    `images` are SpooledUploads: workers get their path/bytes, Azure reads their view.
+    `emit` gets an "image" event per image as soon as its result is known.
+    """
+    # Data Containers
+    all_tags = set()
+    all_captions = []
+    collected_brands = set() # <--- NEW: Store brands here
+    final_confidence = 0.0
+    vision_contexts = []
+
+    # 1. Decode + score every image in the shared process pool. As each decode
+    #    lands, its dHash is checked against the shots already decoded: a new one
+    #    goes to Azure straight away, a near-duplicate reuses that call's result
+    quality_jobs = submit_quality_batch([image.source for image in images])
+    prepared = [None] * len(images)
+    decoded_representatives = []  # (index, dhash) in decode order
+    vision_tasks = {}  # representative index -> its Azure call
+    limiter = asyncio.Semaphore(settings.IMAGE_FANOUT_LIMIT)
+
+    async def analyze(index):
+        upload_bytes = prepared[index][0]
+        async with limiter:
+            original = images[index].view
+            return await asyncio.to_thread(get_vision_summary, original, upload_bytes=upload_bytes or original)
+
+    async def decode_and_analyze(index):
+        with span("quality_check", image=index):
+            prepared[index] = await quality_jobs[index]
+        phash = prepared[index][2]
+        owner = match_representative(phash, decoded_representatives, settings.IMAGE_DEDUP_THRESHOLD)
+        if owner is None:
+            owner = index
+            if phash is not None:
+                decoded_representatives.append((index, phash))
+            vision_tasks[index] = asyncio.create_task(analyze(index))
+
+        summary = await asyncio.shield(vision_tasks[owner])
+        if emit:
+            await emit("image", {
+                "index": index,
+                "duplicate_of": None if owner == index else owner,
+                "tags": summary["tags"],
+                "caption": summary["caption"],
+                **metrics_as_dict(prepared[index][1]),
+            })
+
+    try:
+        await asyncio.gather(*[decode_and_analyze(i) for i in range(len(images))])
+    finally:
+        for task in vision_tasks.values():
+            task.cancel()
+
+    representatives = sorted(vision_tasks)
+    summaries = {index: vision_tasks[index].result() for index in representatives}
+    vision_calls_saved = len(images) - len(representatives)
+    if vision_calls_saved:
+        print(f"🪞 {vision_calls_saved} near-duplicate image(s) reuse another image's vision result")
+
+    # Duplicates add nothing but repeated captions, so only representatives are merged
+    for index in representatives:
+        summary = summaries[index]
+        vision_contexts.append(summary["context"])
+
+        # 2. Collect Tags
+        if summary["tags"]:
+            all_tags.update(summary["tags"])
+            if summary["top_confidence"] > final_confidence:
+                final_confidence = summary["top_confidence"]
+
+        # 3. Collect Captions
+        if summary["caption"]:
+            all_captions.append(summary["caption"].capitalize())
+
+        # 4. Collect Brands (NEW)
+        # detected_brands = extract_brands(analysis)
+        # if detected_brands:
+        #     for brand in detected_brands:
+        #         collected_brands.add(brand) # Add to brand set
+        #         all_tags.add(brand.lower()) # Add to tags for AI context
+        #     print(f"🏷️ Brand Detected: {detected_brands}")
+
+    # 5. Quality Check (sharpest image wins; every shot counts here, duplicates included)
+    quality_metrics = np.vstack([metrics for _, metrics, _ in prepared])
+
+    # --- MERGE ---
+
+    merged_vision = merge_vision_contexts(vision_contexts)
+    vision_prompt = format_vision_context(merged_vision, user_features)
+
+    if all_captions:
+        master_caption = "\n".join([f"[Image {i+1}]: {cap}" for i, cap in enumerate(all_captions)])
+    else:
+        master_caption = "Handmade item"
+        
+    print(f"🧠 Merged Context:\n{master_caption}")
+
+    return {
+        "tags": list(all_tags),
+        "caption": master_caption,
+        "vision_prompt": vision_prompt,
+        "best_quality": best_quality(quality_metrics),
+        "quality_metrics": quality_metrics,
+        "confidence": final_confidence,
+        "vision_calls_saved": vision_calls_saved,
+        # Format Brand String (e.g. "Nike" or "Nike, Adidas")
+        "brand": ", ".join(list(collected_brands)) if collected_brands else "Unknown Brand",
+    }
 
 def merge_vision_contexts(contexts):
     merged = {
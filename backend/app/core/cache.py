@@ -0,0 +1,252 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SQLiteFile:
+    """
+    Per-thread connections to one SQLite file shared by every worker process.
+    Each connection is opened on first use in its thread with WAL +
+    synchronous=NORMAL (readers never block the writer), then `schema` is
+    applied in order: SQL statements (CREATE ... IF NOT EXISTS) or callables
+    taking the new connection.
+    """
+
+    def __init__(self, path, schema=()):
+        self.path = path
+        self.schema = list(schema)
+        self._local = threading.local()
+
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for step in self.schema:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            self._local.conn = conn
+        return conn
+
+
+class PersistentCache:
+    """
+    Small disk-backed TTL cache on top of SQLite.
+    Survives restarts and is shared by every uvicorn worker pointing at the same file.
+
+    get() returns (value, state) where state is:
+      - "fresh": younger than `ttl`
+      - "stale": older than `ttl` but younger than `stale_ttl` (serve it, refresh in background)
+      - None:    missing or too old
+    """
+
+    def __init__(self, namespace, path, ttl, stale_ttl=0, max_entries=1000):
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._db = SQLiteFile(path, [
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))",
+            "CREATE INDEX IF NOT EXISTS cache_age ON cache (namespace, created_at)",
+        ])
+
+    def _conn(self):
+        return self._db.connect()
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def get(self, key):
+        value, state, _ = self.get_with_age(key)
+        return value, state
+
+    def get_with_age(self, key):
+        """get(), plus the entry's age in seconds (None on a miss)."""
+        try:
+            row = self._conn().execute(
+                "SELECT value, created_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache read failed ({self.namespace}): {e}")
+            self._count("errors")
+            return None, None, None
+
+        if row is None:
+            self._count("misses")
+            return None, None, None
+
+        age = time.time() - row[1]
+        if age <= self.ttl:
+            self._count("hits")
+            return json.loads(row[0]), "fresh", age
+        if age <= self.stale_ttl:
+            self._count("stale_hits")
+            return json.loads(row[0]), "stale", age
+
+        self._count("misses")
+        return None, None, None
+
+    def set(self, key, value):
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, created_at) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), time.time()),
+                )
+                # Size bound: drop the oldest entries beyond max_entries
+                evicted = conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ?"
+                    " ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.max_entries),
+                ).rowcount
+            self._count("writes")
+            if evicted > 0:
+                with self._lock:
+                    self.stats["evictions"] += evicted
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache write failed ({self.namespace}): {e}")
+            self._count("errors")
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def size(self):
+        try:
+            return self._conn().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 3) if lookups else 0.0
+        stats["entries"] = self.size()
+        stats["ttl_seconds"] = self.ttl
+        stats["stale_ttl_seconds"] = self.stale_ttl
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+class LRUCache:
+    """
+    Thread-safe in-memory LRU with an optional per-entry TTL.
+    """
+
+    def __init__(self, max_entries=512, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._data)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        return stats
+
+
+class TieredCache:
+    """
+    In-memory LRU in front of a PersistentCache.
+    Disk hits are promoted into memory; writes go to both tiers. A memory entry
+    never outlives the disk entry's TTL.
+    """
+
+    def __init__(self, memory, persistent):
+        self.memory = memory
+        self.persistent = persistent
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value, state, age = self.persistent.get_with_age(key)
+        if state == "fresh":
+            self.memory.set(key, value, ttl=self._memory_ttl(self.persistent.ttl - age))
+            return value
+        return None
+
+    def set(self, key, value):
+        self.memory.set(key, value, ttl=self._memory_ttl(self.persistent.ttl))
+        self.persistent.set(key, value)
+
+    def _memory_ttl(self, remaining):
+        remaining = max(0, remaining)
+        return remaining if self.memory.ttl is None else min(self.memory.ttl, remaining)
+
+    def get_stats(self):
+        memory = self.memory.get_stats()
+        disk = self.persistent.get_stats()
+        # Every lookup hits memory first, so its counters see all lookups
+        lookups = memory["hits"] + memory["misses"]
+        hits = memory["hits"] + disk["hits"]
+        return {
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory": memory,
+            "disk": disk,
+        }
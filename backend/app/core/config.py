@@ -6,6 +6,120 @@ load_dotenv()
 class Settings:
     AZURE_ENDPOINT = os.getenv("AZURE_ENDPOINT")
     AZURE_KEY = os.getenv("AZURE_KEY")
+    # Azure AI Language (azure_text.py, not wired into /analyze)
+    AZURE_LANGUAGE_ENDPOINT = os.getenv("AZURE_LANGUAGE_ENDPOINT")
+    AZURE_LANGUAGE_KEY = os.getenv("AZURE_LANGUAGE_KEY")
+
+    # Groq (shared pooled client)
+    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_TIMEOUT = float(os.getenv("GROQ_TIMEOUT", "30"))
+    GROQ_AUDIO_TIMEOUT = float(os.getenv("GROQ_AUDIO_TIMEOUT", "60"))
+    GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "2"))
+    GROQ_MAX_IN_FLIGHT = int(os.getenv("GROQ_MAX_IN_FLIGHT", "256"))
+    GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "100"))
+    GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "50"))
+    GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+    # One combined pricing + listings + photo-tips call instead of three
+    LLM_FUSED_MODE = os.getenv("LLM_FUSED_MODE", "false").lower() == "true"
+
+    # Market Spy
+    MARKET_SCAN_MODE = os.getenv("MARKET_SCAN_MODE", "adaptive")  # "adaptive" | "concurrent" | "sequential"
+    MARKET_SCAN_CONCURRENCY = int(os.getenv("MARKET_SCAN_CONCURRENCY", "4"))  # sites per wave in adaptive mode
+    # Adaptive mode stops once it has this many cleaned prices with IQR / median <= MARKET_MAX_SPREAD
+    MARKET_MIN_PRICES = int(os.getenv("MARKET_MIN_PRICES", "6"))
+    MARKET_MAX_SPREAD = float(os.getenv("MARKET_MAX_SPREAD", "0.6"))
+    MARKET_SITE_TIMEOUT = float(os.getenv("MARKET_SITE_TIMEOUT", "12"))  # seconds per site, from when its scan starts
+    MARKET_MAX_RETRIES = int(os.getenv("MARKET_MAX_RETRIES", "3"))
+    MARKET_BACKOFF_BASE = float(os.getenv("MARKET_BACKOFF_BASE", "0.5"))  # seconds, doubled per retry (with jitter)
+    MARKET_BACKOFF_CAP = float(os.getenv("MARKET_BACKOFF_CAP", "8"))
+    MARKET_BREAKER_FAILURES = int(os.getenv("MARKET_BREAKER_FAILURES", "4"))  # failed queries in a row before skipping a site
+    MARKET_BREAKER_COOLDOWN = float(os.getenv("MARKET_BREAKER_COOLDOWN", "120"))
+    # DuckDuckGo pacing shared by all requests (adapts between min and max)
+    DDGS_RATE = float(os.getenv("DDGS_RATE", "4"))  # queries per second to start with
+    DDGS_MIN_RATE = float(os.getenv("DDGS_MIN_RATE", "0.5"))
+    DDGS_MAX_RATE = float(os.getenv("DDGS_MAX_RATE", "10"))
+    DDGS_BURST = int(os.getenv("DDGS_BURST", "8"))
+
+    # Uploads (/analyze, /analyze-voice)
+    UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", str(15 * 1024 * 1024)))
+    UPLOAD_MAX_FILES = int(os.getenv("UPLOAD_MAX_FILES", "10"))
+    UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(80 * 1024 * 1024)))  # whole body; 0 = no cap
+    AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(25 * 1024 * 1024)))  # Whisper's own upload limit
+
+    # Voice preprocessing before Whisper (mono, resampled, silence trimmed)
+    AUDIO_PREP_ENABLED = os.getenv("AUDIO_PREP_ENABLED", "true").lower() == "true"
+    AUDIO_SAMPLE_RATE = int(os.getenv("AUDIO_SAMPLE_RATE", "16000"))  # what Whisper uses internally
+    AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "flac")  # "flac" (needs ffmpeg) | "wav"
+    FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")  # decodes webm/opus/m4a/mp3; optional
+    AUDIO_FFMPEG_TIMEOUT = float(os.getenv("AUDIO_FFMPEG_TIMEOUT", "30"))
+    AUDIO_VAD_FRAME_MS = int(os.getenv("AUDIO_VAD_FRAME_MS", "30"))
+    AUDIO_VAD_MARGIN_DB = float(os.getenv("AUDIO_VAD_MARGIN_DB", "12"))  # speech = this much above the noise floor
+    AUDIO_VAD_PAD_MS = int(os.getenv("AUDIO_VAD_PAD_MS", "250"))  # kept around the detected speech
+    AUDIO_MIN_TRIM_SECONDS = float(os.getenv("AUDIO_MIN_TRIM_SECONDS", "1"))  # worth sending even if not smaller
+
+    # Live voice over WebSocket (/ws/voice)
+    VOICE_STREAM_PAUSE_MS = int(os.getenv("VOICE_STREAM_PAUSE_MS", "700"))  # silence that ends an utterance
+    VOICE_STREAM_MAX_SEGMENT_SECONDS = float(os.getenv("VOICE_STREAM_MAX_SEGMENT_SECONDS", "15"))  # cut even without a pause
+    VOICE_STREAM_MIN_SPEECH_MS = int(os.getenv("VOICE_STREAM_MIN_SPEECH_MS", "200"))  # shorter blips are not transcribed
+    VOICE_STREAM_CONCURRENCY = int(os.getenv("VOICE_STREAM_CONCURRENCY", "3"))  # segments transcribed at once per connection
+    VOICE_STREAM_MAX_SECONDS = int(os.getenv("VOICE_STREAM_MAX_SECONDS", "300"))  # longest recording per connection
+    UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(1024 * 1024)))  # bigger files go to disk + mmap
+    UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None  # default: system temp dir
+
+    # /analyze
+    IMAGE_FANOUT_LIMIT = int(os.getenv("IMAGE_FANOUT_LIMIT", "4"))  # images processed at once per request
+    VISION_MAX_SIDE = int(os.getenv("VISION_MAX_SIDE", "1600"))  # longest side sent to Azure
+    VISION_JPEG_QUALITY = int(os.getenv("VISION_JPEG_QUALITY", "85"))
+    QUALITY_MAX_SIDE = int(os.getenv("QUALITY_MAX_SIDE", "512"))  # grayscale copy for brightness
+    QUALITY_PATCH_SIZE = int(os.getenv("QUALITY_PATCH_SIZE", "256"))  # native-scale tiles for sharpness
+    QUALITY_PATCH_GRID = int(os.getenv("QUALITY_PATCH_GRID", "4"))  # 4x4 tiles ≈ 1 MP
+    IMAGE_DEDUP_THRESHOLD = int(os.getenv("IMAGE_DEDUP_THRESHOLD", "6"))  # max dHash bit distance (of 64); -1 disables
+    QUALITY_WORKERS = int(os.getenv("QUALITY_WORKERS", str(os.cpu_count() or 2)))  # 0 = score in threads
+
+    # Background jobs (/analyze?mode=job)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))  # analyses running at once per process
+    JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "50"))  # waiting jobs before 503
+    JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "900"))  # how long finished results can be polled
+    JOB_MAX_STORED = int(os.getenv("JOB_MAX_STORED", "5000"))
+
+    # Catalog batches (POST /catalog/batch)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # SKUs processed at once per batch
+    BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", "2000"))
+    BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "200"))  # images uploaded with one manifest
+    # Whole-body cap for /catalog/batch (+ /resume) instead of UPLOAD_MAX_REQUEST_BYTES:
+    # room for BATCH_MAX_FILES phone photos of ~5 MB (files are spooled to disk, not held in memory)
+    BATCH_MAX_REQUEST_BYTES = int(os.getenv("BATCH_MAX_REQUEST_BYTES", str(1024 * 1024 * 1024)))
+    BATCH_MANIFEST_MAX_BYTES = int(os.getenv("BATCH_MANIFEST_MAX_BYTES", str(5 * 1024 * 1024)))
+    BATCH_TTL = int(os.getenv("BATCH_TTL", str(24 * 3600)))  # how long a batch can be resumed
+    BATCH_MAX_STORED = int(os.getenv("BATCH_MAX_STORED", "200000"))  # per-row results
+    BATCH_MAX_MANIFESTS = int(os.getenv("BATCH_MAX_MANIFESTS", "1000"))
+
+    # Startup: SDK clients and heavy modules are built on first use; WARM_UP builds them at startup instead
+    WARM_UP = os.getenv("WARM_UP", "background").lower()  # "background" | "blocking" (before serving) | "off"
+
+    # Caches (one SQLite file shared by all workers)
+    CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", ".cache/setu_cache.sqlite3")
+    MARKET_CACHE_ENABLED = os.getenv("MARKET_CACHE_ENABLED", "true").lower() == "true"
+    MARKET_CACHE_TTL = int(os.getenv("MARKET_CACHE_TTL", str(6 * 3600)))  # fresh for 6h
+    MARKET_CACHE_STALE_TTL = int(os.getenv("MARKET_CACHE_STALE_TTL", str(7 * 24 * 3600)))  # served stale up to 7 days
+    MARKET_CACHE_MAX_ENTRIES = int(os.getenv("MARKET_CACHE_MAX_ENTRIES", "5000"))
+    # Local index of every price the Market Spy has seen, consulted before the web
+    PRICE_INDEX_ENABLED = os.getenv("PRICE_INDEX_ENABLED", "true").lower() == "true"
+    PRICE_INDEX_MAX_AGE = int(os.getenv("PRICE_INDEX_MAX_AGE", str(7 * 24 * 3600)))  # older observations are ignored and pruned
+    PRICE_INDEX_MIN_MATCHES = int(os.getenv("PRICE_INDEX_MIN_MATCHES", "8"))  # agreeing local prices needed to skip the scan
+    PRICE_INDEX_MAX_ROWS = int(os.getenv("PRICE_INDEX_MAX_ROWS", "200000"))
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+    LLM_CACHE_TTL_PRODUCT = int(os.getenv("LLM_CACHE_TTL_PRODUCT", str(24 * 3600)))
+    LLM_CACHE_TTL_PRICING = int(os.getenv("LLM_CACHE_TTL_PRICING", str(6 * 3600)))
+    LLM_CACHE_TTL_KEYWORDS = int(os.getenv("LLM_CACHE_TTL_KEYWORDS", str(7 * 24 * 3600)))
+    # Listings / photo tips are meant to vary, so they are not cached unless asked for
+    LLM_CACHE_CREATIVE = os.getenv("LLM_CACHE_CREATIVE", "false").lower() == "true"
+    LLM_CACHE_TTL_CREATIVE = int(os.getenv("LLM_CACHE_TTL_CREATIVE", "3600"))
+    VISION_CACHE_ENABLED = os.getenv("VISION_CACHE_ENABLED", "true").lower() == "true"
+    VISION_CACHE_MEMORY_ENTRIES = int(os.getenv("VISION_CACHE_MEMORY_ENTRIES", "512"))
+    VISION_CACHE_TTL = int(os.getenv("VISION_CACHE_TTL", str(30 * 24 * 3600)))  # same bytes = same answer
+    VISION_CACHE_MAX_ENTRIES = int(os.getenv("VISION_CACHE_MAX_ENTRIES", "20000"))
     
     # Validations
     if not AZURE_ENDPOINT or not AZURE_KEY:
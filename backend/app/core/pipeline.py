@@ -0,0 +1,106 @@
+import asyncio
+import time
+from app.core.telemetry import span
+
+
+class StagePipeline:
+    """
+    Tiny dependency-aware scheduler for a request's stages.
+
+    Each stage is started as soon as all of its dependencies have finished and
+    receives their results as keyword arguments (by stage name):
+
+        pipeline = StagePipeline("analyze")
+        pipeline.add("product", get_product, deps=["vision"])   # get_product(vision=...)
+
+    Coroutine functions are awaited; plain functions run in a worker thread so
+    they never block the event loop.
+
+    `on_stage_done(name, result)` (plain or async) is called as each stage
+    finishes, which is how the streaming endpoint emits partial results.
+    """
+
+    def __init__(self, name="pipeline", on_stage_done=None):
+        self.name = name
+        self.on_stage_done = on_stage_done
+        self.stages = {}
+        self.results = {}
+        self.timings = {}
+        self._t0 = None
+
+    def add(self, name, fn, deps=()):
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (fn, list(deps))
+        return self
+
+    async def _run_stage(self, name, tasks):
+        fn, deps = self.stages[name]
+        inputs = {dep: await tasks[dep] for dep in deps}
+
+        start = time.perf_counter()
+        with span(f"stage.{name}"):
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn(**inputs)
+            else:
+                result = await asyncio.to_thread(fn, **inputs)
+        end = time.perf_counter()
+
+        self.results[name] = result
+        self.timings[name] = {
+            "start": round(start - self._t0, 4),
+            "end": round(end - self._t0, 4),
+            "duration": round(end - start, 4),
+        }
+
+        if self.on_stage_done:
+            notified = self.on_stage_done(name, result)
+            if asyncio.iscoroutine(notified):
+                await notified
+        return result
+
+    async def run(self):
+        self._t0 = time.perf_counter()
+        tasks = {}
+        # Stages are registered in dependency order, so every dep task exists
+        # before anything awaits it.
+        for name in self.stages:
+            tasks[name] = asyncio.ensure_future(self._run_stage(name, tasks))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        return self.results
+
+    def critical_path(self):
+        """
+        Walks back from the last stage to finish through whichever dependency
+        finished last. Returns [(stage, duration), ...] in execution order.
+        """
+        if not self.timings:
+            return []
+
+        path = []
+        current = max(self.timings, key=lambda n: self.timings[n]["end"])
+        while current:
+            path.append((current, self.timings[current]["duration"]))
+            deps = self.stages[current][1]
+            current = max(deps, key=lambda n: self.timings[n]["end"]) if deps else None
+
+        return list(reversed(path))
+
+    def breakdown(self):
+        return {
+            "stages": self.timings,
+            "critical_path": [{"stage": name, "duration": duration} for name, duration in self.critical_path()],
+        }
+
+    def report(self):
+        total = max((t["end"] for t in self.timings.values()), default=0)
+        path = " → ".join(f"{name} ({duration:.2f}s)" for name, duration in self.critical_path())
+        return f"⏱️ {self.name} finished in {total:.2f}s | critical path: {path}"
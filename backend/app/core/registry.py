@@ -0,0 +1,129 @@
+import importlib
+import threading
+import time
+
+# ---------------------------------------------------------
+# LAZY SERVICE REGISTRY
+# ---------------------------------------------------------
+# SDK clients (Azure, Groq) and heavy modules (numpy, cv2, ddgs) are not built
+# when `app.main` is imported. Each service registers a factory here and asks
+# for the object when it first needs it; the factory runs once per process and
+# every later get() is a dict lookup. A cold worker therefore starts serving as
+# soon as FastAPI is up, and warm_up() (startup hook, WARM_UP setting) can build
+# everything in the background before the first request needs it.
+#
+# override() swaps in a ready-made object (bench/fakes.py uses it to install
+# the Azure/Groq/DDGS stand-ins) without touching the services' code.
+
+_MISSING = object()
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._timings = {}
+        self._errors = {}
+        self._overridden = set()
+
+    def register(self, name, factory):
+        """`factory()` builds the object; registering an existing name again is a no-op."""
+        with self._lock:
+            if name not in self._factories:
+                self._factories[name] = factory
+                self._locks[name] = threading.RLock()
+
+    def get(self, name):
+        instance = self._instances.get(name, _MISSING)
+        if instance is not _MISSING:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Nothing registered as {name!r}")
+
+        # One builder per name; concurrent first callers wait for it
+        with self._locks[name]:
+            instance = self._instances.get(name, _MISSING)
+            if instance is not _MISSING:
+                return instance
+            started = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                # Not cached: the next get() tries again
+                self._errors[name] = str(e)
+                raise
+            self._timings[name] = time.perf_counter() - started
+            self._errors.pop(name, None)
+            self._instances[name] = instance
+            return instance
+
+    def override(self, name, value):
+        """Uses `value` for `name` from now on, whether or not the factory already ran."""
+        with self._lock:
+            self._locks.setdefault(name, threading.RLock())
+            self._factories.setdefault(name, lambda: value)
+            self._instances[name] = value
+            self._overridden.add(name)
+
+    def reset(self, name):
+        """Forgets the built object; the factory runs again on the next get()."""
+        self._instances.pop(name, None)
+        self._timings.pop(name, None)
+        self._overridden.discard(name)
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def warm_up(self, names=None):
+        """
+        Builds `names` (default: everything registered) now. Failures are
+        reported, not raised, so a missing key doesn't stop the app from starting.
+        Returns {name: seconds or error}.
+        """
+        report = {}
+        for name in names or list(self._factories):
+            started = time.perf_counter()
+            try:
+                self.get(name)
+                report[name] = round(time.perf_counter() - started, 4)
+            except Exception as e:
+                report[name] = f"failed: {e}"
+        return report
+
+    def get_stats(self):
+        stats = {}
+        for name in sorted(self._factories):
+            entry = {"loaded": name in self._instances}
+            if name in self._overridden:
+                entry["overridden"] = True
+            if name in self._timings:
+                entry["init_seconds"] = round(self._timings[name], 4)
+            if name in self._errors:
+                entry["error"] = self._errors[name]
+            stats[name] = entry
+        return stats
+
+
+registry = ServiceRegistry()
+
+
+class LazyModule:
+    """Stands in for a module; the real import happens on first attribute access."""
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attr):
+        return getattr(registry.get(self._name), attr)
+
+    def __repr__(self):
+        state = "loaded" if registry.is_loaded(self._name) else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_module(name):
+    """`np = lazy_module("numpy")` in place of `import numpy as np`."""
+    registry.register(name, lambda: importlib.import_module(name))
+    return LazyModule(name)
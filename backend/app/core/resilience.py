@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+
+# ---------------------------------------------------------
+# RATE LIMITING, BACKOFF, CIRCUIT BREAKING
+# ---------------------------------------------------------
+# Shared by every request in the process, so the pacing reflects what the
+# upstream is actually tolerating right now instead of fixed per-call sleeps.
+#
+#   AdaptiveTokenBucket  paces calls to one upstream. Every success nudges the
+#                        rate up (additive increase); a failure/throttle halves
+#                        it (multiplicative decrease), at most once per
+#                        `decrease_window` so one burst of failures counts once.
+#   backoff_delay()      exponential backoff with full jitter between retries.
+#   CircuitBreaker       after N failed calls in a row, skips the target for a
+#                        cooldown, then lets a single probe through (half-open).
+
+
+class AdaptiveTokenBucket:
+    def __init__(self, name, rate, min_rate, max_rate, burst, increase=0.1, decrease=0.5, decrease_window=2.0):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_window = decrease_window
+        self._last_decrease = 0.0
+        self.tokens = float(burst)
+        self.stats = {"acquired": 0, "rejected": 0, "waited_seconds": 0.0, "throttled": 0}
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """
+        Blocks until a token is available. Tokens are reserved up front, so
+        concurrent callers queue up in order instead of all waking together.
+        Returns False (without waiting) if the wait would exceed `timeout`.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= 1
+            wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            if timeout is not None and wait > timeout:
+                self.tokens += 1
+                self.stats["rejected"] += 1
+                return False
+            self.stats["acquired"] += 1
+            self.stats["waited_seconds"] += wait
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def on_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.stats["throttled"] += 1
+            if now - self._last_decrease >= self.decrease_window:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._last_decrease = now
+
+    def get_state(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            state = dict(self.stats)
+            state["waited_seconds"] = round(state["waited_seconds"], 3)
+            state["rate_per_second"] = round(self.rate, 3)
+            state["tokens"] = round(self.tokens, 2)
+        return state
+
+
+def backoff_delay(attempt, base, cap):
+    """Full jitter: uniform(0, min(cap, base * 2^attempt)) for attempt = 0, 1, 2..."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name, failure_threshold, cooldown):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.stats = {"opened": 0, "skipped": 0}
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now. While open, only one probe per cooldown gets through."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats["skipped"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.stats["opened"] += 1
+                    print(f"🚧 Circuit for {self.name} opened after {self.failures} failure(s); cooling down {self.cooldown:.0f}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def release(self):
+        """The allowed call never went out (e.g. rate limited locally): free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def is_open(self):
+        with self._lock:
+            return self.state != self.CLOSED
+
+    def get_state(self):
+        with self._lock:
+            state = {"state": self.state, "consecutive_failures": self.failures, **self.stats}
+            if self.state == self.OPEN:
+                state["retry_in_seconds"] = round(max(0.0, self.cooldown - (time.monotonic() - self.opened_at)), 1)
+        return state
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import weakref
+from app.core.telemetry import Counter, register_metric
+
+# ---------------------------------------------------------
+# SINGLE-FLIGHT (request coalescing)
+# ---------------------------------------------------------
+# During a rush many sellers upload near-identical items at once, and each
+# request would start its own market sweep / LLM call for the same key. A
+# SingleFlight group lets the first caller (the leader) do the work while
+# every concurrent caller with the same key waits for and shares its result,
+# or its exception. Nothing is remembered after the call finishes; that is
+# what the caches are for.
+
+COALESCED = register_metric(Counter(
+    "setu_coalesced_calls_total",
+    "Calls that waited on an identical in-flight call instead of starting their own.",
+    ("group",),
+))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _forget(tasks, key, task):
+    tasks.pop(key, None)
+    # Mark the exception as retrieved even if every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self.stats = {"leaders": 0, "coalesced": 0}
+        self._lock = threading.Lock()
+        self._calls = {}
+        # asyncio tasks belong to the loop that created them
+        self._tasks = weakref.WeakKeyDictionary()
+
+    def _count(self, leader):
+        with self._lock:
+            self.stats["leaders" if leader else "coalesced"] += 1
+        if not leader:
+            COALESCED.inc(group=self.name)
+
+    def do(self, key, fn):
+        """Blocking variant: runs fn() once per key at a time; returns (or raises) its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        self._count(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key, fn):
+        """
+        Async variant: fn is a coroutine function. The work runs as its own task,
+        so a cancelled caller (client went away) doesn't cancel it for the others.
+        """
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.setdefault(loop, {})
+        task = tasks.get(key)
+        leader = task is None
+        if leader:
+            task = tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda t: _forget(tasks, key, t))
+        self._count(leader)
+        return await asyncio.shield(task)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["in_flight"] = len(self._calls) + sum(len(t) for t in self._tasks.values())
+        return stats
@@ -0,0 +1,194 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# ---------------------------------------------------------
+# TRACING + METRICS (no external dependency)
+# ---------------------------------------------------------
+# span("azure_vision") times a block, records it on the current request's trace
+# (if one is active) and feeds the process-wide Prometheus metrics rendered by
+# render_prometheus() on GET /metrics.
+#
+# The trace lives in a ContextVar, so it follows the request into asyncio tasks
+# and asyncio.to_thread(); plain thread pools must submit via
+# contextvars.copy_context().run to keep it.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+_current_trace = contextvars.ContextVar("setu_trace", default=None)
+_current_span = contextvars.ContextVar("setu_span", default=None)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            series = self.series.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series["counts"]):
+                    lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (str(bound),))} {count}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {series['count']}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, key)} {round(series['sum'], 6)}")
+                lines.append(f"{self.name}_count{_labels(self.labels, key)} {series['count']}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+STAGE_LATENCY = Histogram("setu_stage_duration_seconds", "Duration of each traced stage.", ("stage",))
+HTTP_LATENCY = Histogram("setu_http_request_duration_seconds", "End-to-end HTTP latency.", ("method", "path", "status"))
+EXTERNAL_CALLS = Counter("setu_external_calls_total", "Calls to Azure, Groq and DuckDuckGo.", ("service", "outcome"))
+FALLBACKS = Counter("setu_fallbacks_total", "Times a stage fell back to a safe default.", ("stage",))
+
+_metrics = [STAGE_LATENCY, HTTP_LATENCY, EXTERNAL_CALLS, FALLBACKS]
+_gauge_sources = []
+
+
+def register_metric(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def register_gauges(name, help_text, source, label="key"):
+    """
+    `source()` returns {label_value: number}; sampled on every /metrics scrape
+    (used for cache stats and breaker state owned by other modules).
+    """
+    _gauge_sources.append((name, help_text, source, label))
+
+
+# ---------------------------------------------------------
+# Traces and spans
+# ---------------------------------------------------------
+class Trace:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        return {
+            "total": round(time.perf_counter() - self.started, 4),
+            "spans": spans,
+        }
+
+
+def start_trace():
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+
+def use_trace(trace):
+    """Makes an existing trace current again, e.g. in a task started outside its context."""
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, external=None, **attrs):
+    """
+    Times the block. `external="groq"` also counts the call as an external call
+    (outcome ok / error). Extra keyword args are attached to the trace record.
+    """
+    trace = _current_trace.get()
+    record = {"name": name, "error": False, "fallback": False, **attrs}
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record["error"] = True
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        _current_span.reset(token)
+        STAGE_LATENCY.observe(duration, stage=name)
+        if external:
+            EXTERNAL_CALLS.inc(service=external, outcome="error" if record["error"] else "ok")
+        if trace is not None:
+            record["start"] = round(start - trace.started, 4)
+            record["duration"] = round(duration, 4)
+            trace.add(record)
+
+
+def mark_fallback(stage):
+    """Counts a fallback and flags the enclosing span (if any)."""
+    FALLBACKS.inc(stage=stage)
+    record = _current_span.get()
+    if record is not None:
+        record["fallback"] = True
+
+
+# ---------------------------------------------------------
+# Prometheus exposition
+# ---------------------------------------------------------
+def render_prometheus():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for name, help_text, source, label in _gauge_sources:
+        try:
+            values = source()
+        except Exception as e:
+            print(f"⚠️ Metrics source {name} failed: {e}")
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in sorted(values.items()):
+            lines.append(f"{name}{_labels((label,), (key,))} {value}")
+    return "\n".join(lines) + "\n"
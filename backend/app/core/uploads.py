@@ -0,0 +1,184 @@
+import io
+import mmap
+import os
+import tempfile
+from fastapi import HTTPException
+from app.core.config import settings
+
+# ---------------------------------------------------------
+# BOUNDED-MEMORY UPLOADS
+# ---------------------------------------------------------
+# Limits are enforced twice:
+#   1. BodySizeLimitMiddleware rejects a request whose body is over
+#      UPLOAD_MAX_REQUEST_BYTES (BATCH_MAX_REQUEST_BYTES for /catalog/batch)
+#      with 413 while it is still arriving (or straight away when
+#      Content-Length already says so), before multipart parsing.
+#   2. spool_uploads() checks the file count and per-file size while copying
+#      each part out of Starlette's temp file in fixed-size chunks.
+#
+# Small files stay in memory as one `bytes`. Larger ones are spooled to a named
+# temp file and exposed through a read-only mmap, so hashing, decoding and the
+# Azure upload all read the same pages. Pool workers get the path, not the
+# bytes, so big uploads are never pickled across processes.
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def _too_large(detail):
+    return HTTPException(status_code=413, detail=detail)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Pure ASGI middleware: caps the request body of every HTTP request.
+    `path_limits` maps a path prefix to its own cap (0 = no cap) instead of `max_bytes`.
+    """
+
+    def __init__(self, app, max_bytes, path_limits=None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = path_limits or {}
+
+    def limit_for(self, path):
+        for prefix, limit in self.path_limits.items():
+            if path.startswith(prefix):
+                return limit
+        return self.max_bytes
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = self.limit_for(scope.get("path", "")) if scope["type"] == "http" else 0
+        if max_bytes <= 0:
+            return await self.app(scope, receive, send)
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > max_bytes:
+                return await self._reject(send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # Raised inside body parsing; FastAPI re-raises HTTPExceptions as-is
+                    raise _too_large(f"Request body exceeds {max_bytes} bytes.")
+            return message
+
+        return await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = b'{"detail":"Request body too large."}'
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class SpooledUpload:
+    """
+    One upload, held once. `view` is `bytes` (in memory) or a read-only mmap
+    (on disk); `source` is what to hand a process-pool worker (bytes or path).
+    """
+
+    def __init__(self, filename, size, data=None, path=None):
+        self.filename = filename
+        self.size = size
+        self.path = path
+        self._data = data
+        self._file = None
+        self._map = None
+
+    @property
+    def view(self):
+        if self._data is not None:
+            return self._data
+        if self._map is None:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    @property
+    def source(self):
+        return self.path if self.path else self._data
+
+    def open(self):
+        """A fresh binary file object (for SDKs that want a stream)."""
+        return open(self.path, "rb") if self.path else io.BytesIO(self._data)
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Still exported (e.g. a cancelled request's thread is mid-read); GC unmaps it later
+                pass
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+        self._data = None
+
+
+async def spool_upload(upload, max_bytes):
+    """Copies an UploadFile in chunks; raises 413 as soon as it passes `max_bytes`."""
+    size = 0
+    buffer = io.BytesIO()
+    spool = None
+    try:
+        while True:
+            chunk = await upload.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise _too_large(f"'{upload.filename}' exceeds the {max_bytes} byte limit per file.")
+            if spool is None and size > settings.UPLOAD_SPOOL_THRESHOLD:
+                spool = tempfile.NamedTemporaryFile(prefix="setu-upload-", dir=settings.UPLOAD_SPOOL_DIR, delete=False)
+                spool.write(buffer.getbuffer())
+                buffer = None
+            if spool is not None:
+                spool.write(chunk)
+            else:
+                buffer.write(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+            os.unlink(spool.name)
+        raise
+
+    if spool is not None:
+        spool.close()
+        return SpooledUpload(upload.filename, size, path=spool.name)
+    return SpooledUpload(upload.filename, size, data=buffer.getvalue())
+
+
+async def spool_uploads(files, max_file_bytes=None, max_files=None):
+    """Spools every file of a request (in order); closes what it already spooled on failure."""
+    max_file_bytes = max_file_bytes or settings.UPLOAD_MAX_FILE_BYTES
+    max_files = max_files or settings.UPLOAD_MAX_FILES
+    if len(files) > max_files:
+        raise _too_large(f"At most {max_files} files per request.")
+
+    spooled = []
+    try:
+        for upload in files:
+            spooled.append(await spool_upload(upload, max_file_bytes))
+    except BaseException:
+        close_all(spooled)
+        raise
+    return spooled
+
+
+def close_all(uploads):
+    for upload in uploads:
+        upload.close()
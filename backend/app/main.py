@@ -1,10 +1,26 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware 
 from app.api import routes
 from app.api.routes import router
+from app.core.config import settings
+from app.core.registry import registry
+from app.core.telemetry import HTTP_LATENCY
+from app.core.uploads import BodySizeLimitMiddleware
+from app.services import groq_client, image_quality
+from app.services.job_queue import job_queue
 
 app = FastAPI(title="Setu AI Backend")
 
+# Reject oversized bodies while they stream in, before multipart parsing
+# (added first so CORS wraps it and the browser can read the 413)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.UPLOAD_MAX_REQUEST_BYTES,
+    path_limits={"/catalog/batch": settings.BATCH_MAX_REQUEST_BYTES},
+)
+
 # CORS (Allow React)
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +35,38 @@ app.include_router(routes.router)
 
 # app.include_router(router)
 
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Route template, not the raw URL, keeps label cardinality bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_LATENCY.observe(time.perf_counter() - start, method=request.method, path=path, status=status)
+
+@app.on_event("startup")
+async def warm_up_services():
+    # Imports and client construction block, so they run in a thread; "background"
+    # serves requests meanwhile (a request needing a client mid-build waits for it)
+    if settings.WARM_UP == "off":
+        return
+    warm = asyncio.to_thread(registry.warm_up)
+    if settings.WARM_UP == "blocking":
+        print(f"🔥 Services warmed up: {await warm}")
+    else:
+        app.state.warm_up = asyncio.create_task(warm)
+
+@app.on_event("shutdown")
+async def close_clients():
+    await job_queue.shutdown()
+    await groq_client.aclose()
+    image_quality.shutdown_pool()
+
 @app.get("/")
 def root():
     return {"message": "Setu AI Backend is Running 🚀"}
@@ -0,0 +1,206 @@
+import io
+import os
+import shutil
+import subprocess
+import wave
+from app.core.config import settings
+from app.core.registry import lazy_module
+
+np = lazy_module("numpy")
+
+# ---------------------------------------------------------
+# AUDIO PREPROCESSING (before Whisper)
+# ---------------------------------------------------------
+# Browser recordings are often 44.1/48 kHz stereo with seconds of silence at
+# both ends. Whisper works at 16 kHz mono anyway and Groq bills by duration, so
+# we send it exactly that:
+#   1. decode: PCM WAV with the stdlib `wave` module, anything else (webm/opus,
+#      m4a, mp3...) through ffmpeg when it is installed
+#   2. downmix to mono, resample to AUDIO_SAMPLE_RATE (windowed-sinc low-pass
+#      first so downsampling doesn't alias)
+#   3. trim leading/trailing silence with a frame-energy detector
+#   4. re-encode as FLAC (ffmpeg) or 16-bit PCM WAV
+# If the audio can't be decoded, or the result is neither smaller nor
+# meaningfully shorter, the original upload is sent unchanged.
+
+VAD_MIN_RUN = 3  # consecutive loud frames that count as speech (a lone click doesn't)
+VAD_PEAK_RANGE_DB = 30  # frames within this much of the loudest one are never trimmed
+VAD_FLOOR_DB = -60  # anything quieter than this (dBFS) is silence
+
+
+def ffmpeg_binary():
+    return shutil.which(settings.FFMPEG_BINARY)
+
+
+def _read_wav(source):
+    """float32 samples shaped (frames, channels) and the sample rate; raises wave.Error if not PCM WAV."""
+    handle = open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+    with handle, wave.open(handle, "rb") as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+
+    if width == 1:
+        data = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        data = np.frombuffer(raw, "<i2").astype(np.float32) / 32768
+    elif width == 3:
+        b = np.frombuffer(raw, np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        data = (np.where(ints & 0x800000, ints - 0x1000000, ints) / 8388608).astype(np.float32)
+    elif width == 4:
+        data = (np.frombuffer(raw, "<i4") / 2147483648).astype(np.float32)
+    else:
+        raise wave.Error(f"unsupported sample width {width}")
+    return data.reshape(-1, channels), rate
+
+
+def _ffmpeg(input_args, output_args, source=None, data=None):
+    """Runs ffmpeg reading `source` (path or bytes) or raw `data` from stdin; returns stdout."""
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise RuntimeError("ffmpeg not installed")
+    from_path = isinstance(source, str)
+    proc = subprocess.run(
+        [binary, "-nostdin", "-hide_banner", "-loglevel", "error",
+         *input_args, "-i", source if from_path else "pipe:0", *output_args, "pipe:1"],
+        input=data if data is not None else (None if from_path else bytes(source)),
+        capture_output=True,
+        timeout=settings.AUDIO_FFMPEG_TIMEOUT,
+        check=True,
+    )
+    return proc.stdout
+
+
+def _decode_ffmpeg(source, rate):
+    """Any container ffmpeg understands -> mono float32 at `rate` (ffmpeg downmixes and resamples)."""
+    pcm = _ffmpeg([], ["-f", "s16le", "-ac", "1", "-ar", str(rate)], source=source)
+    return np.frombuffer(pcm, "<i2").astype(np.float32) / 32768
+
+
+def to_mono(samples):
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples, src_rate, dst_rate, taps=64):
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32)
+    if src_rate > dst_rate:
+        cutoff = dst_rate / src_rate / 2  # new Nyquist, in cycles per input sample
+        n = np.arange(-taps // 2, taps // 2 + 1)
+        kernel = (2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(len(n))).astype(np.float32)
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+    out_len = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(out_len) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def speech_bounds(samples, rate):
+    """
+    (start, end) sample indices of the audio between the first and last run of
+    speech-loud frames, padded by AUDIO_VAD_PAD_MS. The threshold is the noise
+    floor (10th percentile frame energy) + AUDIO_VAD_MARGIN_DB, but never above
+    peak - 30 dB (so wall-to-wall speech isn't nibbled) nor below -60 dBFS.
+    """
+    frame = max(1, int(rate * settings.AUDIO_VAD_FRAME_MS / 1000))
+    count = len(samples) // frame
+    if count < VAD_MIN_RUN:
+        return 0, len(samples)
+
+    frames = samples[:count * frame].reshape(count, frame)
+    energy = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    threshold = min(np.percentile(energy, 10) + settings.AUDIO_VAD_MARGIN_DB, energy.max() - VAD_PEAK_RANGE_DB)
+    threshold = max(threshold, VAD_FLOOR_DB)
+
+    loud = (energy > threshold).astype(np.int32)
+    runs = np.flatnonzero(np.convolve(loud, np.ones(VAD_MIN_RUN, np.int32), mode="valid") == VAD_MIN_RUN)
+    if runs.size == 0:
+        # Nothing clearly louder than the rest: leave it to Whisper
+        return 0, len(samples)
+
+    pad = int(rate * settings.AUDIO_VAD_PAD_MS / 1000)
+    start = max(0, runs[0] * frame - pad)
+    end = min(len(samples), (runs[-1] + VAD_MIN_RUN) * frame + pad)
+    return start, end
+
+
+def _pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def encode_wav(samples, rate):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(_pcm16(samples))
+    return out.getvalue()
+
+
+def _encode_flac(samples, rate):
+    return _ffmpeg(["-f", "s16le", "-ac", "1", "-ar", str(rate)], ["-f", "flac"], data=_pcm16(samples))
+
+
+def prepare_audio(source, filename="input.wav"):
+    """
+    `source` is the upload's bytes or the path of a spooled upload.
+    Returns (payload, upload_name, stats): payload is the processed audio, or
+    None when the original should be sent as-is (under `upload_name`).
+    """
+    original_bytes = os.path.getsize(source) if isinstance(source, str) else len(source)
+    original_name = filename if filename and "." in filename else "input.wav"
+    stats = {"applied": False, "original": {"bytes": original_bytes}}
+    rate = settings.AUDIO_SAMPLE_RATE
+
+    try:
+        try:
+            samples, original_rate = _read_wav(source)
+            stats["decoder"] = "wave"
+            stats["original"].update({
+                "duration_seconds": round(len(samples) / original_rate, 2),
+                "sample_rate": original_rate,
+                "channels": samples.shape[1],
+            })
+            mono = resample(to_mono(samples), original_rate, rate)
+        except (wave.Error, EOFError):
+            mono = _decode_ffmpeg(source, rate)
+            stats["decoder"] = "ffmpeg"
+            stats["original"]["duration_seconds"] = round(len(mono) / rate, 2)
+    except Exception as e:
+        stats["skipped"] = f"could not decode audio: {e}"
+        return None, original_name, stats
+
+    if len(mono) == 0:
+        stats["skipped"] = "no audio samples"
+        return None, original_name, stats
+
+    start, end = speech_bounds(mono, rate)
+    speech = mono[start:end]
+    trimmed = (len(mono) - len(speech)) / rate
+
+    audio_format = "wav"
+    if settings.AUDIO_FORMAT == "flac" and ffmpeg_binary():
+        try:
+            payload = _encode_flac(speech, rate)
+            audio_format = "flac"
+        except Exception as e:
+            print(f"⚠️ FLAC encode failed, using WAV: {e}")
+            payload = encode_wav(speech, rate)
+    else:
+        payload = encode_wav(speech, rate)
+
+    stats["trimmed_seconds"] = round(trimmed, 2)
+    stats["processed"] = {
+        "bytes": len(payload),
+        "duration_seconds": round(len(speech) / rate, 2),
+        "sample_rate": rate,
+        "channels": 1,
+        "format": audio_format,
+    }
+
+    # Smaller upload, or less audio to bill and transcribe: either is worth it
+    if len(payload) < original_bytes or trimmed >= settings.AUDIO_MIN_TRIM_SECONDS:
+        stats["applied"] = True
+        return payload, f"audio.{audio_format}", stats
+    stats["skipped"] = "processed audio was not smaller or shorter"
+    return None, original_name, stats
@@ -1,17 +1,18 @@
-import os
-from azure.ai.textanalytics import TextAnalyticsClient
-from azure.core.credentials import AzureKeyCredential
-from dotenv import load_dotenv
+from app.core.config import settings
+from app.core.registry import registry
 
-load_dotenv()
+# Initialize Azure Language Client (on first use)
+def _create_client():
+    if not settings.AZURE_LANGUAGE_ENDPOINT or not settings.AZURE_LANGUAGE_KEY:
+        return None
+    from azure.ai.textanalytics import TextAnalyticsClient
+    from azure.core.credentials import AzureKeyCredential
+    return TextAnalyticsClient(
+        endpoint=settings.AZURE_LANGUAGE_ENDPOINT,
+        credential=AzureKeyCredential(settings.AZURE_LANGUAGE_KEY),
+    )
 
-# Initialize Azure Language Client
-endpoint = os.getenv("AZURE_LANGUAGE_ENDPOINT")
-key = os.getenv("AZURE_LANGUAGE_KEY")
-
-client = None
-if endpoint and key:
-    client = TextAnalyticsClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+registry.register("azure_text", _create_client)
 
 def extract_selling_points(user_input):
     """
@@ -19,7 +20,10 @@ def extract_selling_points(user_input):
     e.g. Input: "It has gold zari work and is made of pure silk"
          Output: ["gold zari work", "pure silk"]
     """
-    if not client or not user_input:
+    if not user_input:
+        return []
+    client = registry.get("azure_text")
+    if not client:
         return []
 
     try:
@@ -33,4 +37,4 @@ def extract_selling_points(user_input):
             return []
     except Exception as e:
         print(f"Azure Text Client Error: {e}")
-        return []
\ No newline at end of file
+        return []
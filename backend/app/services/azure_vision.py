@@ -1,37 +1,115 @@
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
-from azure.cognitiveservices.vision.computervision.models import VisualFeatureTypes
-from msrest.authentication import CognitiveServicesCredentials
 from app.core.config import settings
+from app.core.cache import LRUCache, PersistentCache, TieredCache
+from app.core.registry import registry
+from app.core.singleflight import SingleFlight
+from app.core.telemetry import span
+import hashlib
 import io
+import mmap
 
-try:
-    client = ComputerVisionClient(settings.AZURE_ENDPOINT, CognitiveServicesCredentials(settings.AZURE_KEY))
-except Exception as e:
-    print(f"❌ Azure Connection Failed: {e}")
-    client = None
+def _create_client():
+    # The SDK (and msrest/requests under it) is only imported once an image needs analyzing
+    from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+    from msrest.authentication import CognitiveServicesCredentials
+    try:
+        return ComputerVisionClient(settings.AZURE_ENDPOINT, CognitiveServicesCredentials(settings.AZURE_KEY))
+    except Exception as e:
+        print(f"❌ Azure Connection Failed: {e}")
+        return None
 
-def get_image_analysis(image_bytes):
+registry.register("azure_vision", _create_client)
+
+# VisualFeatureTypes values; the SDK accepts the plain strings
+VISUAL_FEATURES = [
+    "Description",
+    "Tags",
+    "Color",
+    "Brands",
+]
+
+# Content-addressed: same bytes + same features = same Azure answer
+vision_cache = TieredCache(
+    LRUCache(max_entries=settings.VISION_CACHE_MEMORY_ENTRIES),
+    PersistentCache(
+        "vision",
+        settings.CACHE_DB_PATH,
+        ttl=settings.VISION_CACHE_TTL,
+        max_entries=settings.VISION_CACHE_MAX_ENTRIES,
+    ),
+)
+# The same image analyzed twice at once (catalog rows sharing a photo) makes one
+# Azure call, which also keeps a spooled upload's mmap to one reader at a time
+vision_flight = SingleFlight("vision")
+
+def get_image_analysis(image_bytes, visual_features=VISUAL_FEATURES):
     """
     Sends image to Azure and returns raw analysis.
     We do NOT clean tags here anymore. The LLM will handle the noise.
     """
+    client = registry.get("azure_vision")
     if not client:
         raise Exception("Azure Client not initialized.")
 
-    image_stream = io.BytesIO(image_bytes)
+    if isinstance(image_bytes, mmap.mmap):
+        # Spooled upload: stream the mapped file itself instead of copying it into a BytesIO
+        image_bytes.seek(0)
+        image_stream = image_bytes
+    else:
+        image_stream = io.BytesIO(image_bytes)
     
-    analysis = client.analyze_image_in_stream(
-        image_stream,
-        visual_features=[
-            VisualFeatureTypes.description, 
-            VisualFeatureTypes.tags, 
-            VisualFeatureTypes.color,
-            VisualFeatureTypes.brands 
-        ]
-    )
+    with span("azure_vision", external="azure_vision", upload_bytes=len(image_bytes)):
+        analysis = client.analyze_image_in_stream(
+            image_stream,
+            visual_features=visual_features
+        )
     
     return analysis
 
+def vision_cache_key(image_bytes, visual_features=VISUAL_FEATURES):
+    features = ",".join(sorted(str(getattr(f, "value", f)) for f in visual_features))
+    return f"{hashlib.sha256(image_bytes).hexdigest()}|{features}"
+
+def summarize_analysis(analysis):
+    """
+    Compact, JSON-safe slice of an Azure analysis: exactly what /analyze uses.
+    """
+    tags = analysis.tags or []
+    captions = analysis.description.captions if analysis.description else []
+    return {
+        "context": extract_rich_vision_context(analysis),
+        "tags": [tag.name.lower() for tag in tags],
+        "top_confidence": tags[0].confidence if tags else 0.0,
+        "caption": captions[0].text if captions else None,
+    }
+
+def get_vision_summary(image_bytes, visual_features=VISUAL_FEATURES, upload_bytes=None):
+    """
+    Cached front door for get_image_analysis(): repeated images skip Azure entirely.
+    The cache is keyed on the ORIGINAL bytes; `upload_bytes` (e.g. the downscaled
+    JPEG from prepare_image) is what actually gets sent on a miss.
+    """
+    upload_bytes = upload_bytes or image_bytes
+    key = vision_cache_key(image_bytes, visual_features)
+    if not settings.VISION_CACHE_ENABLED:
+        return vision_flight.do(key, lambda: summarize_analysis(get_image_analysis(upload_bytes, visual_features)))
+
+    summary = vision_cache.get(key)
+    if summary is not None:
+        print(f"⚡ Vision cache hit ({key[:12]})")
+        return summary
+
+    def analyze():
+        summary = summarize_analysis(get_image_analysis(upload_bytes, visual_features))
+        vision_cache.set(key, summary)
+        return summary
+
+    return vision_flight.do(key, analyze)
+
+def get_vision_stats():
+    stats = vision_cache.get_stats()
+    stats["single_flight"] = vision_flight.get_stats()
+    return stats
+
 # def extract_brands(analysis):
 #     if not analysis.brands:
 #         return []
@@ -1,26 +1,29 @@
-import cv2
-import numpy as np
-from app.services.market_spy import get_market_data 
+import asyncio
+from app.core.telemetry import span, mark_fallback
+from app.services.market_spy import get_market_data, get_local_market_data
+from app.services.market_yield import product_category
+from app.services.image_prep import prepare_image
+from app.services.image_quality import measure_quality
 # from app.services.azure_text import extract_selling_points
 from app.services.llm_service import (
-    generate_creative_listings, 
-    analyze_complex_pricing, 
-    analyze_product_details,
-    generate_photo_critique,
-    extract_selling_points
+    generate_creative_listings_async,
+    analyze_complex_pricing_async,
+    analyze_product_details_async,
+    generate_photo_critique_async,
+    extract_selling_points_async,
+    fill_price_placeholder,
 )
 # --- CONSTANTS ---
 # We keep IGNORED_TAGS because Azure sometimes gives garbage like "indoor" or "floor"
 IGNORED_TAGS = ["text", "writing", "design", "indoor", "table", "floor", "close-up", "furniture", "houseplant", "wall", "ground", "surface", "ceiling"]
-def get_product_info(raw_tags, caption, vision_prompt=""):
+async def get_product_info_async(raw_tags, caption, vision_prompt=""):
     """
     Returns Name, Material, AND Exclusions.
     """
-    ai_data = analyze_product_details(
-    raw_tags,
-    f"{caption}\n\n{vision_prompt}"
-    )
-    
+    ai_data = await analyze_product_details_async(raw_tags, f"{caption}\n\n{vision_prompt}")
+    return _product_info_from(ai_data, raw_tags, caption, vision_prompt)
+
+def _product_info_from(ai_data, raw_tags, caption, vision_prompt):
     if ai_data:
         # SAFETY FIX: Use .get() and 'or' to ensure we never return None
         # If AI returns null, we default to "Standard Material"
@@ -33,6 +36,7 @@ def get_product_info(raw_tags, caption, vision_prompt=""):
         return name, material, exclusions
 
     # Fallback (If AI Service is totally down)
+    mark_fallback("product_info")
     valid_tags = [t for t in raw_tags if t not in IGNORED_TAGS]
     fallback_name = valid_tags[0].capitalize() if valid_tags else "Item"
     
@@ -44,25 +48,38 @@ def apply_psychological_pricing(price):
     if remainder < 50: return price - remainder - 1 
     else: return price - remainder + 99
 
-def calculate_smart_price(main_object, material, exclusions, user_features="", user_expected_price=None):
+async def extract_keywords_async(user_features):
+    """
+    High-value keywords from the seller's notes.
+    Independent of the images, so it can start as soon as the request arrives.
+    """
+    if not user_features:
+        return []
+    return await extract_selling_points_async(user_features)
     
+def fetch_market_stats(main_object, material, exclusions, unique_keywords, user_expected_price=None):
+    """
+    Market Spy lookup with the user-price / safety-net fallbacks.
+    Prices already seen for this product + material (+ keywords) answer first;
+    the live scan runs only when the local price index has too few of them.
+    """
     print(f"\n💎 MATERIAL: {material.upper()} | 🚫 AVOIDING: {exclusions}")
     
-    # 1. MARKET SPY (Pass exclusions!)
-    unique_keywords = []
-    if user_features:
-        unique_keywords = extract_selling_points(user_features)
+    category = product_category(main_object)
+    market_stats = get_local_market_data(category, material, main_object, unique_keywords, exclusions)
     
-    search_query = f"{material} {main_object} {' '.join(unique_keywords)}"
+    if not market_stats:
+        search_query = f"{material} {main_object} {' '.join(unique_keywords)}"
     
-    # PASS THE EXCLUSIONS HERE
-    market_stats = get_market_data(search_query, exclusions)
+        # PASS THE EXCLUSIONS HERE
+        market_stats = get_market_data(search_query, exclusions, category=category, material=material)
 
     # 2. FALLBACK: USE USER'S PRICE (If Spy Failed)
     if not market_stats:
         if user_expected_price and user_expected_price > 0:
             # Create synthetic market data around the user's price
             print(f"⚠️ Market Spy failed. Using User Price: {user_expected_price}")
+            mark_fallback("market.user_price")
             market_stats = {
                 "min": int(user_expected_price * 0.8), # -20%
                 "max": int(user_expected_price * 1.4), # +40%
@@ -71,13 +88,18 @@ def calculate_smart_price(main_object, material, exclusions, user_features="", u
         else:
             # Last resort safety net (if user didn't give a price either)
             market_stats = {"min": 500, "max": 2000, "avg": 1000}
+            mark_fallback("market.default_band")
 
-    # 3. AI STRATEGY (Apply Seasonality, Trends, & Uniqueness)
-    # The AI will now modify the User's Price based on factors!
-    pricing_strategy = analyze_complex_pricing(f"{main_object}", material, market_stats)
-    optimal_price = pricing_strategy.get("recommended_price", market_stats['avg'])
-    if unique_keywords: optimal_price = int(optimal_price * 1.15)
-    final_price = apply_psychological_pricing(optimal_price)
+    return market_stats
+
+def price_from_strategy(pricing_strategy, market_stats, unique_keywords):
+    """
+    Turns the AI strategy into the final (psychologically rounded) price payload.
+    """
+    with span("pricing_math"):
+        optimal_price = pricing_strategy.get("recommended_price", market_stats['avg'])
+        if unique_keywords: optimal_price = int(optimal_price * 1.15)
+        final_price = apply_psychological_pricing(optimal_price)
 
     return {
         "price": f"₹ {final_price}", 
@@ -87,16 +109,58 @@ def calculate_smart_price(main_object, material, exclusions, user_features="", u
         "market_stats": market_stats, 
         "raw_price": final_price
     }
+
+async def calculate_smart_price_async(main_object, material, exclusions, user_features="", user_expected_price=None, unique_keywords=None):
+
+    # 1. MARKET SPY (Pass exclusions!)
+    # Callers that already ran extract_keywords_async() pass the result in
+    if unique_keywords is None:
+        unique_keywords = await extract_keywords_async(user_features)
+
+    market_stats = await fetch_market_stats_async(main_object, material, exclusions, unique_keywords, user_expected_price)
+    return await price_from_market_async(main_object, material, market_stats, unique_keywords)
+
+async def price_from_market_async(main_object, material, market_stats, unique_keywords):
+    """AI strategy on top of already-fetched market stats."""
+    # 3. AI STRATEGY (Apply Seasonality, Trends, & Uniqueness)
+    # The AI will now modify the User's Price based on factors!
+    pricing_strategy = await analyze_complex_pricing_async(f"{main_object}", material, market_stats)
+    return price_from_strategy(pricing_strategy, market_stats, unique_keywords)
+
+async def fetch_market_stats_async(main_object, material, exclusions, unique_keywords, user_expected_price=None):
+    # DDGS is synchronous, so the scan itself still runs in a worker thread
+    return await asyncio.to_thread(
+        fetch_market_stats, main_object, material, exclusions, unique_keywords, user_expected_price
+    )
+
+# --- FUSED MODE ---
+# One LLM round trip for pricing + listings + photo tips. Each consumer below
+# falls back to its own per-helper call if its section failed validation.
+async def fused_price_async(bundle, main_object, material, market_stats, unique_keywords):
+    pricing_strategy = bundle["pricing"]
+    if pricing_strategy is None:
+        pricing_strategy = await analyze_complex_pricing_async(f"{main_object}", material, market_stats)
+    return price_from_strategy(pricing_strategy, market_stats, unique_keywords)
+
+async def fused_advice_async(bundle, quality_stats, tags, product_name):
+    ai_tips = bundle["tips"]
+    if ai_tips is None:
+        ai_tips = await generate_photo_critique_async(product_name, quality_stats, tags)
+    return advice_from_tips(ai_tips, quality_stats)
+
+async def fused_listings_async(bundle, main_object, material, tags, price, caption):
+    ai_content = bundle["listings"]
+    if ai_content is not None:
+        ai_content = fill_price_placeholder(ai_content, price)
+    else:
+        ai_content = await generate_creative_listings_async(main_object, material, tags, price, caption)
+    return listings_from_content(ai_content, main_object, material, price, caption)
+
 def analyze_image_quality(image_bytes):
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img is None: return 0, 0 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    brightness = np.mean(gray)
-    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
-    return brightness, sharpness
-
-def generate_advice(confidence, quality_stats, tags, product_name):
+    # Callers that also need the Azure upload should prepare_image() once and share it
+    return measure_quality(prepare_image(image_bytes, for_vision=False))
+
+async def generate_advice_async(confidence, quality_stats, tags, product_name):
     """
     Generates dynamic photography advice.
     Primary: AI Photography Coach.
@@ -104,14 +168,17 @@ def generate_advice(confidence, quality_stats, tags, product_name):
     """
     
     # 1. 🚀 Try AI Coach First (Dynamic)
-    ai_tips = generate_photo_critique(product_name, quality_stats, tags)
-    
+    ai_tips = await generate_photo_critique_async(product_name, quality_stats, tags)
+    return advice_from_tips(ai_tips, quality_stats)
+
+def advice_from_tips(ai_tips, quality_stats):
     if ai_tips:
         # Add emojis to make it friendly
         return [f"💡 {tip}" for tip in ai_tips]
 
     # 2. 🛡️ Fallback (Logic Based)
     # Only runs if AI fails. Kept simple.
+    mark_fallback("advice")
     brightness, sharpness = quality_stats
     advice = []
     
@@ -129,21 +196,24 @@ def generate_advice(confidence, quality_stats, tags, product_name):
         
     return advice
 
-def generate_listings(main_object, material, tags, price, caption):
+async def generate_listings_async(main_object, material, tags, price, caption):
     """
     Primary: 100% AI Generation (Vibe-aware).
     Backup: Safe, minimal text if AI fails.
     """
     
     # 1. AI GENERATION FIRST
-    ai_content = generate_creative_listings(main_object, material, tags, price, caption)
-    
+    ai_content = await generate_creative_listings_async(main_object, material, tags, price, caption)
+    return listings_from_content(ai_content, main_object, material, price, caption)
+
+def listings_from_content(ai_content, main_object, material, price, caption):
     if ai_content:
         return ai_content 
 
     # 2. SAFETY NET (Only runs if AI crashes)
     # We keep this generic so it applies to literally anything (Laptop, Cake, Shoe).
     print("⚠️ AI generation failed. Using generic fallback.")
+    mark_fallback("listings")
     
     return {
         "amazon": {
@@ -158,4 +228,4 @@ def generate_listings(main_object, material, tags, price, caption):
         },
         "instagram": f"Check out this {main_object}! ✨ {caption}. DM for details. #{main_object.replace(' ', '')}",
         "whatsapp": f"Hello! We have this {main_object} available.\nDetails: {caption}\nPrice: {price}"
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,276 @@
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+from app.core.config import settings
+from app.core.cache import PersistentCache
+
+# ---------------------------------------------------------
+# CATALOG BATCHES (POST /catalog/batch)
+# ---------------------------------------------------------
+# A wholesale seller sends one manifest (CSV or JSON) with hundreds of SKUs.
+# Rows are priced and listed by a fixed number of workers, so the market
+# cache, price index, LLM cache and single-flight groups are shared across the
+# whole catalog. Each finished row is yielded as soon as it is done.
+#
+# The manifest and every finished row are saved under the batch id. If the
+# stream breaks (client gone, deploy, crash), resuming the batch replays the
+# rows that already succeeded and only processes the rest. Manifests have
+# their own store, so a large batch's rows can't evict another batch's manifest.
+
+manifest_store = PersistentCache(
+    "batch_manifests",
+    settings.CACHE_DB_PATH,
+    ttl=settings.BATCH_TTL,
+    max_entries=settings.BATCH_MAX_MANIFESTS,
+)
+batch_store = PersistentCache(
+    "batches",
+    settings.CACHE_DB_PATH,
+    ttl=settings.BATCH_TTL,
+    max_entries=settings.BATCH_MAX_STORED,
+)
+
+# Accepted header spellings -> manifest field
+COLUMN_ALIASES = {
+    "sku": "sku", "id": "sku", "sku_id": "sku",
+    "name": "name", "product": "name", "product_name": "name", "title": "name",
+    "material": "material", "fabric": "material",
+    "features": "features", "user_features": "features", "description": "features", "notes": "features",
+    "expected_price": "expected_price", "price": "expected_price", "user_price": "expected_price",
+    "images": "images", "image": "images", "image_refs": "images", "image_files": "images",
+    "exclusions": "exclusions", "exclude": "exclusions",
+}
+
+
+class ManifestError(ValueError):
+    pass
+
+
+class BatchBusy(Exception):
+    pass
+
+
+def _split_list(value):
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [part.strip() for part in str(value or "").replace(";", "|").split("|") if part.strip()]
+
+
+def _price(value):
+    try:
+        return int(float(str(value).replace(",", "").replace("₹", "").strip() or 0))
+    except ValueError:
+        return 0
+
+
+def normalize_row(raw, index):
+    row = {}
+    for key, value in raw.items():
+        field = COLUMN_ALIASES.get(str(key or "").strip().lower().replace(" ", "_"))
+        if field and value not in (None, ""):
+            row[field] = value
+
+    normalized = {
+        "index": index,
+        "sku": str(row.get("sku") or index + 1),
+        "name": str(row.get("name") or "").strip(),
+        "material": str(row.get("material") or "").strip(),
+        "features": str(row.get("features") or "").strip(),
+        "expected_price": _price(row.get("expected_price", 0)),
+        "images": _split_list(row.get("images")),
+        "exclusions": _split_list(row.get("exclusions")),
+    }
+    if not normalized["name"] and not normalized["images"]:
+        raise ManifestError(f"Row {index + 1} (sku {normalized['sku']}) needs a product name or an image.")
+    return normalized
+
+
+def parse_manifest(raw_bytes, filename=""):
+    """
+    CSV (header row) or JSON (a list of objects, or {"items": [...]}) -> normalized rows.
+    Image references are file names of images uploaded alongside the manifest,
+    separated by "|" or ";" in CSV.
+    """
+    try:
+        text = bytes(raw_bytes).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ManifestError("Manifest must be UTF-8 text.")
+
+    stripped = text.lstrip()
+    if filename.lower().endswith(".json") or stripped[:1] in ("[", "{"):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ManifestError(f"Invalid JSON manifest: {e}")
+        if isinstance(data, dict):
+            data = data.get("items", [])
+        if not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
+            raise ManifestError("JSON manifest must be a list of objects (or {\"items\": [...]}).")
+        raw_rows = data
+    else:
+        raw_rows = list(csv.DictReader(io.StringIO(text)))
+
+    if not raw_rows:
+        raise ManifestError("Manifest has no rows.")
+    if len(raw_rows) > settings.BATCH_MAX_ROWS:
+        raise ManifestError(f"At most {settings.BATCH_MAX_ROWS} rows per batch.")
+    return [normalize_row(raw, index) for index, raw in enumerate(raw_rows)]
+
+
+class CatalogBatches:
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.stats = {"batches": 0, "resumed": 0, "rows_done": 0, "rows_failed": 0, "rows_replayed": 0}
+        self._running = set()
+
+    def create(self, rows):
+        batch_id = uuid.uuid4().hex
+        manifest_store.set(batch_id, {"batch_id": batch_id, "created_at": time.time(), "rows": rows})
+        self.stats["batches"] += 1
+        return batch_id
+
+    def load(self, batch_id):
+        manifest, _ = manifest_store.get(batch_id)
+        return manifest
+
+    def _item(self, batch_id, index):
+        item, _ = batch_store.get(f"{batch_id}:{index}")
+        return item
+
+    def _split_done(self, batch_id, rows):
+        """(stored successful items, rows still to process)"""
+        finished, pending = [], []
+        for row in rows:
+            item = self._item(batch_id, row["index"])
+            if item and item["status"] == "success":
+                finished.append(item)
+            else:
+                pending.append(row)
+        return finished, pending
+
+    def is_running(self, batch_id):
+        return batch_id in self._running
+
+    def status(self, batch_id, include_results=False):
+        manifest = self.load(batch_id)
+        if manifest is None:
+            return None
+        counts = {"success": 0, "error": 0, "pending": 0}
+        items = []
+        for row in manifest["rows"]:
+            item = self._item(batch_id, row["index"])
+            counts[item["status"] if item else "pending"] += 1
+            if include_results and item:
+                items.append(item)
+        status = {
+            "batch_id": batch_id,
+            "created_at": manifest["created_at"],
+            "total": len(manifest["rows"]),
+            "done": counts["success"],
+            "failed": counts["error"],
+            "pending": counts["pending"],
+            "running": batch_id in self._running,
+        }
+        if include_results:
+            status["items"] = items
+        return status
+
+    async def run(self, batch_id, process_row, resumed=False):
+        """
+        Async generator of NDJSON-ready events: "batch" first, then one "item"
+        per row (replayed successes first, then live rows as they finish), then
+        "summary". `process_row(row)` is a coroutine returning the row's result.
+        Rows that failed before are retried on resume.
+        """
+        if batch_id in self._running:
+            raise BatchBusy(batch_id)
+        self._running.add(batch_id)
+        if resumed:
+            self.stats["resumed"] += 1
+        started = time.perf_counter()
+        workers = []
+        try:
+            # SQLite reads/writes run in threads: the file is shared with every other cache writer
+            manifest = await asyncio.to_thread(self.load, batch_id)
+            rows = manifest["rows"]
+            finished, pending = await asyncio.to_thread(self._split_done, batch_id, rows)
+
+            yield {"event": "batch", "data": {
+                "batch_id": batch_id,
+                "total": len(rows),
+                "already_done": len(finished),
+                "to_process": len(pending),
+                "resume_url": f"/catalog/batch/{batch_id}/resume",
+            }}
+            for item in finished:
+                self.stats["rows_replayed"] += 1
+                yield {"event": "item", "data": {**item, "replayed": True}}
+
+            todo = asyncio.Queue()
+            for row in pending:
+                todo.put_nowait(row)
+            results = asyncio.Queue()
+            workers_left = min(self.concurrency, len(pending))
+
+            async def worker():
+                nonlocal workers_left
+                try:
+                    await drain()
+                finally:
+                    # The last worker to stop wakes the collector, even if a row was lost on the way
+                    workers_left -= 1
+                    if not workers_left:
+                        results.put_nowait(None)
+
+            async def drain():
+                while not todo.empty():
+                    row = todo.get_nowait()
+                    row_started = time.perf_counter()
+                    try:
+                        item = {"index": row["index"], "sku": row["sku"], "status": "success", "result": await process_row(row)}
+                        self.stats["rows_done"] += 1
+                    except Exception as e:
+                        print(f"❌ Batch {batch_id[:8]} row {row['sku']} failed: {e}")
+                        item = {"index": row["index"], "sku": row["sku"], "status": "error", "error": str(e)}
+                        self.stats["rows_failed"] += 1
+                    item["duration"] = round(time.perf_counter() - row_started, 3)
+                    # Round-trip through JSON so the stored copy and the streamed one match
+                    item = json.loads(json.dumps(item, default=str))
+                    await asyncio.to_thread(batch_store.set, f"{batch_id}:{row['index']}", item)
+                    await results.put(item)
+
+            workers = [asyncio.create_task(worker()) for _ in range(workers_left)]
+            counts = {"success": len(finished), "error": 0}
+            for _ in pending:
+                item = await results.get()
+                if item is None:
+                    # Every worker stopped before all rows came back: fail the stream (resumable) instead of waiting
+                    crashed = [t.exception() for t in workers if t.done() and not t.cancelled() and t.exception()]
+                    raise RuntimeError(f"Batch {batch_id[:8]} workers stopped early: {crashed[0] if crashed else 'cancelled'}")
+                counts[item["status"]] += 1
+                yield {"event": "item", "data": item}
+
+            yield {"event": "summary", "data": {
+                "batch_id": batch_id,
+                "total": len(rows),
+                "done": counts["success"],
+                "failed": counts["error"],
+                "duration": round(time.perf_counter() - started, 3),
+            }}
+        finally:
+            # Client went away mid-stream: stop the workers; finished rows are already saved
+            for task in workers:
+                task.cancel()
+            self._running.discard(batch_id)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["running"] = len(self._running)
+        stats["concurrency"] = self.concurrency
+        return stats
+
+
+catalog_batches = CatalogBatches(settings.BATCH_CONCURRENCY)
@@ -0,0 +1,74 @@
+import asyncio
+import weakref
+from app.core.config import settings
+from app.core.registry import lazy_module
+
+# Imported with the first Groq call, not with the app
+groq = lazy_module("groq")
+httpx = lazy_module("httpx")
+
+# ---------------------------------------------------------
+# Shared Groq clients (one pool per event loop)
+# ---------------------------------------------------------
+# Every LLM helper and the voice service go through here instead of building
+# their own client, so keep-alive connections are reused across requests and
+# the number of in-flight Groq calls is capped in one place.
+
+# httpx.AsyncClient pools are bound to the loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def is_configured():
+    return bool(settings.GROQ_API_KEY)
+
+
+def _limits():
+    return httpx.Limits(
+        max_connections=settings.GROQ_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.GROQ_MAX_KEEPALIVE,
+        keepalive_expiry=settings.GROQ_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout():
+    return httpx.Timeout(settings.GROQ_TIMEOUT, connect=5.0)
+
+
+def get_async_client():
+    """Shared async client + in-flight limiter for the running event loop."""
+    if not is_configured():
+        return None, None
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None:
+        client = groq.AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            max_retries=settings.GROQ_MAX_RETRIES,
+            timeout=_timeout(),
+            http_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+        )
+        entry = (client, asyncio.Semaphore(settings.GROQ_MAX_IN_FLIGHT))
+        _async_clients[loop] = entry
+    return entry
+
+
+# ---------------------------------------------------------
+# Calls
+# ---------------------------------------------------------
+async def achat(timeout=None, **kwargs):
+    client, limiter = get_async_client()
+    async with limiter:
+        return await client.chat.completions.create(timeout=timeout or settings.GROQ_TIMEOUT, **kwargs)
+
+
+async def atranslate_audio(timeout=None, **kwargs):
+    client, limiter = get_async_client()
+    async with limiter:
+        return await client.audio.translations.create(timeout=timeout or settings.GROQ_AUDIO_TIMEOUT, **kwargs)
+
+
+async def aclose():
+    """Closes the pool owned by the current loop (called on app shutdown)."""
+    entry = _async_clients.pop(asyncio.get_running_loop(), None)
+    if entry:
+        await entry[0].close()
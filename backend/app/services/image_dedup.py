@@ -0,0 +1,37 @@
+from app.core.registry import lazy_module
+
+cv2 = lazy_module("cv2")
+np = lazy_module("numpy")
+
+# ---------------------------------------------------------
+# NEAR-DUPLICATE DETECTION (dHash)
+# ---------------------------------------------------------
+# Sellers often shoot the same angle 3-4 times. A 64-bit difference hash is
+# enough to spot those: we only send one representative per group to Azure
+# and reuse its result for the rest.
+
+
+def dhash(gray, hash_size=8):
+    """64-bit difference hash of a grayscale image (row-wise gradient signs)."""
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def match_representative(value, representatives, threshold):
+    """
+    Index of the first representative whose hash is within `threshold` bits of
+    `value`, else None. `representatives` is [(index, hash), ...]; a None hash or
+    threshold < 0 never matches.
+    """
+    if threshold < 0 or value is None:
+        return None
+    for index, rep_hash in representatives:
+        if hamming(value, rep_hash) <= threshold:
+            return index
+    return None
+
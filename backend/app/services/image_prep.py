@@ -0,0 +1,81 @@
+from app.core.config import settings
+from app.core.registry import lazy_module
+
+cv2 = lazy_module("cv2")
+np = lazy_module("numpy")
+
+# ---------------------------------------------------------
+# IMAGE PREPROCESSING (decode once, feed Azure + quality check)
+# ---------------------------------------------------------
+# Phone photos arrive as 4-12 MB JPEGs. We decode each upload exactly once and
+# derive everything downstream from that single decode:
+#   - "jpeg":    bounded-resolution re-encode that goes to Azure Vision
+#   - "gray":    small grayscale copy for brightness (mean survives area downscaling)
+#   - "patches": a grid of full-resolution grayscale tiles for sharpness
+#
+# Why patches instead of the small copy for sharpness: Laplacian variance is NOT
+# scale invariant (downscaling by s inflates it anywhere from s^1 to s^4 depending
+# on blur and sensor noise), so no fixed correction keeps the 100 / 500 thresholds
+# honest. Tiles sampled at native scale keep the same per-pixel statistics as the
+# full frame, so the thresholds keep their meaning at ~1 MP of work.
+
+
+def _fit(img, max_side):
+    h, w = img.shape[:2]
+    longest = max(h, w)
+    if longest <= max_side:
+        return img
+    ratio = max_side / longest
+    return cv2.resize(img, (max(1, int(w * ratio)), max(1, int(h * ratio))), interpolation=cv2.INTER_AREA)
+
+
+def _sample_patches(img, grid, size):
+    """grid x grid evenly spread grayscale tiles at native resolution."""
+    h, w = img.shape[:2]
+    size = min(size, h, w)
+    ys = np.linspace(0, h - size, grid).astype(int)
+    xs = np.linspace(0, w - size, grid).astype(int)
+    return np.stack([
+        cv2.cvtColor(img[y:y + size, x:x + size], cv2.COLOR_BGR2GRAY)
+        for y in ys for x in xs
+    ])
+
+
+def _load(source):
+    """Encoded bytes as a uint8 array: a file path (spooled upload) or any bytes-like/mmap, without copying the latter."""
+    if isinstance(source, str):
+        return np.fromfile(source, np.uint8)
+    return np.frombuffer(source, np.uint8)
+
+def prepare_image(source, for_vision=True):
+    """
+    Decodes an upload once. Returns None if the bytes are not a readable image.
+    `source` is the encoded image (bytes, memoryview, mmap) or the path of a spooled upload.
+    """
+    encoded = _load(source)
+    img = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+
+    height, width = img.shape[:2]
+    prepared = {
+        "width": width,
+        "height": height,
+        "original_bytes": encoded.size,
+        "patches": _sample_patches(img, settings.QUALITY_PATCH_GRID, settings.QUALITY_PATCH_SIZE),
+    }
+
+    vision_img = _fit(img, settings.VISION_MAX_SIDE)
+    if for_vision:
+        # None = send the original: small originals can come out larger after a
+        # re-encode, and the caller already holds them (no copy back from the worker)
+        prepared["jpeg"] = None
+        ok, buf = cv2.imencode(".jpg", vision_img, [cv2.IMWRITE_JPEG_QUALITY, settings.VISION_JPEG_QUALITY])
+        if ok and buf.nbytes < encoded.size:
+            prepared["jpeg"] = buf.tobytes()
+
+    # Derive the quality copy from the (already smaller) vision copy
+    prepared["gray"] = cv2.cvtColor(_fit(vision_img, settings.QUALITY_MAX_SIDE), cv2.COLOR_BGR2GRAY)
+    del img, vision_img, encoded
+    return prepared
+
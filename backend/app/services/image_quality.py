@@ -0,0 +1,149 @@
+import asyncio
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from app.core.config import settings
+from app.core.registry import registry, lazy_module
+from app.services.image_prep import prepare_image
+from app.services.image_dedup import dhash
+
+np = lazy_module("numpy")
+
+# ---------------------------------------------------------
+# BATCH IMAGE QUALITY ENGINE
+# ---------------------------------------------------------
+# Decode + metrics are CPU bound, so a request's images are scored in a shared
+# process pool instead of on the request thread. Each image comes back as one
+# row of QUALITY_FIELDS plus the downscaled JPEG for Azure and its dHash.
+
+QUALITY_FIELDS = ("brightness", "sharpness", "contrast", "clipping", "noise")
+BRIGHTNESS, SHARPNESS, CONTRAST, CLIPPING, NOISE = range(len(QUALITY_FIELDS))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def compute_metrics(prepared):
+    """
+    All metrics for one prepared image in a single vectorized pass.
+      brightness: mean gray level (0-255)
+      sharpness:  Laplacian variance at native scale (same scale as the 100/500 thresholds)
+      contrast:   std of gray levels
+      clipping:   fraction of pixels crushed to black (<=5) or blown to white (>=250)
+      noise:      Immerkaer sigma estimate on the native-scale tiles
+    """
+    row = np.zeros(len(QUALITY_FIELDS), dtype=np.float64)
+    if prepared is None:
+        return row
+
+    gray = prepared["gray"]
+    row[BRIGHTNESS] = gray.mean()
+    row[CONTRAST] = gray.std()
+    row[CLIPPING] = np.count_nonzero((gray <= 5) | (gray >= 250)) / gray.size
+
+    # Tiles stacked as (n, h, w): one set of shifted views serves both kernels
+    p = prepared["patches"].astype(np.float32)
+    center = p[:, 1:-1, 1:-1]
+    cross = p[:, :-2, 1:-1] + p[:, 2:, 1:-1] + p[:, 1:-1, :-2] + p[:, 1:-1, 2:]
+    diagonal = p[:, :-2, :-2] + p[:, :-2, 2:] + p[:, 2:, :-2] + p[:, 2:, 2:]
+
+    laplacian = cross - 4 * center                        # == cv2.Laplacian(ksize=1)
+    row[SHARPNESS] = laplacian.var()
+
+    immerkaer = diagonal - 2 * cross + 4 * center          # [[1,-2,1],[-2,4,-2],[1,-2,1]]
+    n, h, w = immerkaer.shape
+    row[NOISE] = math.sqrt(math.pi / 2) * np.abs(immerkaer).sum() / (6 * n * h * w)
+    return row
+
+
+def measure_quality(prepared):
+    """(brightness, sharpness) — the pair generate_advice_async() and the LLM coach expect."""
+    row = compute_metrics(prepared)
+    return float(row[BRIGHTNESS]), float(row[SHARPNESS])
+
+
+def best_quality(metrics):
+    """
+    Drop-in for the old per-image loop: first image with the highest sharpness
+    wins, and an all-zero batch stays (0, 0).
+    """
+    if len(metrics) == 0:
+        return 0, 0
+    best = int(np.argmax(metrics[:, SHARPNESS]))
+    if metrics[best, SHARPNESS] <= 0:
+        return 0, 0
+    return float(metrics[best, BRIGHTNESS]), float(metrics[best, SHARPNESS])
+
+
+def metrics_as_dict(row):
+    return {field: round(float(value), 4) for field, value in zip(QUALITY_FIELDS, row)}
+
+
+def _prepare_and_score(source):
+    """
+    Runs inside a pool worker: returns (vision_jpeg or None, metrics row, dhash or None).
+    `source` is the upload's bytes or, for spooled uploads, its path (read by the worker itself).
+    A None jpeg means "send the original".
+    """
+    prepared = prepare_image(source)
+    if prepared is None:
+        return None, compute_metrics(None), None
+    return prepared["jpeg"], compute_metrics(prepared), dhash(prepared["gray"])
+
+
+def _init_worker():
+    # A worker only ever decodes and scores images: import numpy/cv2 as it starts, not on its first photo
+    registry.warm_up(["numpy", "cv2"])
+
+
+def _ping():
+    return None
+
+
+def _get_pool():
+    global _pool
+    if settings.QUALITY_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that already runs event loops/threads is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.QUALITY_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+
+def warm_pool():
+    """Starts every pool worker now (WARM_UP startup hook) instead of on the first request's photos."""
+    pool = _get_pool()
+    if pool is not None:
+        for future in [pool.submit(_ping) for _ in range(settings.QUALITY_WORKERS)]:
+            future.result()
+    return pool
+
+
+registry.register("quality_pool", warm_pool)
+
+
+def submit_quality_batch(images):
+    """
+    Schedules every image of a request on the shared pool (`images`: bytes or spooled-upload paths).
+    Returns one awaitable per image (in upload order) resolving to (vision_jpeg, metrics row, dhash),
+    so callers can start the Azure call for an image as soon as its own decode is done.
+    With QUALITY_WORKERS=0 the work runs in threads instead.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    return [loop.run_in_executor(pool, _prepare_and_score, source) for source in images]
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        registry.reset("quality_pool")
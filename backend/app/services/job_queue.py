@@ -0,0 +1,218 @@
+import asyncio
+import json
+import time
+import uuid
+from app.core.config import settings
+from app.core.cache import PersistentCache
+
+# ---------------------------------------------------------
+# BACKGROUND JOBS (/analyze?mode=job + GET /jobs/{id})
+# ---------------------------------------------------------
+# Submitting returns a job id straight away; a fixed number of worker tasks
+# drain a bounded queue, so a burst of uploads queues up instead of holding
+# dozens of HTTP connections open. When the queue is full submit() raises
+# QueueFull and the route answers 503 + Retry-After.
+#
+# Every status change is mirrored to the shared SQLite file, so any uvicorn
+# worker can answer a poll. Live progress (stages finished so far) comes from
+# the in-memory job on the worker that runs it. The SQLite writes happen in a
+# thread, one at a time and in order, so a locked database file never stalls
+# the event loop.
+
+job_store = PersistentCache(
+    "jobs",
+    settings.CACHE_DB_PATH,
+    ttl=settings.JOB_RESULT_TTL,
+    max_entries=settings.JOB_MAX_STORED,
+)
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.ticket = 0  # place in submission order, for queue positions
+        self.progress = {}
+        self.partial = {}
+        self.result = None
+        self.error = None
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "partial": self.partial,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers, depth, result_ttl):
+        self.workers = workers
+        self.depth = depth
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._queue = None
+        self._tasks = []
+        self._writes = None
+        self._writer_task = None
+        self._submitted = 0  # tickets handed out / jobs taken off the queue, for positions
+        self._taken = 0
+
+    def _ensure_workers(self):
+        # asyncio.Queue and the worker tasks belong to the serving event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.depth)
+            self._submitted = self._taken = 0
+            self._writes = asyncio.Queue()
+            self._writer_task = asyncio.create_task(self._writer())
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, kind, handler, discard=None):
+        """
+        Queues `handler(job)` (a coroutine function returning a JSON-safe result).
+        `discard()` releases the job's inputs if it is dropped at shutdown before
+        it ever runs (a job that runs cleans up in its own handler).
+        Raises QueueFull when `depth` jobs are already waiting.
+        """
+        self._ensure_workers()
+        self._purge()
+        job = Job(kind)
+        try:
+            self._queue.put_nowait((job, handler, discard))
+        except asyncio.QueueFull:
+            self.stats["rejected"] += 1
+            raise QueueFull(f"{self.depth} jobs already waiting")
+        self._submitted += 1
+        job.ticket = self._submitted
+        self.jobs[job.id] = job
+        self.stats["submitted"] += 1
+        self._save(job)
+        return job
+
+    def get(self, job_id):
+        self._purge()
+        job = self.jobs.get(job_id)
+        if job is not None:
+            data = job.to_dict()
+            if job.status == "queued":
+                data["position"] = self._position(job)
+            return data
+        # Accepted by another worker (or this one before a restart)
+        data, _ = job_store.get(job_id)
+        return data
+
+    def _position(self, job):
+        # The queue is FIFO: everything submitted before this job and not yet taken is ahead of it
+        return max(0, job.ticket - self._taken)
+
+    async def _worker(self):
+        while True:
+            job, handler, _ = await self._queue.get()
+            self._taken += 1
+            job.status = "running"
+            job.started_at = time.time()
+            self._save(job)
+            try:
+                # Round-trip through JSON so the stored copy and the live one match
+                job.result = json.loads(json.dumps(await handler(job), default=str))
+                job.status = "done"
+                self.stats["completed"] += 1
+            except asyncio.CancelledError:
+                job.status = "failed"
+                job.error = "cancelled"
+                raise
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {e}")
+                job.status = "failed"
+                job.error = str(e)
+                self.stats["failed"] += 1
+            finally:
+                job.finished_at = time.time()
+                self._save(job)
+                self._queue.task_done()
+
+    def _save(self, job):
+        """Snapshots the job now and queues the write; never raises (it runs in the worker's finally)."""
+        try:
+            data = job.to_dict()
+            try:
+                # Round-trip through JSON: a frozen copy, and a bad value fails here, not in the writer
+                data = json.loads(json.dumps(data, default=str))
+            except (TypeError, ValueError) as e:
+                # Keep the status visible to other workers even if the partial results can't be stored
+                print(f"⚠️ Job {job.id} partial results not saved: {e}")
+                data = json.loads(json.dumps({**data, "partial": {}}, default=str))
+            self._writes.put_nowait((job.id, data))
+        except Exception as e:
+            print(f"⚠️ Job {job.id} state not saved: {e}")
+
+    async def _writer(self):
+        while True:
+            job_id, data = await self._writes.get()
+            try:
+                await asyncio.to_thread(job_store.set, job_id, data)
+            except Exception as e:
+                print(f"⚠️ Job {job_id} state not saved: {e}")
+            finally:
+                self._writes.task_done()
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        for job_id in [j.id for j in self.jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["queued"] = self._queue.qsize() if self._queue else 0
+        stats["running"] = sum(1 for j in self.jobs.values() if j.status == "running")
+        stats["workers"] = self.workers
+        stats["depth"] = self.depth
+        return stats
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            # Jobs nobody started: settle them for pollers and free their uploads
+            while not self._queue.empty():
+                job, _, discard = self._queue.get_nowait()
+                job.status = "failed"
+                job.error = "cancelled"
+                job.finished_at = time.time()
+                self._save(job)
+                if discard is not None:
+                    try:
+                        discard()
+                    except Exception as e:
+                        print(f"⚠️ Job {job.id} inputs not released: {e}")
+        if self._writer_task is not None:
+            # Let the final "cancelled" states reach SQLite before stopping the writer
+            try:
+                await asyncio.wait_for(self._writes.join(), timeout=5)
+            except asyncio.TimeoutError:
+                print("⚠️ Job state writes still pending at shutdown")
+            self._writer_task.cancel()
+            await asyncio.gather(self._writer_task, return_exceptions=True)
+            self._writer_task = None
+        self._queue = None
+
+
+job_queue = JobQueue(settings.JOB_WORKERS, settings.JOB_QUEUE_DEPTH, settings.JOB_RESULT_TTL)
@@ -1,35 +1,92 @@
-import os
+import copy
+import hashlib
 import json
-from groq import Groq
-from dotenv import load_dotenv
 import datetime
+from app.core.config import settings
+from app.core.cache import LRUCache
+from app.core.singleflight import SingleFlight
+from app.core.telemetry import span, mark_fallback
+from app.services import groq_client
 
-load_dotenv()
+MODEL = "llama-3.1-8b-instant"
 
-# Initialize Groq Client
-client = None
-api_key = os.getenv("GROQ_API_KEY")
-
-if api_key:
-    client = Groq(api_key=api_key)
-else:
+if not groq_client.is_configured():
     print("⚠️ WARNING: Groq API Key missing. Listings will be templates.")
 
 # ---------------------------------------------------------
-# 1. THE PRODUCT DETECTIVE (Name, Material, Exclusions)
+# RESPONSE CACHE (model + temperature + normalized prompt)
 # ---------------------------------------------------------
-def analyze_product_details(tags, caption):
-    """
-    Identifies Name, Material, AND Search Exclusions (Noise).
-    Smarter at ignoring props (like shoes/models) in multi-photo uploads.
-    """
-    if not client:
-        return {"name": "Handcrafted Item", "material": "Standard", "exclusions": []}
+llm_cache = LRUCache(max_entries=settings.LLM_CACHE_MAX_ENTRIES)
+# Concurrent identical prompts share one Groq call. Creative helpers only join in
+# when their answers are cached anyway (otherwise each seller gets their own copy).
+llm_flight = SingleFlight("llm")
+COALESCED_HELPERS = ("product_details", "selling_points", "pricing")
+
+def _seconds_until_month_end(now=None):
+    now = now or datetime.datetime.now()
+    next_month = (now.replace(day=1) + datetime.timedelta(days=32)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return max(1, int((next_month - now).total_seconds()))
+
+def _cache_ttl(helper):
+    """Per-helper TTL in seconds, or None when the helper opts out of caching."""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if helper == "product_details":
+        return settings.LLM_CACHE_TTL_PRODUCT
+    if helper == "selling_points":
+        return settings.LLM_CACHE_TTL_KEYWORDS
+    if helper == "pricing":
+        # The prompt embeds current_month, so never let an answer outlive the month
+        return min(settings.LLM_CACHE_TTL_PRICING, _seconds_until_month_end())
+    if helper in ("listings", "photo_critique", "fused") and settings.LLM_CACHE_CREATIVE:
+        return settings.LLM_CACHE_TTL_CREATIVE
+    return None
+
+def _cache_key(prompt, temperature, extra):
+    normalized = " ".join(prompt.split())
+    digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    return f"{MODEL}|{temperature}|{sorted(extra.items())}|{digest}"
+
+def get_llm_cache_stats():
+    stats = llm_cache.get_stats()
+    stats["single_flight"] = llm_flight.get_stats()
+    return stats
+
+async def _acomplete(prompt, temperature, helper, **extra):
+    """One JSON-mode chat call on the shared pooled client (no worker thread held while waiting)."""
+    cache_ttl = _cache_ttl(helper)
+    key = _cache_key(prompt, temperature, extra)
+    if cache_ttl:
+        cached = llm_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+    async def call():
+        with span(f"groq.{helper}", external="groq"):
+            completion = await groq_client.achat(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                response_format={"type": "json_object"},
+                **extra
+            )
+            data = json.loads(completion.choices[0].message.content)
+        if cache_ttl:
+            llm_cache.set(key, copy.deepcopy(data), ttl=cache_ttl)
+        return data
+
+    if cache_ttl or helper in COALESCED_HELPERS:
+        return copy.deepcopy(await llm_flight.ado(key, call))
+    return await call()
 
-    prompt = f"""
+# ---------------------------------------------------------
+# 1. THE PRODUCT DETECTIVE (Name, Material, Exclusions)
+# ---------------------------------------------------------
+def _product_details_prompt(tags, caption):
+    return f"""
     You are an Expert Visual Merchandiser. Analyze the following GALLERY of images for a SINGLE product listing.
     
-    DETECTED TAGS: {', '.join(tags)}
+    DETECTED TAGS: {', '.join(sorted(tags))}
 
     ⚠️ WARNING: Computer Vision tags are often visually similar but contextually wrong.
     - Example: It might tag a "Pen" as an "Arrow" or "Weapon" because they are both thin and straight.
@@ -71,32 +128,28 @@ def analyze_product_details(tags, caption):
     }}
     """
 
+async def analyze_product_details_async(tags, caption):
+    """
+    Identifies Name, Material, AND Search Exclusions (Noise).
+    Smarter at ignoring props (like shoes/models) in multi-photo uploads.
+    """
+    if not groq_client.is_configured():
+        return {"name": "Handcrafted Item", "material": "Standard", "exclusions": []}
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2, # Low temp for strict logic
-            response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)
+        return await _acomplete(_product_details_prompt(tags, caption), temperature=0.2, helper="product_details") # Low temp for strict logic
     except Exception as e:
         print(f"🕵️ AI Detective Error: {e}")
+        mark_fallback("llm.product_details")
         return None
 
 # ---------------------------------------------------------
 # 2. THE PRICING STRATEGIST (Price & Reason)
 # ---------------------------------------------------------
-def analyze_complex_pricing(product_name, material, market_data):
-    """
-    Inputs: Market Min/Max/Avg.
-    Output: Optimal Price + Strategic Explanation.
-    """
-    if not client:
-        return {"recommended_price": int(market_data['avg'] * 1.1), "strategy": "Standard Markup"}
-
+def _pricing_prompt(product_name, material, market_data):
     current_month = datetime.datetime.now().strftime("%B")
     
-    prompt = f"""
+    return f"""
     Act as a Senior Pricing Strategist.
     
     Product: {product_name} | Material: {material} | Month: {current_month}
@@ -114,29 +167,26 @@ def analyze_complex_pricing(product_name, material, market_data):
     }}
     """
 
+async def analyze_complex_pricing_async(product_name, material, market_data):
+    """
+    Inputs: Market Min/Max/Avg.
+    Output: Optimal Price + Strategic Explanation.
+    """
+    if not groq_client.is_configured():
+        return {"recommended_price": int(market_data['avg'] * 1.1), "strategy": "Standard Markup"}
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)
+        return await _acomplete(_pricing_prompt(product_name, material, market_data), temperature=0.3, helper="pricing")
     except Exception as e:
         print(f"Pricing AI Error: {e}")
+        mark_fallback("llm.pricing")
         return {"recommended_price": int(market_data['avg'] * 1.1), "strategy": "Safe average markup."}
 
 # ---------------------------------------------------------
 # 3. THE COPYWRITER (Listings)
 # ---------------------------------------------------------
-def generate_creative_listings(product_name, material, tags, price, caption):
-    """
-    Generates 100% AI-written listings adapting tone to the product.
-    """
-    if not client:
-        return None
-
-    prompt = f"""
+def _listings_prompt(product_name, material, price, caption):
+    return f"""
     Act as an expert E-Commerce Copywriter.
     
     Product: {product_name} ({material})
@@ -158,32 +208,27 @@ def generate_creative_listings(product_name, material, tags, price, caption):
     }}
     """
 
+async def generate_creative_listings_async(product_name, material, tags, price, caption):
+    """
+    Generates 100% AI-written listings adapting tone to the product.
+    """
+    if not groq_client.is_configured():
+        return None
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=1024,
-            response_format={"type": "json_object"}
-        )
-        return json.loads(completion.choices[0].message.content)
+        return await _acomplete(_listings_prompt(product_name, material, price, caption), temperature=0.3, max_tokens=1024, helper="listings")
     except Exception as e:
         print(f"Content Gen Error: {e}")
+        mark_fallback("llm.listings")
         return None
 
 # ---------------------------------------------------------
 # 4. THE PHOTOGRAPHY COACH (Advice)
 # ---------------------------------------------------------
-def generate_photo_critique(product_name, quality_stats, tags):
-    """
-    Acts as a professional photographer giving specific advice.
-    """
-    if not client:
-        return None
-
+def _photo_critique_prompt(product_name, quality_stats):
     brightness, sharpness = quality_stats
     
-    prompt = f"""
+    return f"""
     Act as a Photo Mentor.
     Product: {product_name}
     Stats: Brightness {int(brightness)} (0-255), Sharpness {int(sharpness)} (0-1000).
@@ -194,28 +239,23 @@ def generate_photo_critique(product_name, quality_stats, tags):
     {{ "tips": ["Tip 1", "Tip 2"] }}
     """
 
+async def generate_photo_critique_async(product_name, quality_stats, tags):
+    """
+    Acts as a professional photographer giving specific advice.
+    """
+    if not groq_client.is_configured():
+        return None
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-            response_format={"type": "json_object"}
-        )
-        data = json.loads(completion.choices[0].message.content)
+        data = await _acomplete(_photo_critique_prompt(product_name, quality_stats), temperature=0.5, helper="photo_critique")
         return data.get("tips", [])
     except Exception as e:
         print(f"📸 Photo Coach Error: {e}")
+        mark_fallback("llm.photo_critique")
         return None
     
-def extract_selling_points(text):
-    """
-    Extracts high-value keywords from user input to force into the search.
-    Replaces azure_text.py.
-    """
-    if not client or not text:
-        return []
-
-    prompt = f"""
+def _selling_points_prompt(text):
+    return f"""
     Extract 3-5 specific, high-value e-commerce search keywords from this user description.
     Focus on materials, styles, or unique features.
     
@@ -227,16 +267,138 @@ def extract_selling_points(text):
     }}
     """
 
+async def extract_selling_points_async(text):
+    """
+    Extracts high-value keywords from user input to force into the search.
+    Replaces azure_text.py.
+    """
+    if not groq_client.is_configured() or not text:
+        return []
+
     try:
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1, # Low temp = strict extraction
-            response_format={"type": "json_object"}
-        )
-        data = json.loads(completion.choices[0].message.content)
+        data = await _acomplete(_selling_points_prompt(text), temperature=0.1, helper="selling_points") # Low temp = strict extraction
         return data.get("keywords", [])
     except Exception as e:
         print(f"🔑 Keyword Extraction Error: {e}")
+        mark_fallback("llm.selling_points")
         # Fallback: Simple split if AI fails
-        return [w.strip() for w in text.split() if len(w) > 3]
\ No newline at end of file
+        return [w.strip() for w in text.split() if len(w) > 3]
+
+# ---------------------------------------------------------
+# 6. FUSED MODE (Pricing + Listings + Photo Tips in ONE call)
+# ---------------------------------------------------------
+# The final price is only known after psychological rounding, so the model
+# writes this placeholder and fill_price_placeholder() swaps the real price in.
+PRICE_PLACEHOLDER = "[PRICE]"
+
+def _fused_prompt(product_name, material, market_data, caption, quality_stats):
+    current_month = datetime.datetime.now().strftime("%B")
+    brightness, sharpness = quality_stats
+
+    return f"""
+    You are a Senior Pricing Strategist, an expert E-Commerce Copywriter and a Photo Mentor.
+    
+    Product: {product_name} | Material: {material} | Month: {current_month}
+    Context: {caption}
+    Market Data:
+    - Low: ₹{market_data['min']} | Avg: ₹{market_data['avg']} | High: ₹{market_data['max']}
+    Photo Stats: Brightness {int(brightness)} (0-255), Sharpness {int(sharpness)} (0-1000).
+
+    Tasks:
+    1. PRICING: Determine Optimal Selling Price.
+       Analyze: Seasonality ({material} in {current_month}?), Trends, and Artisan Premium.
+    2. LISTINGS: Identify Product Category (Tech, Fashion, Home) and write 3 distinct listings:
+       - **Amazon:** Title + 5 Bullet points (Tailored to category).
+       - **Instagram:** Trendy caption with emojis/hashtags.
+       - **WhatsApp:** Polite, direct sales message.
+       Wherever the price appears, write exactly {PRICE_PLACEHOLDER} (do NOT write a number).
+    3. PHOTO TIPS: Provide 2 short, specific tips to improve the photo for THIS item.
+
+    Output JSON ONLY:
+    {{
+        "pricing": {{ "recommended_price": <integer_value>, "strategy": "Max 15 words explanation." }},
+        "listings": {{
+            "amazon": {{ "title": "...", "features": ["..."] }},
+            "instagram": "...",
+            "whatsapp": "..."
+        }},
+        "tips": ["Tip 1", "Tip 2"]
+    }}
+    """
+
+def _valid_pricing(data):
+    if not isinstance(data, dict) or not isinstance(data.get("strategy"), str):
+        return None
+    try:
+        price = int(float(data.get("recommended_price")))
+    except (TypeError, ValueError):
+        return None
+    if price <= 0:
+        return None
+    return {"recommended_price": price, "strategy": data["strategy"]}
+
+def _valid_listings(data):
+    if not isinstance(data, dict):
+        return None
+    amazon = data.get("amazon")
+    if not isinstance(amazon, dict) or not isinstance(amazon.get("title"), str):
+        return None
+    features = amazon.get("features")
+    if not isinstance(features, list) or not features or not all(isinstance(f, str) for f in features):
+        return None
+    if not isinstance(data.get("instagram"), str) or not isinstance(data.get("whatsapp"), str):
+        return None
+    return data
+
+def _valid_tips(data):
+    if not isinstance(data, list) or not data or not all(isinstance(t, str) for t in data):
+        return None
+    return data
+
+def _split_fused(data):
+    """
+    Validates each section against the shape the per-helper call would return.
+    Sections that fail come back as None so the caller can fall back per helper.
+    """
+    if not isinstance(data, dict):
+        data = {}
+    bundle = {
+        "pricing": _valid_pricing(data.get("pricing")),
+        "listings": _valid_listings(data.get("listings")),
+        "tips": _valid_tips(data.get("tips")),
+    }
+    failed = [name for name, section in bundle.items() if section is None]
+    if failed:
+        print(f"🧩 Fused response incomplete, falling back for: {failed}")
+        for name in failed:
+            mark_fallback(f"llm.fused.{name}")
+    return bundle
+
+async def generate_fused_bundle_async(product_name, material, market_data, caption, quality_stats):
+    """
+    One round trip instead of three (pricing, listings, photo tips).
+    Returns {"pricing", "listings", "tips"}; any section may be None.
+    """
+    if not groq_client.is_configured():
+        return {"pricing": None, "listings": None, "tips": None}
+
+    try:
+        data = await _acomplete(
+            _fused_prompt(product_name, material, market_data, caption, quality_stats),
+            temperature=0.3, max_tokens=1536, helper="fused"
+        )
+    except Exception as e:
+        print(f"🧩 Fused LLM Error: {e}")
+        mark_fallback("llm.fused")
+        data = None
+    return _split_fused(data)
+
+def fill_price_placeholder(content, price):
+    """Recursively replaces PRICE_PLACEHOLDER in every string of a listings payload."""
+    if isinstance(content, str):
+        return content.replace(PRICE_PLACEHOLDER, str(price))
+    if isinstance(content, list):
+        return [fill_price_placeholder(item, price) for item in content]
+    if isinstance(content, dict):
+        return {key: fill_price_placeholder(value, price) for key, value in content.items()}
+    return content
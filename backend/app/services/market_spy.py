@@ -1,8 +1,21 @@
 import re
+import copy
 import time
+import threading
+import contextvars
 import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 from urllib.parse import urlparse
-from ddgs import DDGS
+from app.core.config import settings
+from app.core.cache import PersistentCache
+from app.core.registry import lazy_module
+from app.core.singleflight import SingleFlight
+from app.core.resilience import AdaptiveTokenBucket, CircuitBreaker, backoff_delay
+from app.core.telemetry import span, mark_fallback, register_gauges
+from app.services.market_yield import site_yield, product_category, sample_is_sufficient
+from app.services.price_index import price_index
+
+ddgs = lazy_module("ddgs")
 
 # ❌ BAD WORDS (Noise to ignore)
 # NEGATIVE_KEYWORDS = ["cover", "sheet", "pillow", "cushion", "protector", "toy", "miniature", "poster", "sticker"]
@@ -18,6 +31,40 @@ TRUSTED_SITES = [
     "croma.com"
 ]
 
+market_cache = PersistentCache(
+    "market",
+    settings.CACHE_DB_PATH,
+    ttl=settings.MARKET_CACHE_TTL,
+    stale_ttl=settings.MARKET_CACHE_STALE_TTL,
+    max_entries=settings.MARKET_CACHE_MAX_ENTRIES,
+)
+_refreshing = set()
+_refresh_lock = threading.Lock()
+# Identical concurrent sweeps (same normalized query + exclusions) share one scan
+market_flight = SingleFlight("market")
+
+# One DDGS pace for the whole process; one breaker per site
+ddgs_bucket = AdaptiveTokenBucket(
+    "ddgs",
+    rate=settings.DDGS_RATE,
+    min_rate=settings.DDGS_MIN_RATE,
+    max_rate=settings.DDGS_MAX_RATE,
+    burst=settings.DDGS_BURST,
+)
+site_breakers = {
+    site: CircuitBreaker(site, settings.MARKET_BREAKER_FAILURES, settings.MARKET_BREAKER_COOLDOWN)
+    for site in TRUSTED_SITES
+}
+
+register_gauges(
+    "setu_market_circuit_open", "1 while a site's circuit breaker is skipping it.",
+    lambda: {site: int(b.is_open()) for site, b in site_breakers.items()}, label="site",
+)
+register_gauges(
+    "setu_ddgs_rate", "Current adaptive DuckDuckGo query rate (per second).",
+    lambda: {"ddgs": ddgs_bucket.get_state()["rate_per_second"]}, label="upstream",
+)
+
 def extract_domain(url):
     """
     Extracts a clean site name from the URL.
@@ -59,68 +106,306 @@ def remove_outliers(prices):
     clean_prices = prices[cut_bottom : count - cut_top]
     return clean_prices if clean_prices else prices
 
-def get_market_data(query, exclusions=[]):
+def summarize_prices(all_prices, sources):
+    """min / max / median of the prices left after remove_outliers()."""
+    cleaned_prices = remove_outliers(all_prices)
+    if not cleaned_prices:
+        return None
+
+    median_price = int(statistics.median(cleaned_prices))
+
+    return {
+        "min": min(cleaned_prices),
+        "max": max(cleaned_prices),
+        "avg": median_price,
+        "sources": list(sources)
+    }
+
+def scan_site(site, query, exclusions, deadline=None, category=None, material=None, timeout=None):
     """
-    Attempts to fetch prices from EACH trusted site individually
-    using DuckDuckGo search snippets.
+    Queries a single trusted site and returns (prices, sources) found in its snippets.
+    Calls are paced by the shared DDGS bucket and skipped while the site's breaker is open.
+    No new attempt starts `timeout` seconds (MARKET_SITE_TIMEOUT) after this site's scan
+    began, or after an earlier `deadline` (time.monotonic()), so abandoned scans stop quickly.
+    With a `category`, the outcome of a successful query feeds the site's yield stats and
+    every price found goes into the local price index.
     """
-    all_prices = []
-    sources = set()
-
+    site_deadline = time.monotonic() + (timeout or settings.MARKET_SITE_TIMEOUT)
+    if deadline is not None:
+        site_deadline = min(site_deadline, deadline)
     negatives = " ".join([f"-{w}" for w in exclusions])
+    search_term = f"{query} price {negatives} site:{site}"
+    print(f"🕵️ Scanning {site} → '{search_term}'")
 
-    for site in TRUSTED_SITES:
-        search_term = f"{query} price {negatives} site:{site}"
-        print(f"🕵️ Scanning {site} → '{search_term}'")
+    breaker = site_breakers[site]
+    if not breaker.allow():
+        print(f"🚧 Skipping {site}: circuit open")
+        return [], set()
 
-        max_retries = 3
-        results = []
+    max_retries = settings.MARKET_MAX_RETRIES
+    results = []
+    attempted = False
+    answered = False
 
-        for attempt in range(max_retries):
-            try:
-                time.sleep(1)
-                results = list(DDGS().text(
+    for attempt in range(max_retries):
+        if attempt:
+            if breaker.is_open():
+                break
+            time.sleep(backoff_delay(attempt - 1, settings.MARKET_BACKOFF_BASE, settings.MARKET_BACKOFF_CAP))
+        budget = site_deadline - time.monotonic()
+        if budget <= 0 or not ddgs_bucket.acquire(timeout=budget):
+            print(f"🚦 {site}: no DDGS slot before the deadline, giving up")
+            break
+        attempted = True
+        try:
+            with span("ddgs", external="ddgs", site=site, attempt=attempt + 1):
+                results = list(ddgs.DDGS().text(
                     search_term,
                     region="in-en",
                     max_results=5
                 ))
-                break
-            except Exception as e:
-                print(f"⚠️ {site} attempt {attempt+1}/{max_retries} failed: {e}")
-                time.sleep(2)
+            ddgs_bucket.on_success()
+            breaker.record_success()
+            answered = True
+            break
+        except Exception as e:
+            print(f"⚠️ {site} attempt {attempt+1}/{max_retries} failed: {e}")
+            # DDGS failures are nearly always throttling (ratelimit / timeout): back the shared pace off
+            ddgs_bucket.on_throttle()
+            breaker.record_failure()
+
+    if not attempted:
+        breaker.release()
+
+    prices = []
+    sources = set()
+    observations = []
 
-        if not results:
-            print(f"⚠️ No results from {site}")
+    if not results:
+        print(f"⚠️ No results from {site}")
+        if answered and category:
+            site_yield.record(category, site, 0)
+        return prices, sources
+
+    for result in results:
+        title = result.get("title", "")
+        body = result.get("body", "")
+        url = result.get("href", "")
+
+        if any(bad.lower() in title.lower() for bad in exclusions):
             continue
 
-        for result in results:
-            title = result.get("title", "")
-            body = result.get("body", "")
-            url = result.get("href", "")
+        found = extract_prices(title + " " + body)
 
-            if any(bad.lower() in title.lower() for bad in exclusions):
-                continue
+        if found:
+            domain = extract_domain(url)
+            prices.extend(found)
+            sources.add(domain)
+            observations.extend((title, domain, price) for price in found)
+            print(f"   ✅ {site}: {found}")
 
-            found = extract_prices(title + " " + body)
+    if category:
+        site_yield.record(category, site, len(prices))
+        price_index.record(category, material or "", site, query, observations)
+    return prices, sources
 
-            if found:
-                all_prices.extend(found)
-                sources.add(extract_domain(url))
-                print(f"   ✅ {site}: {found}")
+def scan_sites_concurrently(query, exclusions, concurrency=None, site_timeout=None, category=None, material=None):
+    """
+    Queries all trusted sites in parallel.
+    Returns {site: (prices, sources)} for the sites that answered in time.
+    Each site gets `site_timeout` from when a worker picks it up; the total wait
+    is bounded by one timeout per wave of `concurrency` sites.
+    """
+    concurrency = max(1, concurrency or settings.MARKET_SCAN_CONCURRENCY)
+    site_timeout = site_timeout or settings.MARKET_SITE_TIMEOUT
+    waves = -(-len(TRUSTED_SITES) // concurrency)
 
-    if not all_prices:
-        print("⚠️ No prices found across all sites.")
+    site_results = {}
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="market-spy")
+    # copy_context() so each site's spans land on the calling request's trace
+    futures = {
+        executor.submit(contextvars.copy_context().run, scan_site, site, query, exclusions, None, category, material, site_timeout): site
+        for site in TRUSTED_SITES
+    }
+
+    try:
+        for future in as_completed(futures, timeout=site_timeout * waves):
+            site = futures[future]
+            try:
+                site_results[site] = future.result()
+            except Exception as e:
+                print(f"⚠️ {site} scan crashed: {e}")
+    except FuturesTimeout:
+        slow = [futures[f] for f in futures if not f.done()]
+        print(f"⏱️ Gave up waiting on {slow} after {site_timeout * waves:.0f}s")
+    finally:
+        # Don't block the request on stragglers; they finish in the background.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return site_results
+
+def scan_sites_adaptive(query, exclusions, category, concurrency=None, site_timeout=None, material=None):
+    """
+    Queries sites in waves of `concurrency`, best historical yield for this
+    category first, and stops after the wave where the cleaned prices become
+    sufficient (sample_is_sufficient). Returns {site: (prices, sources)}.
+    Every site in a wave gets `site_timeout`; a wave that overruns it ends the scan.
+    """
+    concurrency = max(1, concurrency or settings.MARKET_SCAN_CONCURRENCY)
+    site_timeout = site_timeout or settings.MARKET_SITE_TIMEOUT
+    ordered = site_yield.rank_sites(TRUSTED_SITES, category)
+    waves = [ordered[i:i + concurrency] for i in range(0, len(ordered), concurrency)]
+
+    site_results = {}
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="market-spy")
+    try:
+        for number, wave in enumerate(waves, start=1):
+            deadline = time.monotonic() + site_timeout
+            futures = {
+                executor.submit(contextvars.copy_context().run, scan_site, site, query, exclusions, deadline, category, material): site
+                for site in wave
+            }
+            try:
+                for future in as_completed(futures, timeout=site_timeout):
+                    site = futures[future]
+                    try:
+                        site_results[site] = future.result()
+                    except Exception as e:
+                        print(f"⚠️ {site} scan crashed: {e}")
+            except FuturesTimeout:
+                slow = [futures[f] for f in futures if not f.done()]
+                print(f"⏱️ Gave up waiting on {slow}")
+                break
+
+            prices = [p for found, _ in site_results.values() for p in found]
+            if sample_is_sufficient(remove_outliers(prices)):
+                skipped = [site for later in waves[number:] for site in later]
+                if skipped:
+                    print(f"🎯 {len(prices)} consistent prices after {number} wave(s); skipping {skipped}")
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return site_results
+
+def market_cache_key(query, exclusions):
+    """
+    "Cotton  Kurta " + ["Shoes"] and "cotton kurta" + ["shoes"] share one entry.
+    """
+    norm_query = " ".join(query.lower().split())
+    norm_exclusions = sorted({w.strip().lower() for w in exclusions if w.strip()})
+    return f"{norm_query}|{','.join(norm_exclusions)}"
+
+def _refresh_in_background(key, query, exclusions, mode, category=None, material=None):
+    with _refresh_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def refresh():
+        try:
+            print(f"🔄 Refreshing stale market data for '{query}'")
+            data = scan_market(query, exclusions, mode, category, material)
+            if data:
+                market_cache.set(key, data)
+        except Exception as e:
+            print(f"⚠️ Background market refresh failed: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=refresh, name="market-refresh", daemon=True).start()
+
+def get_market_stats():
+    stats = market_cache.get_stats()
+    stats["refreshing"] = len(_refreshing)
+    stats["single_flight"] = market_flight.get_stats()
+    stats["ddgs_limiter"] = ddgs_bucket.get_state()
+    stats["breakers"] = {site: b.get_state() for site, b in site_breakers.items()}
+    stats["site_yield"] = site_yield.get_stats()
+    stats["price_index"] = price_index.get_stats()
+    return stats
+
+def get_local_market_data(category, material, product="", keywords=(), exclusions=()):
+    """
+    Answers from the local price index when it has enough recent, agreeing
+    observations (PRICE_INDEX_MIN_MATCHES, spread as in sample_is_sufficient).
+    Returns the same shape as scan_market(), or None when coverage is thin.
+    """
+    if not settings.PRICE_INDEX_ENABLED:
+        return None
+    with span("price_index.lookup", category=category):
+        matches = price_index.lookup(category, material, product, keywords, exclusions)
+    if not matches:
         return None
 
-    cleaned_prices = remove_outliers(all_prices)
-    if not cleaned_prices:
+    prices = [price for price, _ in matches]
+    if not sample_is_sufficient(remove_outliers(list(prices)), min_prices=settings.PRICE_INDEX_MIN_MATCHES):
+        print(f"📚 Price index: {len(prices)} local price(s) for '{material} {category}', not enough")
         return None
 
-    median_price = int(statistics.median(cleaned_prices))
+    price_index.mark_hit()
+    print(f"📚 Price index hit: {len(prices)} local price(s) for '{material} {category}'")
+    return summarize_prices(prices, {domain for _, domain in matches})
 
-    return {
-        "min": min(cleaned_prices),
-        "max": max(cleaned_prices),
-        "avg": median_price,
-        "sources": list(sources)
-    }
+def get_market_data(query, exclusions=[], mode=None, category=None, material=None):
+    """
+    Cached front door for scan_market().
+    Fresh hits return instantly; stale hits return instantly and trigger a background refresh.
+    """
+    key = market_cache_key(query, exclusions)
+    if not settings.MARKET_CACHE_ENABLED:
+        return copy.deepcopy(market_flight.do(key, lambda: scan_market(query, exclusions, mode, category, material)))
+
+    cached, state = market_cache.get(key)
+
+    if state == "fresh":
+        print(f"⚡ Market cache hit for '{key}'")
+        return cached
+    if state == "stale":
+        print(f"🕰️ Serving stale market data for '{key}'")
+        _refresh_in_background(key, query, exclusions, mode, category, material)
+        return cached
+
+    def sweep():
+        data = scan_market(query, exclusions, mode, category, material)
+        # Only successful scans are cached; a failed sweep should be retried next time
+        if data:
+            market_cache.set(key, data)
+        return data
+
+    return copy.deepcopy(market_flight.do(key, sweep))
+
+def scan_market(query, exclusions=[], mode=None, category=None, material=None):
+    """
+    Attempts to fetch prices from the trusted sites individually
+    using DuckDuckGo search snippets.
+    mode: "adaptive" (default, from settings), "concurrent" (always all sites) or "sequential".
+    category: product category for yield tracking (defaults to the query's last word).
+    material: stored with every price found, for later get_local_market_data() lookups.
+    """
+    mode = mode or settings.MARKET_SCAN_MODE
+    category = category or product_category(query)
+
+    if mode == "sequential":
+        site_results = {site: scan_site(site, query, exclusions, category=category, material=material) for site in TRUSTED_SITES}
+    elif mode == "concurrent":
+        site_results = scan_sites_concurrently(query, exclusions, category=category, material=material)
+    else:
+        site_results = scan_sites_adaptive(query, exclusions, category, material=material)
+
+    # Merge in TRUSTED_SITES order so the result doesn't depend on who answered first
+    all_prices = []
+    sources = set()
+    for site in TRUSTED_SITES:
+        if site in site_results:
+            prices, site_sources = site_results[site]
+            all_prices.extend(prices)
+            sources.update(site_sources)
+
+    if not all_prices:
+        print("⚠️ No prices found across all sites.")
+        mark_fallback("market.no_prices")
+        return None
+
+    return summarize_prices(all_prices, sources)
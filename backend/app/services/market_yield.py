@@ -0,0 +1,119 @@
+import sqlite3
+import statistics
+import time
+from app.core.config import settings
+from app.core.cache import SQLiteFile
+
+# ---------------------------------------------------------
+# SITE YIELD STATS (which sites actually return prices, per category)
+# ---------------------------------------------------------
+# Every successful site query records whether its snippets contained prices.
+# The adaptive scan asks the most productive sites first and stops as soon as
+# the cleaned sample is big and tight enough (see sample_is_sufficient).
+#
+# Counts live in the shared SQLite file next to the caches, so every worker
+# learns from every other worker's scans and the ranking survives restarts.
+
+PRIOR_WEIGHT = 4  # pseudo-queries of the site's overall hit rate mixed into each category
+
+
+def product_category(product_name):
+    """"Banarasi Silk Sarees" -> "saree": the head noun is the last word."""
+    words = (product_name or "").lower().split()
+    if not words:
+        return "item"
+    word = "".join(ch for ch in words[-1] if ch.isalnum()) or "item"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+    return word
+
+
+class SiteYieldStats:
+    def __init__(self, path):
+        self.path = path
+        self._db = SQLiteFile(path, [
+            "CREATE TABLE IF NOT EXISTS site_yield ("
+            " category TEXT NOT NULL,"
+            " site TEXT NOT NULL,"
+            " queries INTEGER NOT NULL DEFAULT 0,"
+            " hits INTEGER NOT NULL DEFAULT 0,"
+            " prices INTEGER NOT NULL DEFAULT 0,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (category, site))",
+        ])
+
+    def _conn(self):
+        return self._db.connect()
+
+    def record(self, category, site, price_count):
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT INTO site_yield (category, site, queries, hits, prices, updated_at) VALUES (?, ?, 1, ?, ?, ?)"
+                    " ON CONFLICT (category, site) DO UPDATE SET"
+                    " queries = queries + 1, hits = hits + excluded.hits,"
+                    " prices = prices + excluded.prices, updated_at = excluded.updated_at",
+                    (category, site, int(price_count > 0), price_count, time.time()),
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Yield stats write failed: {e}")
+
+    def _rows(self, category=None):
+        query = "SELECT category, site, queries, hits, prices FROM site_yield"
+        params = ()
+        if category is not None:
+            query += " WHERE category = ?"
+            params = (category,)
+        try:
+            return self._conn().execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Yield stats read failed: {e}")
+            return []
+
+    def rank_sites(self, sites, category):
+        """
+        Sites ordered by estimated chance of returning prices for this category.
+        The category's own history is shrunk towards the site's overall hit rate,
+        so a new category starts from what the site does in general. Ties (e.g.
+        no history at all) keep the given order.
+        """
+        overall = {}
+        for _, site, queries, hits, _ in self._rows():
+            q, h = overall.get(site, (0, 0))
+            overall[site] = (q + queries, h + hits)
+        local = {site: (queries, hits) for _, site, queries, hits, _ in self._rows(category)}
+
+        def score(site):
+            g_queries, g_hits = overall.get(site, (0, 0))
+            prior = (g_hits + 1) / (g_queries + 2)
+            c_queries, c_hits = local.get(site, (0, 0))
+            return (c_hits + PRIOR_WEIGHT * prior) / (c_queries + PRIOR_WEIGHT)
+
+        return sorted(sites, key=score, reverse=True)
+
+    def get_stats(self, category=None):
+        stats = {}
+        for cat, site, queries, hits, prices in self._rows(category):
+            stats.setdefault(cat, {})[site] = {
+                "queries": queries,
+                "hit_rate": round(hits / queries, 3) if queries else 0.0,
+                "prices_per_query": round(prices / queries, 2) if queries else 0.0,
+            }
+        return stats
+
+
+def sample_is_sufficient(prices, min_prices=None, max_spread=None):
+    """
+    True once the cleaned prices are numerous and tight enough for a stable average:
+    at least `min_prices` of them, with interquartile range / median <= `max_spread`.
+    """
+    min_prices = settings.MARKET_MIN_PRICES if min_prices is None else min_prices
+    max_spread = settings.MARKET_MAX_SPREAD if max_spread is None else max_spread
+    if len(prices) < max(min_prices, 2):
+        return False
+    q1, median, q3 = statistics.quantiles(prices, n=4)
+    return median > 0 and (q3 - q1) / median <= max_spread
+
+
+site_yield = SiteYieldStats(settings.CACHE_DB_PATH)
@@ -0,0 +1,218 @@
+import re
+import sqlite3
+import threading
+import time
+from app.core.config import settings
+from app.core.cache import SQLiteFile
+
+# ---------------------------------------------------------
+# LOCAL PRICE INDEX (every price the Market Spy has ever seen)
+# ---------------------------------------------------------
+# scan_site() records each price it extracts, together with the listing title,
+# the query that found it, the product category/material and the source site.
+# Before going to the web, the pricing step asks this index for recent
+# observations of the same product + material (+ seller keywords). When
+# there are enough of them, and they agree, the answer comes from here in
+# milliseconds and no DuckDuckGo query is made.
+#
+# Titles and queries are searched with SQLite FTS5 when the build has it,
+# otherwise with plain LIKE filters. Rows live in the shared cache file, so
+# every worker contributes to and benefits from the same index.
+
+MAX_QUERY_CHARS = 1000  # queries remembered per observation stop growing past this
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text):
+    return _TOKEN.findall((text or "").lower())
+
+
+def _normalize(text):
+    return " ".join(_tokens(text))
+
+
+class PriceIndex:
+    def __init__(self, path, max_rows=200000):
+        self.path = path
+        self.max_rows = max_rows
+        self.fts = None  # decided on the first connection
+        self.stats = {"lookups": 0, "local_hits": 0, "observations_written": 0, "errors": 0}
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = SQLiteFile(path, [
+            "CREATE TABLE IF NOT EXISTS price_obs ("
+            " id INTEGER PRIMARY KEY,"
+            " category TEXT NOT NULL,"
+            " material TEXT NOT NULL,"
+            " site TEXT NOT NULL,"
+            " domain TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " query TEXT NOT NULL,"
+            " price INTEGER NOT NULL,"
+            " observed_at REAL NOT NULL,"
+            " UNIQUE (category, material, site, title, price))",
+            "CREATE INDEX IF NOT EXISTS price_obs_lookup ON price_obs (category, material, observed_at)",
+            "CREATE INDEX IF NOT EXISTS price_obs_age ON price_obs (observed_at)",
+            self._setup_fts,
+        ])
+
+    # ---------------------------------------------------------
+    # SQLite plumbing (one connection per thread)
+    # ---------------------------------------------------------
+    def _conn(self):
+        return self._db.connect()
+
+    def _setup_fts(self, conn):
+        if self.fts is None:
+            self.fts = self._create_fts(conn)
+
+    def _create_fts(self, conn):
+        """External-content FTS5 table kept in sync by triggers; False if FTS5 isn't compiled in."""
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS price_obs_fts USING fts5("
+                    " title, query, content='price_obs', content_rowid='id')"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS price_obs_ai AFTER INSERT ON price_obs BEGIN"
+                    " INSERT INTO price_obs_fts (rowid, title, query) VALUES (new.id, new.title, new.query); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS price_obs_ad AFTER DELETE ON price_obs BEGIN"
+                    " INSERT INTO price_obs_fts (price_obs_fts, rowid, title, query) VALUES ('delete', old.id, old.title, old.query); END"
+                )
+                conn.execute(
+                    "CREATE TRIGGER IF NOT EXISTS price_obs_au AFTER UPDATE ON price_obs BEGIN"
+                    " INSERT INTO price_obs_fts (price_obs_fts, rowid, title, query) VALUES ('delete', old.id, old.title, old.query);"
+                    " INSERT INTO price_obs_fts (rowid, title, query) VALUES (new.id, new.title, new.query); END"
+                )
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"⚠️ FTS5 unavailable, price index falls back to LIKE search: {e}")
+            return False
+
+    def _count(self, stat, n=1):
+        with self._lock:
+            self.stats[stat] += n
+
+    # ---------------------------------------------------------
+    # Public API
+    # ---------------------------------------------------------
+    def record(self, category, material, site, query, observations):
+        """
+        observations: [(title, domain, price)]. Seeing the same listing price
+        again for the same category and material only refreshes its timestamp
+        (and remembers the new query that found it), so repeat scans don't
+        double-count. Found under another category/material, it is recorded
+        there too, leaving the original observation where it was.
+        """
+        if not observations:
+            return
+        now = time.time()
+        rows = [
+            (category, _normalize(material), site, domain, title, query, price, now, MAX_QUERY_CHARS)
+            for title, domain, price in observations
+        ]
+        try:
+            conn = self._conn()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO price_obs (category, material, site, domain, title, query, price, observed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (category, material, site, title, price) DO UPDATE SET"
+                    " query = CASE WHEN instr(query, excluded.query) > 0 OR length(query) > ?"
+                    "   THEN query ELSE query || ' | ' || excluded.query END,"
+                    " observed_at = excluded.observed_at",
+                    rows,
+                )
+            self._count("observations_written", len(rows))
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % 100 == 0
+            if prune:
+                self.prune()
+        except sqlite3.Error as e:
+            print(f"⚠️ Price index write failed: {e}")
+            self._count("errors")
+
+    def prune(self, max_age=None):
+        """Drops observations too old to ever be used, then the oldest beyond max_rows."""
+        max_age = settings.PRICE_INDEX_MAX_AGE if max_age is None else max_age
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM price_obs WHERE observed_at < ?", (time.time() - max_age,))
+            conn.execute(
+                "DELETE FROM price_obs WHERE id IN ("
+                " SELECT id FROM price_obs ORDER BY observed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+
+    def lookup(self, category, material, product="", keywords=(), exclusions=(), max_age=None, limit=200):
+        """
+        Recent observations for this category and material whose title or
+        query mentions every word of `product` (the main object, so a "cotton
+        kurta set" doesn't answer for a "cotton co-ord set") and at least one
+        of the keywords (any, if none are given).
+        Returns [(price, domain)], newest first.
+        """
+        max_age = settings.PRICE_INDEX_MAX_AGE if max_age is None else max_age
+        self._count("lookups")
+        product_words = list(dict.fromkeys(_tokens(product)))
+        keyword_phrases = [p for p in (_normalize(k) for k in keywords) if p]
+
+        sql = (
+            "SELECT p.price, p.domain, p.title FROM price_obs p"
+            " WHERE p.category = ? AND p.material = ? AND p.observed_at >= ?"
+        )
+        params = [category, _normalize(material), time.time() - max_age]
+        try:
+            conn = self._conn()
+            if self.fts and (product_words or keyword_phrases):
+                terms = [f'"{word}"' for word in product_words]
+                if keyword_phrases:
+                    terms.append("(" + " OR ".join(f'"{phrase}"' for phrase in keyword_phrases) + ")")
+                sql += " AND p.id IN (SELECT rowid FROM price_obs_fts WHERE price_obs_fts MATCH ?)"
+                params.append(" AND ".join(terms))
+            else:
+                for word in product_words:
+                    sql += " AND (p.title || ' ' || p.query) LIKE ?"
+                    params.append(f"%{word}%")
+                if keyword_phrases:
+                    sql += " AND (" + " OR ".join("(p.title || ' ' || p.query) LIKE ?" for _ in keyword_phrases) + ")"
+                    params.extend(f"%{phrase}%" for phrase in keyword_phrases)
+            sql += " ORDER BY p.observed_at DESC LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"⚠️ Price index read failed: {e}")
+            self._count("errors")
+            return []
+
+        excluded = [w.lower() for w in exclusions if w.strip()]
+        return [
+            (price, domain) for price, domain, title in rows
+            if not any(bad in title.lower() for bad in excluded)
+        ]
+
+    def mark_hit(self):
+        """A lookup was good enough to answer without scanning."""
+        self._count("local_hits")
+
+    def size(self):
+        try:
+            return self._conn().execute("SELECT COUNT(*) FROM price_obs").fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["hit_rate"] = round(stats["local_hits"] / stats["lookups"], 3) if stats["lookups"] else 0.0
+        stats["observations"] = self.size()
+        stats["search"] = "fts5" if self.fts else "like"
+        return stats
+
+
+price_index = PriceIndex(settings.CACHE_DB_PATH, max_rows=settings.PRICE_INDEX_MAX_ROWS)
@@ -0,0 +1,208 @@
+import asyncio
+import time
+from app.core.config import settings
+from app.core.registry import lazy_module
+from app.services.audio_prep import VAD_FLOOR_DB, encode_wav, resample
+from app.services.voice_service import transcribe_audio_async
+
+np = lazy_module("numpy")
+
+# ---------------------------------------------------------
+# LIVE VOICE (WebSocket /ws/voice)
+# ---------------------------------------------------------
+# The browser streams 16-bit mono PCM while the seller talks. PauseSegmenter
+# cuts the stream into utterances at pauses; every finished utterance goes to
+# Whisper straight away (a few at once), and its English text is pushed back as
+# a "partial" message. When the seller stops, only the last utterance is still
+# in flight, so the "final" text follows almost immediately.
+#
+# Protocol (client -> server):
+#   {"type": "start", "sample_rate": 48000}   optional, defaults to AUDIO_SAMPLE_RATE
+#   <binary frames>                           raw PCM, int16 little-endian, mono
+#   {"type": "stop"}                          end of recording
+# Server -> client:
+#   {"type": "ready"} / {"type": "segment"} / {"type": "partial"} / {"type": "final"} / {"type": "error"}
+
+NOISE_RISE_DB = 0.1
+# The floor is seeded from the first frame but never above this: a louder first
+# frame means the seller was already talking when the stream opened (a room
+# behind browser noise suppression sits well below it). A genuinely louder room
+# still gets there, NOISE_RISE_DB per frame.
+NOISE_SEED_MAX_DB = -45
+
+
+class PauseSegmenter:
+    """
+    Frame-energy speech detector over a live stream. The noise floor adapts as
+    the stream goes; a frame is speech when it is AUDIO_VAD_MARGIN_DB above it.
+    An utterance ends after `pause_ms` of non-speech or at `max_seconds`,
+    keeping AUDIO_VAD_PAD_MS of audio on either side.
+    """
+
+    def __init__(self, rate, pause_ms=None, max_seconds=None, min_speech_ms=None):
+        self.rate = rate
+        self.frame = max(1, int(rate * settings.AUDIO_VAD_FRAME_MS / 1000))
+        frame_ms = self.frame * 1000 / rate
+        pause_ms = pause_ms or settings.VOICE_STREAM_PAUSE_MS
+        max_seconds = max_seconds or settings.VOICE_STREAM_MAX_SEGMENT_SECONDS
+        min_speech_ms = min_speech_ms or settings.VOICE_STREAM_MIN_SPEECH_MS
+        self.pause_frames = max(1, int(pause_ms / frame_ms))
+        self.pad_frames = int(settings.AUDIO_VAD_PAD_MS / frame_ms)
+        self.max_frames = int(max_seconds * 1000 / frame_ms)
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.noise_db = None  # seeded by the first frame, then adapts
+        self._pending = np.zeros(0, np.float32)  # samples not yet a whole frame
+        self._frames = []  # current utterance (or pre-roll while waiting for speech)
+        self._speech_frames = 0
+        self._silent_run = 0
+        self._position = 0  # frames consumed so far
+        self._start = 0  # frame index of self._frames[0]
+
+    def _is_speech(self, frame):
+        energy = 10 * np.log10(np.mean(frame ** 2) + 1e-10)
+        if self.noise_db is None:
+            self.noise_db = min(energy, NOISE_SEED_MAX_DB)
+        # Noise floor follows quieter frames quickly and creeps up slowly
+        # (NOISE_RISE_DB per frame), so gaps between syllables keep it honest
+        if energy < self.noise_db:
+            self.noise_db = 0.7 * self.noise_db + 0.3 * energy
+        else:
+            self.noise_db = min(energy, self.noise_db + NOISE_RISE_DB)
+        return energy > max(self.noise_db + settings.AUDIO_VAD_MARGIN_DB, VAD_FLOOR_DB)
+
+    def _cut(self, keep_frames):
+        """
+        Closes the utterance after `keep_frames` frames (the rest becomes the next
+        pre-roll). Returns (start_seconds, samples), or None if it held too little speech.
+        """
+        segment = (self._start * self.frame / self.rate, np.concatenate(self._frames[:keep_frames]))
+        enough = self._speech_frames >= self.min_speech_frames
+        rest = self._frames[keep_frames:][-self.pad_frames:] if self.pad_frames else []
+        self._start = self._position - len(rest)
+        self._frames = list(rest)
+        self._speech_frames = 0
+        self._silent_run = 0
+        return segment if enough else None
+
+    def feed(self, samples):
+        """Adds float32 samples; returns the utterances completed by them as [(start_seconds, samples)]."""
+        data = np.concatenate([self._pending, samples]) if len(self._pending) else samples
+        whole = len(data) // self.frame * self.frame
+        self._pending = data[whole:]
+
+        done = []
+        for frame in data[:whole].reshape(-1, self.frame):
+            self._frames.append(frame)
+            self._position += 1
+            if self._is_speech(frame):
+                self._speech_frames += 1
+                self._silent_run = 0
+            elif self._speech_frames:
+                self._silent_run += 1
+
+            if not self._speech_frames:
+                # Waiting for speech: keep only the pre-roll
+                if len(self._frames) > self.pad_frames:
+                    drop = len(self._frames) - self.pad_frames
+                    self._frames = self._frames[drop:]
+                    self._start += drop
+                continue
+
+            if self._silent_run >= self.pause_frames:
+                keep = len(self._frames) - self._silent_run + self.pad_frames
+                done.append(self._cut(keep))
+            elif len(self._frames) >= self.max_frames:
+                done.append(self._cut(len(self._frames)))
+
+        return [segment for segment in done if segment is not None]
+
+    def flush(self):
+        """End of stream: the utterance in progress (if it had any speech), else None."""
+        if self._speech_frames and self._frames:
+            if len(self._pending):
+                self._frames.append(self._pending)
+                self._pending = np.zeros(0, np.float32)
+            return self._cut(len(self._frames))
+        return None
+
+
+class VoiceStreamSession:
+    """One WebSocket recording: segments as audio arrives, transcribes segments concurrently."""
+
+    def __init__(self, send_json, rate):
+        self.rate = rate
+        self.segmenter = PauseSegmenter(rate)
+        self.stats = {"audio_seconds": 0.0, "segments": 0, "failed_segments": 0}
+        self._send_json = send_json
+        self._send_lock = asyncio.Lock()
+        self._limiter = asyncio.Semaphore(settings.VOICE_STREAM_CONCURRENCY)
+        self._texts = {}
+        self._tasks = []
+
+    async def send(self, message):
+        async with self._send_lock:
+            await self._send_json(message)
+
+    async def feed(self, pcm):
+        """`pcm` is a binary frame: int16 little-endian mono samples."""
+        samples = np.frombuffer(pcm[:len(pcm) // 2 * 2], "<i2").astype(np.float32) / 32768
+        self.stats["audio_seconds"] += len(samples) / self.rate
+        if self.stats["audio_seconds"] > settings.VOICE_STREAM_MAX_SECONDS:
+            raise ValueError(f"Recording longer than {settings.VOICE_STREAM_MAX_SECONDS}s")
+        for start, segment in self.segmenter.feed(samples):
+            await self._start(start, segment)
+
+    async def _start(self, start, segment):
+        index = self.stats["segments"]
+        self.stats["segments"] += 1
+        end = start + len(segment) / self.rate
+        await self.send({"type": "segment", "segment": index, "start": round(start, 2), "end": round(end, 2)})
+        self._tasks.append(asyncio.create_task(self._transcribe(index, start, end, segment)))
+
+    async def _transcribe(self, index, start, end, segment):
+        rate = settings.AUDIO_SAMPLE_RATE
+        wav = await asyncio.to_thread(lambda: encode_wav(resample(segment, self.rate, rate), rate))
+        async with self._limiter:
+            text = await transcribe_audio_async(wav, "segment.wav")
+        if text is None:
+            self.stats["failed_segments"] += 1
+        self._texts[index] = (text or "").strip()
+        await self.send({
+            "type": "partial",
+            "segment": index,
+            "start": round(start, 2),
+            "end": round(end, 2),
+            "text": self._texts[index],
+            "ok": text is not None,
+            "text_so_far": self.text_so_far(),
+        })
+
+    def text_so_far(self):
+        """Segments joined in order, up to the first one still being transcribed."""
+        parts = []
+        for index in range(self.stats["segments"]):
+            if index not in self._texts:
+                break
+            if self._texts[index]:
+                parts.append(self._texts[index])
+        return " ".join(parts)
+
+    async def finish(self):
+        """Transcribes the last utterance, waits for every segment and returns the "final" message."""
+        stopped = time.perf_counter()
+        tail = self.segmenter.flush()
+        if tail:
+            await self._start(*tail)
+        await asyncio.gather(*self._tasks)
+        return {
+            "type": "final",
+            "text": self.text_so_far(),
+            "segments": self.stats["segments"],
+            "failed_segments": self.stats["failed_segments"],
+            "audio_seconds": round(self.stats["audio_seconds"], 2),
+            "seconds_after_stop": round(time.perf_counter() - stopped, 3),
+        }
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,238 @@
+import asyncio
+import copy
+import json
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+# ---------------------------------------------------------
+# LOCAL STAND-INS FOR AZURE, GROQ AND DUCKDUCKGO
+# ---------------------------------------------------------
+# Same call signatures as the real SDKs, but every call just sleeps for a
+# sampled latency, fails at a configured rate, and returns a canned payload.
+# install_fakes() swaps them into the running app, so everything between the
+# HTTP layer and the SDK call (pipeline, caches, pools, fallbacks) is real.
+
+
+class FakeServiceError(Exception):
+    """Raised by a fake to simulate a failed upstream call."""
+
+
+class LatencyModel:
+    """
+    Samples per-call latency (seconds) and failures.
+      "fixed:0.3"           always 0.3s
+      "uniform:0.2:0.8"     uniform between 0.2s and 0.8s
+      "lognormal:0.5:0.4"   median 0.5s, sigma 0.4 (long right tail, like real APIs)
+    """
+
+    def __init__(self, spec="fixed:0", error_rate=0.0, seed=None):
+        self.spec = spec
+        self.error_rate = error_rate
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+
+    def sample(self):
+        with self._lock:
+            self.calls += 1
+            if self.kind == "fixed":
+                delay = self.params[0] if self.params else 0.0
+            elif self.kind == "uniform":
+                delay = self._rng.uniform(*self.params)
+            elif self.kind == "lognormal":
+                median, sigma = self.params
+                delay = self._rng.lognormvariate(0, sigma) * median
+            else:
+                raise ValueError(f"Unknown latency distribution: {self.kind}")
+            failed = self._rng.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def wait(self, service):
+        delay, failed = self.sample()
+        time.sleep(delay)
+        if failed:
+            raise FakeServiceError(f"{service}: injected failure")
+
+    async def await_(self, service):
+        delay, failed = self.sample()
+        await asyncio.sleep(delay)
+        if failed:
+            raise FakeServiceError(f"{service}: injected failure")
+
+    def stats(self):
+        return {"spec": self.spec, "error_rate": self.error_rate, "calls": self.calls, "errors": self.errors}
+
+
+# ---------------------------------------------------------
+# Canned payloads
+# ---------------------------------------------------------
+VISION_PAYLOAD = {
+    "tags": [("saree", 0.95), ("silk", 0.88), ("textile", 0.81), ("red", 0.74), ("indoor", 0.66)],
+    "captions": [("a red silk saree with golden border", 0.83)],
+    "dominant_colors": ["Red", "Gold"],
+    "accent_color": "B8860B",
+    "brands": [],
+}
+
+# The first marker found in a prompt decides which helper is answering
+LLM_PAYLOADS = [
+    ("Senior Pricing Strategist, an expert", {
+        "pricing": {"recommended_price": 1450, "strategy": "Festive demand supports a premium over the average."},
+        "listings": {
+            "amazon": {"title": "Handwoven Red Silk Saree with Zari Border", "features": ["Pure silk", "Zari border", "Handwoven"]},
+            "instagram": "Festive red, woven by hand. Only [PRICE]! #handloom #silksaree",
+            "whatsapp": "Red silk saree, zari border, handwoven - [PRICE]. Reply to order.",
+        },
+        "tips": ["Shoot near a window for softer light.", "Add one close-up of the border."],
+    }),
+    ("Visual Merchandiser", {"name": "Silk Saree", "material": "Pure Silk", "exclusions": ["shoes", "model"]}),
+    ("Pricing Strategist", {"recommended_price": 1450, "strategy": "Festive demand supports a premium over the average."}),
+    ("Copywriter", {
+        "amazon": {"title": "Handwoven Red Silk Saree with Zari Border", "features": ["Pure silk", "Zari border", "Handwoven"]},
+        "instagram": "Festive red, woven by hand. #handloom #silksaree",
+        "whatsapp": "Red silk saree, zari border, handwoven. Reply to order.",
+    }),
+    ("Photo Mentor", {"tips": ["Shoot near a window for softer light.", "Add one close-up of the border."]}),
+    ("search keywords", {"keywords": ["pure silk", "zari", "handwoven"]}),
+]
+
+DDGS_RESULTS = [
+    {"title": "Red Silk Saree ₹1,299", "body": "Handwoven silk saree with zari border. Offer price ₹1,199.", "href": "https://www.amazon.in/dp/bench"},
+    {"title": "Banarasi Silk Saree", "body": "Now ₹1,549 only, free delivery.", "href": "https://www.flipkart.com/p/bench"},
+    {"title": "Pure Silk Saree - Festive Edit", "body": "MRP ₹2,100, deal price ₹1,680.", "href": "https://www.myntra.com/bench"},
+]
+
+TRANSCRIPT = "I have a red banarasi silk saree with a golden zari border, hand woven."
+
+
+# ---------------------------------------------------------
+# Azure Computer Vision
+# ---------------------------------------------------------
+class FakeVisionClient:
+    """Stands in for ComputerVisionClient.analyze_image_in_stream."""
+
+    def __init__(self, latency, payload=None):
+        self.latency = latency
+        self.payload = payload or VISION_PAYLOAD
+
+    def analyze_image_in_stream(self, image, visual_features=None, **kwargs):
+        image.read()
+        self.latency.wait("azure_vision")
+        p = self.payload
+        return SimpleNamespace(
+            tags=[SimpleNamespace(name=name, confidence=conf) for name, conf in p["tags"]],
+            description=SimpleNamespace(captions=[SimpleNamespace(text=text, confidence=conf) for text, conf in p["captions"]]),
+            color=SimpleNamespace(dominant_colors=list(p["dominant_colors"]), accent_color=p["accent_color"], is_bw_img=False),
+            brands=[SimpleNamespace(name=name, confidence=conf) for name, conf in p["brands"]],
+        )
+
+
+# ---------------------------------------------------------
+# Groq (chat completions + Whisper translations)
+# ---------------------------------------------------------
+def _llm_payload(messages, payloads):
+    prompt = messages[-1]["content"] if messages else ""
+    for marker, payload in payloads:
+        if marker in prompt:
+            return payload
+    return {}
+
+
+def _completion(payload):
+    message = SimpleNamespace(content=json.dumps(copy.deepcopy(payload)))
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class _FakeAsyncCompletions:
+    def __init__(self, latency, payloads):
+        self.latency = latency
+        self.payloads = payloads
+
+    async def create(self, messages=None, **kwargs):
+        await self.latency.await_("groq.chat")
+        return _completion(_llm_payload(messages, self.payloads))
+
+
+class _FakeAsyncTranslations:
+    def __init__(self, latency, transcript):
+        self.latency = latency
+        self.transcript = transcript
+
+    async def create(self, **kwargs):
+        await self.latency.await_("groq.whisper")
+        return SimpleNamespace(text=self.transcript)
+
+
+class FakeAsyncGroq:
+    """AsyncGroq client: .chat.completions.create and .audio.translations.create."""
+
+    def __init__(self, chat_latency, audio_latency, payloads=None, transcript=TRANSCRIPT):
+        self.chat = SimpleNamespace(completions=_FakeAsyncCompletions(chat_latency, payloads or LLM_PAYLOADS))
+        self.audio = SimpleNamespace(translations=_FakeAsyncTranslations(audio_latency, transcript))
+
+    async def close(self):
+        pass
+
+
+# ---------------------------------------------------------
+# DuckDuckGo search
+# ---------------------------------------------------------
+class FakeDDGS:
+    """Stands in for ddgs.DDGS (instantiated per call, like the real one)."""
+
+    latency = LatencyModel()
+    results = DDGS_RESULTS
+
+    def text(self, query, region=None, max_results=5, **kwargs):
+        self.latency.wait("ddgs")
+        return copy.deepcopy(self.results[:max_results])
+
+
+# ---------------------------------------------------------
+# Wiring
+# ---------------------------------------------------------
+DEFAULT_PROFILE = {
+    "azure_vision": {"latency": "lognormal:0.6:0.35", "error_rate": 0.01},
+    "groq_chat": {"latency": "lognormal:0.45:0.4", "error_rate": 0.01},
+    "groq_whisper": {"latency": "lognormal:1.2:0.3", "error_rate": 0.01},
+    "ddgs": {"latency": "lognormal:0.9:0.5", "error_rate": 0.05},
+}
+
+
+def build_latencies(profile=None, seed=None):
+    merged = copy.deepcopy(DEFAULT_PROFILE)
+    for service, overrides in (profile or {}).items():
+        merged.setdefault(service, {}).update(overrides)
+    return {
+        service: LatencyModel(cfg.get("latency", "fixed:0"), cfg.get("error_rate", 0.0), seed=None if seed is None else seed + i)
+        for i, (service, cfg) in enumerate(sorted(merged.items()))
+    }
+
+
+def install_fakes(latencies):
+    """
+    Puts the fakes into the app's service registry (Azure client, Groq SDK
+    module, ddgs module). Call after `app.main` is imported.
+    Returns the latency models so callers can report call/error counts.
+    """
+    from app.core.config import settings
+    from app.core.registry import registry
+
+    registry.override("azure_vision", FakeVisionClient(latencies["azure_vision"]))
+
+    # The real groq_client code still builds its clients and pools; only the SDK class is fake
+    settings.GROQ_API_KEY = settings.GROQ_API_KEY or "bench-fake-key"
+    async_client = FakeAsyncGroq(latencies["groq_chat"], latencies["groq_whisper"])
+    registry.override("groq", SimpleNamespace(AsyncGroq=lambda **kwargs: async_client))
+
+    FakeDDGS.latency = latencies["ddgs"]
+    registry.override("ddgs", SimpleNamespace(DDGS=FakeDDGS))
+    return latencies
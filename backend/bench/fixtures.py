@@ -0,0 +1,137 @@
+import io
+import random
+import wave
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+# ---------------------------------------------------------
+# SYNTHETIC FIXTURES (shared by the load test and micro-benchmarks)
+# ---------------------------------------------------------
+# Everything is seeded, so two runs on the same machine feed the code the
+# exact same bytes.
+
+# ---------------------------------------------------------
+# Uploads
+# ---------------------------------------------------------
+def synthetic_photo(seed, width, height):
+    """Smooth colour blobs + sensor-like noise, so JPEG size and dHash behave like real photos."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, size=(12, 16, 3), dtype=np.uint8)
+    img = cv2.resize(base, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 6, size=img.shape)
+    img = np.clip(img.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return buf.tobytes()
+
+
+def synthetic_wav(seconds=4.0, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype(np.int16)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(tone.tobytes())
+    return out.getvalue()
+
+
+def browser_recording(seconds=12.0, rate=48000, channels=2, speech=(3.0, 8.0), seed=0):
+    """What a browser typically uploads: 48 kHz stereo, room noise, speech-like bursts only in `speech`."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate)) / rate
+    signal = 0.002 * rng.standard_normal(len(t))
+    voiced = (t >= speech[0]) & (t < speech[1])
+    syllables = 0.6 + 0.4 * np.sin(2 * np.pi * 3 * t[voiced])
+    signal[voiced] += 0.3 * syllables * np.sin(2 * np.pi * 180 * t[voiced])
+    frames = np.repeat(signal[:, None], channels, axis=1)
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((np.clip(frames, -1, 1) * 32767).astype("<i2").tobytes())
+    return out.getvalue()
+
+
+# ---------------------------------------------------------
+# Search snippets (DDGS-shaped text the price regex runs over)
+# ---------------------------------------------------------
+_TITLES = [
+    "{adj} {material} {item} for Women",
+    "Buy {adj} {material} {item} Online at Best Price",
+    "{item} - {material}, {adj} Design | Free Delivery",
+    "{material} {item} with Blouse Piece",
+]
+_BODIES = [
+    "Shop {adj} {item} online. Price ₹{p1} (MRP ₹{p2}), {off}% off. Cash on delivery available.",
+    "Rs. {p1} only. {material} {item}, handwoven. EMI from Rs {emi}/month. Rated 4.{r} by 1,2{r}3 buyers.",
+    "INR {p1} - {p2}. {adj} {item} in {material}. Ships in 2 days. Size guide, returns within 7 days.",
+    "Deal of the day: ₹ {p1}. Compare with {count} similar items. Pack of 1, net quantity 1 N.",
+    "{item} crafted from {material}. No price listed - visit store. Weight 650 g, length 5.5 m.",
+]
+_ADJ = ["Festive", "Handwoven", "Designer", "Traditional", "Premium", "Printed"]
+_MATERIAL = ["Silk", "Cotton", "Brass", "Terracotta", "Jute", "Georgette"]
+_ITEM = ["Saree", "Kurta", "Diya", "Wall Hanging", "Tote Bag", "Dupatta"]
+
+
+def _inr(value):
+    """Indian-style grouping is what shows up in snippets (1,499 / 12,999)."""
+    return f"{value:,}"
+
+
+def search_snippets(count, seed=0):
+    """`count` DDGS-like results: {"title", "body", "href"}."""
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        words = {"adj": rng.choice(_ADJ), "material": rng.choice(_MATERIAL), "item": rng.choice(_ITEM)}
+        p1 = rng.randint(150, 25000)
+        body = rng.choice(_BODIES).format(
+            p1=_inr(p1), p2=_inr(int(p1 * rng.uniform(1.1, 2.0))), off=rng.randint(5, 70),
+            emi=rng.randint(50, 900), r=rng.randint(0, 9), count=rng.randint(3, 40), **words,
+        )
+        results.append({
+            "title": rng.choice(_TITLES).format(**words),
+            "body": body,
+            "href": f"https://www.{rng.choice(['amazon.in', 'flipkart.com', 'myntra.com'])}/p/{seed}-{i}",
+        })
+    return results
+
+
+def price_samples(count, seed=0):
+    """Market-like prices: a lognormal body plus a few accessories and premium outliers."""
+    rng = random.Random(seed)
+    prices = [int(rng.lognormvariate(7.2, 0.35)) for _ in range(count)]
+    for i in range(0, count, 7):
+        prices[i] = rng.choice([rng.randint(120, 250), rng.randint(20000, 90000)])
+    return prices
+
+
+# ---------------------------------------------------------
+# Azure-shaped analysis objects
+# ---------------------------------------------------------
+_TAG_WORDS = ["saree", "silk", "textile", "red", "indoor", "pattern", "gold", "fabric", "woman",
+              "clothing", "magenta", "embroidery", "fashion", "border", "floor", "table", "design"]
+
+
+def azure_analysis(tag_count, seed=0, captions=3, brands=1):
+    """Object with the attributes extract_rich_vision_context/summarize_analysis read."""
+    rng = random.Random(seed)
+    tags = [
+        SimpleNamespace(name=f"{_TAG_WORDS[i % len(_TAG_WORDS)]}{'' if i < len(_TAG_WORDS) else i}",
+                        confidence=round(rng.uniform(0.3, 0.99), 4))
+        for i in range(tag_count)
+    ]
+    return SimpleNamespace(
+        tags=tags,
+        description=SimpleNamespace(captions=[
+            SimpleNamespace(text=f"a {rng.choice(_ADJ).lower()} {rng.choice(_ITEM).lower()} on a table", confidence=rng.uniform(0.4, 0.95))
+            for _ in range(captions)
+        ]),
+        color=SimpleNamespace(dominant_colors=rng.sample(["Red", "Gold", "White", "Black", "Pink"], 2),
+                              accent_color="B8860B", is_bw_img=False),
+        brands=[SimpleNamespace(name=f"Brand{i}", confidence=rng.uniform(0.5, 0.95)) for i in range(brands)],
+    )
@@ -0,0 +1,241 @@
+"""
+Offline load test for /analyze, /analyze/stream and /analyze-voice.
+
+Drives the real FastAPI app in-process (httpx ASGI transport) with Azure, Groq
+and DuckDuckGo replaced by the latency/error-injecting fakes in bench/fakes.py,
+so no credentials or network are needed.
+
+    cd backend
+    python -m bench.loadtest --concurrency 1,4,16 --requests 40
+    python -m bench.loadtest --endpoint voice --concurrency 8,32
+    python -m bench.loadtest --profile my_profile.json --json results.json
+
+A profile JSON overrides any service in fakes.DEFAULT_PROFILE, e.g.
+    {"ddgs": {"latency": "uniform:0.5:3.0", "error_rate": 0.2}}
+
+Caches start empty and disabled by default so every request pays for every
+upstream call; pass --caches to measure the warm path instead.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+
+def configure_env(args):
+    # Must run before `app` is imported: cache files and pools are created at import time
+    os.environ.setdefault("CACHE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="setu-bench-"), "cache.sqlite3"))
+    os.environ.setdefault("AZURE_ENDPOINT", "https://bench.invalid/")
+    os.environ.setdefault("AZURE_KEY", "bench-fake-key")
+    os.environ.setdefault("GROQ_API_KEY", "bench-fake-key")
+    caches = "true" if args.caches else "false"
+    for name in ("MARKET_CACHE_ENABLED", "LLM_CACHE_ENABLED", "VISION_CACHE_ENABLED", "PRICE_INDEX_ENABLED"):
+        os.environ.setdefault(name, caches)
+    if args.fused:
+        os.environ["LLM_FUSED_MODE"] = "true"
+
+
+# ---------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class RssSampler:
+    """
+    Peak resident memory of this process plus the quality-scoring workers,
+    sampled every `interval` seconds (Linux /proc; falls back to ru_maxrss).
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        from app.services import image_quality
+
+        if not os.path.exists("/proc/self/status"):
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        total = _rss_kb(os.getpid())
+        pool = image_quality._pool
+        for pid in list(getattr(pool, "_processes", None) or {}):
+            total += _rss_kb(pid)
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self._sample())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self._sample())
+
+
+# ---------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------
+def build_request(args, photos, audio, n):
+    if args.endpoint == "voice":
+        return "/analyze-voice", {"files": {"file": ("voice.wav", audio, "audio/wav")}}
+    # Rotate through the photo pool so consecutive requests never share bytes
+    start = (n * args.images) % len(photos)
+    picks = [photos[(start + i) % len(photos)] for i in range(args.images)]
+    files = [("files", (f"img{i}.jpg", data, "image/jpeg")) for i, data in enumerate(picks)]
+    data = {"user_features": "pure silk, handwoven zari border", "user_price": "1200"}
+    path = "/analyze/stream" if args.endpoint == "stream" else "/analyze"
+    return path, {"files": files, "data": data}
+
+
+def request_ok(endpoint, response):
+    if response.status_code != 200:
+        return False
+    if endpoint == "stream":
+        last = response.text.strip().splitlines()[-1]
+        return json.loads(last)["data"].get("status") == "success"
+    return response.json().get("status") == "success"
+
+
+async def run_level(client, args, photos, audio, concurrency, total):
+    latencies = []
+    failures = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal failures
+        for n in counter:
+            path, kwargs = build_request(args, photos, audio, n)
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, **kwargs)
+                ok = request_ok(args.endpoint, response)
+            except Exception as e:
+                print(f"⚠️ request {n} raised: {e}", file=sys.stderr)
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                failures += 1
+
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "failures": failures,
+        "elapsed_s": round(elapsed, 3),
+        "req_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "max_s": round(latencies[-1], 3) if latencies else 0.0,
+        "peak_rss_mb": round(rss.peak_kb / 1024, 1),
+    }
+
+
+def print_table(rows):
+    header = f"{'conc':>5} {'reqs':>5} {'fail':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rss MB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['concurrency']:>5} {r['requests']:>5} {r['failures']:>5} {r['req_per_s']:>8} "
+              f"{r['p50_s']:>8} {r['p95_s']:>8} {r['p99_s']:>8} {r['max_s']:>8} {r['peak_rss_mb']:>8}")
+
+
+async def main(args):
+    import httpx
+    from app.main import app
+    from app.services import image_quality
+    from bench.fakes import build_latencies, install_fakes
+    from bench.fixtures import synthetic_photo, browser_recording
+
+    profile = None
+    if args.profile:
+        with open(args.profile) as f:
+            profile = json.load(f)
+    latencies = install_fakes(build_latencies(profile, seed=args.seed))
+
+    width, height = (int(v) for v in args.image_size.lower().split("x"))
+    pool_size = max(args.images * 4, 8)
+    photos = [synthetic_photo(args.seed + i, width, height) for i in range(pool_size)]
+    audio = browser_recording()
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    rows = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        if args.warmup:
+            # Spawns the quality pool and opens every lazily created resource
+            await run_level(client, args, photos, audio, 1, args.warmup)
+        for concurrency in levels:
+            total = args.requests or concurrency * args.per_worker
+            row = await run_level(client, args, photos, audio, concurrency, total)
+            rows.append(row)
+            print(f"✅ concurrency {concurrency}: {row['req_per_s']} req/s, p95 {row['p95_s']}s", file=sys.stderr)
+
+    image_quality.shutdown_pool()
+
+    shape = "" if args.endpoint == "voice" else f" | {args.images} image(s) of {args.image_size}"
+    print(f"\n{args.endpoint}{shape} | caches {'on' if args.caches else 'off'}{' | fused' if args.fused else ''}")
+    print_table(rows)
+    fakes = {service: model.stats() for service, model in latencies.items()}
+    print("\nupstream calls: " + ", ".join(f"{s}={v['calls']} ({v['errors']} failed)" for s, v in fakes.items()))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "levels": rows, "fakes": fakes}, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test against local Azure/Groq/DDGS fakes.")
+    parser.add_argument("--endpoint", choices=["analyze", "stream", "voice"], default="analyze")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=0, help="requests per level (default: concurrency x --per-worker)")
+    parser.add_argument("--per-worker", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=2, help="sequential requests before measuring")
+    parser.add_argument("--images", type=int, default=3, help="images per /analyze request")
+    parser.add_argument("--image-size", default="2000x1500", help="WIDTHxHEIGHT of synthetic photos")
+    parser.add_argument("--profile", help="JSON file overriding fake latency/error settings")
+    parser.add_argument("--caches", action="store_true", help="keep market/LLM/vision caches and the price index enabled")
+    parser.add_argument("--fused", action="store_true", help="run with LLM_FUSED_MODE=true")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", help="write results to this file")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_env(args)
+    asyncio.run(main(args))
@@ -0,0 +1,167 @@
+"""
+Micro-benchmarks for the CPU-bound helpers that run on every request.
+
+    cd backend
+    python -m bench.micro --save            # record a baseline on this machine
+    python -m bench.micro                   # compare against it (exit 1 on regression)
+    python -m bench.micro --filter quality --threshold 0.15
+
+Each case is timed with timeit (autoranged loop count, best of --repeat runs)
+and compared on the best per-call time, which is the least noisy statistic on
+a shared machine. Baselines are machine specific: record one per machine/CI
+runner and compare only against that.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+
+def build_cases():
+    """name -> zero-arg callable. Fixtures are built here, outside the timed region."""
+    from app.api.routes import merge_vision_contexts, format_vision_context
+    from app.services.azure_vision import extract_rich_vision_context
+    from app.services.business_logic import apply_psychological_pricing, analyze_image_quality
+    from app.services.image_prep import prepare_image
+    from app.services.image_quality import compute_metrics
+    from app.services.market_spy import extract_prices, remove_outliers
+    from app.services.audio_prep import prepare_audio
+    from bench.fixtures import azure_analysis, browser_recording, price_samples, search_snippets, synthetic_photo
+
+    cases = {}
+
+    # One site scan yields up to 5 results; a full market scan up to 40
+    for count in (5, 40):
+        texts = [f"{r['title']} {r['body']}" for r in search_snippets(count, seed=count)]
+        cases[f"extract_prices[{count} snippets]"] = lambda texts=texts: [extract_prices(t) for t in texts]
+
+    for count in (10, 40, 200):
+        prices = price_samples(count, seed=count)
+        # remove_outliers sorts in place, so every call gets a fresh copy
+        cases[f"remove_outliers[{count} prices]"] = lambda prices=prices: remove_outliers(list(prices))
+
+    raw = price_samples(1000, seed=1)
+    cases["apply_psychological_pricing[1000 prices]"] = lambda: [apply_psychological_pricing(p) for p in raw]
+
+    for tags in (5, 20, 100):
+        analysis = azure_analysis(tags, seed=tags)
+        cases[f"extract_rich_vision_context[{tags} tags]"] = lambda a=analysis: extract_rich_vision_context(a)
+
+    for images in (1, 4, 10):
+        contexts = [extract_rich_vision_context(azure_analysis(20, seed=i)) for i in range(images)]
+        cases[f"merge_vision_contexts[{images} images x 20 tags]"] = lambda c=contexts: merge_vision_contexts(c)
+
+    merged = merge_vision_contexts([extract_rich_vision_context(azure_analysis(20, seed=i)) for i in range(4)])
+    cases["format_vision_context[4 images x 20 tags]"] = lambda: format_vision_context(merged, "pure silk, zari border")
+
+    for width, height in ((640, 480), (2000, 1500), (4000, 3000)):
+        photo = synthetic_photo(width, width, height)
+        label = f"{width}x{height}"
+        cases[f"analyze_image_quality[{label}]"] = lambda p=photo: analyze_image_quality(p)
+        cases[f"prepare_image[{label}]"] = lambda p=photo: prepare_image(p)
+        prepared = prepare_image(photo)
+        cases[f"compute_metrics[{label}]"] = lambda p=prepared: compute_metrics(p)
+
+    for seconds in (5, 30):
+        recording = browser_recording(seconds, speech=(1.0, seconds - 1.0))
+        cases[f"prepare_audio[{seconds}s 48kHz stereo]"] = lambda r=recording: prepare_audio(r)
+
+    return cases
+
+
+def time_case(fn, repeat):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = sorted(t / number for t in timer.repeat(repeat=repeat, number=number))
+    return {"best_s": runs[0], "median_s": runs[len(runs) // 2], "loops": number}
+
+
+def fmt(seconds):
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.2f} µs"
+
+
+def compare(results, baseline, threshold):
+    """Returns {name: (ratio, status)}; ratio = current best / baseline best."""
+    verdicts = {}
+    for name, current in results.items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            verdicts[name] = (None, "new")
+            continue
+        ratio = current["best_s"] / base["best_s"]
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 - threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        verdicts[name] = (ratio, status)
+    return verdicts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for per-request CPU hot spots.")
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    cases = {name: fn for name, fn in build_cases().items() if args.filter in name}
+    results = {}
+    for name, fn in cases.items():
+        results[name] = time_case(fn, args.repeat)
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    verdicts = compare(results, baseline, args.threshold) if baseline else {}
+
+    width = max(len(name) for name in results) if results else 10
+    print(f"{'case':<{width}} {'best':>12} {'median':>12} {'vs base':>9}  status")
+    print("-" * (width + 44))
+    for name, r in results.items():
+        ratio, status = verdicts.get(name, (None, ""))
+        ratio_text = f"{ratio:.2f}x" if ratio else "-"
+        print(f"{name:<{width}} {fmt(r['best_s']):>12} {fmt(r['median_s']):>12} {ratio_text:>9}  {status}")
+
+    if args.save:
+        # Merge so a filtered run only refreshes the cases it ran
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                existing = json.load(f).get("cases", {})
+        existing.update(results)
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpu": platform.processor()},
+                "cases": existing,
+            }, f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save to record one.")
+        return 0
+
+    regressions = [name for name, (_, status) in verdicts.items() if status == "REGRESSION"]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: " + ", ".join(regressions))
+        return 1
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Cold-start benchmark: import time of `app.main` and latency of the first requests.
+
+Every run is a fresh Python process (nothing cached in sys.modules), with the
+Azure/Groq/DDGS fakes from bench/fakes.py at zero latency, so the numbers are
+the app's own start-up cost: imports, client construction, pool spawn.
+
+    cd backend
+    python -m bench.startup                     # lazy and warmed-up, 5 runs each
+    python -m bench.startup --repeat 10 --json startup.json
+    python -m bench.startup --mode lazy
+
+"lazy" serves the first requests straight after import (what an autoscaled
+worker does with WARM_UP=off); "warm" first runs registry.warm_up(), which the
+startup hook does in the background (WARM_UP=background) or before serving
+(WARM_UP=blocking), and reports how long that took.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Loaded by app.main only if something builds them eagerly
+HEAVY_MODULES = ("numpy", "cv2", "ddgs", "groq", "httpx", "msrest", "azure.cognitiveservices.vision.computervision")
+
+COLUMNS = ("import_s", "warm_up_s", "first_root_s", "first_analyze_s", "second_analyze_s", "first_voice_s")
+
+
+# ---------------------------------------------------------
+# Child process (one cold start)
+# ---------------------------------------------------------
+async def _first_requests(app, photos, audio):
+    import httpx
+
+    timings = {}
+    data = {"user_features": "pure silk, handwoven zari border", "user_price": "1200"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def timed(name, method, path, **kwargs):
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            timings[name] = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.text[:200]}")
+
+        await timed("first_root_s", "GET", "/")
+        # Different photos, so the second request is not a cache hit, just warm
+        for name, photo in (("first_analyze_s", photos[0]), ("second_analyze_s", photos[1])):
+            files = [("files", ("img0.jpg", photo, "image/jpeg"))]
+            await timed(name, "POST", "/analyze", files=files, data=data)
+        await timed("first_voice_s", "POST", "/analyze-voice", files={"file": ("voice.wav", audio, "audio/wav")})
+    return timings
+
+
+def run_child(fixtures_dir, warm):
+    started = time.perf_counter()
+    import app.main
+    result = {"import_s": time.perf_counter() - started}
+    result["loaded_at_import"] = [m for m in HEAVY_MODULES if m in sys.modules]
+
+    from app.core.registry import registry
+    from app.services import image_quality
+    from bench.fakes import DEFAULT_PROFILE, build_latencies, install_fakes
+
+    if warm:
+        started = time.perf_counter()
+        result["warm_up"] = registry.warm_up()
+        result["warm_up_s"] = time.perf_counter() - started
+    install_fakes(build_latencies({service: {"latency": "fixed:0", "error_rate": 0.0} for service in DEFAULT_PROFILE}))
+
+    photos = []
+    for name in ("photo0.jpg", "photo1.jpg"):
+        with open(os.path.join(fixtures_dir, name), "rb") as f:
+            photos.append(f.read())
+    with open(os.path.join(fixtures_dir, "voice.wav"), "rb") as f:
+        audio = f.read()
+
+    try:
+        result.update(asyncio.run(_first_requests(app.main.app, photos, audio)))
+    finally:
+        image_quality.shutdown_pool()
+    print(json.dumps(result))
+
+
+# ---------------------------------------------------------
+# Parent
+# ---------------------------------------------------------
+def write_fixtures(directory):
+    # Built here, not in the child, so the child's first request still pays for numpy/cv2
+    from bench.fixtures import browser_recording, synthetic_photo
+
+    for i in range(2):
+        with open(os.path.join(directory, f"photo{i}.jpg"), "wb") as f:
+            f.write(synthetic_photo(i, 2000, 1500))
+    with open(os.path.join(directory, "voice.wav"), "wb") as f:
+        f.write(browser_recording())
+
+
+def child_env(directory, run):
+    env = dict(os.environ)
+    env.update({
+        "CACHE_DB_PATH": os.path.join(directory, f"cache-{run}.sqlite3"),
+        "AZURE_ENDPOINT": env.get("AZURE_ENDPOINT") or "https://bench.invalid/",
+        "AZURE_KEY": env.get("AZURE_KEY") or "bench-fake-key",
+        "GROQ_API_KEY": env.get("GROQ_API_KEY") or "bench-fake-key",
+    })
+    for name in ("MARKET_CACHE_ENABLED", "LLM_CACHE_ENABLED", "VISION_CACHE_ENABLED", "PRICE_INDEX_ENABLED"):
+        env[name] = "false"
+    return env
+
+
+def run_mode(mode, repeat, directory):
+    runs = []
+    for run in range(repeat):
+        cmd = [sys.executable, "-m", "bench.startup", "--child", directory]
+        if mode == "warm":
+            cmd.append("--warm")
+        proc = subprocess.run(cmd, env=child_env(directory, f"{mode}{run}"), capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise SystemExit(f"❌ {mode} run {run + 1} failed:\n{proc.stderr[-2000:]}")
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        print(f"✅ {mode} run {run + 1}/{repeat}: import {runs[-1]['import_s']:.3f}s", file=sys.stderr)
+    return runs
+
+
+def summarize(runs):
+    summary = {}
+    for column in COLUMNS:
+        values = [run[column] for run in runs if column in run]
+        if values:
+            summary[column] = {"median": round(statistics.median(values), 4), "min": round(min(values), 4)}
+    summary["loaded_at_import"] = sorted({m for run in runs for m in run["loaded_at_import"]})
+    return summary
+
+
+def print_table(summaries):
+    print(f"{'mode':<6}" + "".join(f"{c[:-2]:>18}" for c in COLUMNS))
+    print("-" * (6 + 18 * len(COLUMNS)))
+    for mode, summary in summaries.items():
+        cells = [f"{summary[c]['median'] * 1000:.0f} ms" if c in summary else "-" for c in COLUMNS]
+        print(f"{mode:<6}" + "".join(f"{cell:>18}" for cell in cells))
+    print("\n(median of each column; first_* requests run against zero-latency fakes)")
+    for mode, summary in summaries.items():
+        print(f"{mode}: heavy modules loaded by `import app.main`: {', '.join(summary['loaded_at_import']) or 'none'}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import time and first-request latency.")
+    parser.add_argument("--mode", choices=["lazy", "warm", "both"], default="both")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes per mode")
+    parser.add_argument("--json", help="write every run and the summary to this file")
+    parser.add_argument("--child", metavar="FIXTURES_DIR", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(args.child, args.warm)
+        return
+
+    modes = ["lazy", "warm"] if args.mode == "both" else [args.mode]
+    with tempfile.TemporaryDirectory(prefix="setu-startup-") as directory:
+        write_fixtures(directory)
+        runs = {mode: run_mode(mode, args.repeat, directory) for mode in modes}
+
+    summaries = {mode: summarize(mode_runs) for mode, mode_runs in runs.items()}
+    print()
+    print_table(summaries)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "summary": summaries, "runs": runs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
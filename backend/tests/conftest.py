@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Settings are read at import time: point the shared SQLite file somewhere
+# disposable before any app module is imported.
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="setu-tests-"), "cache.sqlite3"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
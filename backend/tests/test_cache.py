@@ -0,0 +1,129 @@
+import time
+
+from app.core.cache import LRUCache, PersistentCache, TieredCache
+
+
+def make_cache(tmp_path, **kwargs):
+    kwargs.setdefault("ttl", 60)
+    return PersistentCache("test", str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def age_entry(cache, key, seconds):
+    conn = cache._conn()
+    with conn:
+        conn.execute(
+            "UPDATE cache SET created_at = created_at - ? WHERE namespace = ? AND key = ?",
+            (seconds, cache.namespace, key),
+        )
+
+
+def test_persistent_cache_round_trip(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("k", {"min": 1, "max": 2})
+    assert cache.get("k") == ({"min": 1, "max": 2}, "fresh")
+    assert cache.get("missing") == (None, None)
+
+
+def test_persistent_cache_stale_window(tmp_path):
+    cache = make_cache(tmp_path, ttl=10, stale_ttl=100)
+    cache.set("k", 1)
+
+    age_entry(cache, "k", 50)
+    assert cache.get("k") == (1, "stale")
+
+    age_entry(cache, "k", 100)
+    assert cache.get("k") == (None, None)
+    assert cache.get_stats()["stale_hits"] == 1
+
+
+def test_persistent_cache_evicts_oldest_beyond_max_entries(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    for i, key in enumerate(("a", "b", "c")):
+        cache.set(key, i)
+        age_entry(cache, key, 10 - i)  # distinct created_at, oldest first
+
+    assert cache.get("a") == (None, None)
+    assert cache.get("c") == (2, "fresh")
+    assert cache.size() == 2
+
+
+def test_namespaces_are_independent(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = PersistentCache("first", path, ttl=60, max_entries=1)
+    second = PersistentCache("second", path, ttl=60, max_entries=1)
+    first.set("k", "one")
+    second.set("k", "two")
+    second.set("other", "three")
+
+    assert first.get("k") == ("one", "fresh")
+    assert second.get("k") == (None, None)
+
+
+def test_shared_file_is_visible_across_instances(tmp_path):
+    make_cache(tmp_path).set("k", [1, 2])
+    assert make_cache(tmp_path).get("k") == ([1, 2], "fresh")
+
+
+
+def test_get_with_age(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.set("k", 1)
+    age_entry(cache, "k", 5)
+    value, state, age = cache.get_with_age("k")
+    assert (value, state) == (1, "fresh")
+    assert 5 <= age < 6
+    assert cache.get_with_age("missing") == (None, None, None)
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1
+    assert lru.get_stats()["evictions"] == 1
+
+
+def test_lru_entry_ttl():
+    lru = LRUCache()
+    lru.set("k", 1, ttl=-1)
+    lru.set("forever", 2)
+    assert lru.get("k") is None
+    assert lru.get("forever") == 2
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    disk = make_cache(tmp_path)
+    disk.set("k", {"tags": ["saree"]})
+    tiered = TieredCache(LRUCache(), disk)
+
+    assert tiered.get("k") == {"tags": ["saree"]}
+    assert tiered.memory.get("k") == {"tags": ["saree"]}
+
+
+def test_tiered_cache_promoted_entry_keeps_disk_expiry(tmp_path):
+    disk = make_cache(tmp_path, ttl=60)
+    disk.set("k", 1)
+    age_entry(disk, "k", 50)
+    tiered = TieredCache(LRUCache(), disk)
+
+    assert tiered.get("k") == 1
+    _, expires_at = tiered.memory._data["k"]
+    assert expires_at - time.time() <= 10
+
+
+def test_tiered_cache_writes_use_disk_ttl(tmp_path):
+    tiered = TieredCache(LRUCache(), make_cache(tmp_path, ttl=60))
+    tiered.set("k", 1)
+    _, expires_at = tiered.memory._data["k"]
+    assert 0 < expires_at - time.time() <= 60
+    assert tiered.persistent.get("k") == (1, "fresh")
+
+
+def test_tiered_cache_ignores_stale_disk_entries(tmp_path):
+    disk = make_cache(tmp_path, ttl=10, stale_ttl=100)
+    disk.set("k", 1)
+    age_entry(disk, "k", 50)
+    assert TieredCache(LRUCache(), disk).get("k") is None
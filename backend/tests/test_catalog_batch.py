@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services.catalog_batch import CatalogBatches, ManifestError, batch_store, parse_manifest
+
+CSV = (
+    "SKU,Product Name,Fabric,Notes,Price,Images,Exclude\n"
+    "S-1,Banarasi Silk Saree,silk,zari border,\"₹1,499\",front.jpg|back.jpg,shoes;blouse\n"
+    ",Brass Diya,,,,,\n"
+)
+
+
+def test_csv_with_aliased_headers():
+    first, second = parse_manifest(CSV.encode("utf-8"), "catalog.csv")
+    assert first == {
+        "index": 0,
+        "sku": "S-1",
+        "name": "Banarasi Silk Saree",
+        "material": "silk",
+        "features": "zari border",
+        "expected_price": 1499,
+        "images": ["front.jpg", "back.jpg"],
+        "exclusions": ["shoes", "blouse"],
+    }
+    # Missing SKU falls back to the 1-based row number
+    assert second["sku"] == "2"
+    assert second["expected_price"] == 0
+    assert second["images"] == []
+
+
+def test_csv_with_utf8_bom():
+    rows = parse_manifest(("﻿" + CSV).encode("utf-8"))
+    assert rows[0]["sku"] == "S-1"
+
+
+@pytest.mark.parametrize("payload", [
+    [{"sku": "A", "name": "Kurta", "images": ["a.jpg"], "price": 799}],
+    {"items": [{"sku": "A", "name": "Kurta", "images": ["a.jpg"], "price": 799}]},
+])
+def test_json_list_or_items(payload):
+    (row,) = parse_manifest(json.dumps(payload).encode("utf-8"), "catalog.json")
+    assert (row["sku"], row["name"], row["images"], row["expected_price"]) == ("A", "Kurta", ["a.jpg"], 799)
+
+
+def test_row_needs_a_name_or_an_image():
+    with pytest.raises(ManifestError, match="Row 1"):
+        parse_manifest(b"sku,material\nX,silk\n")
+
+
+@pytest.mark.parametrize("raw, message", [
+    (b"", "no rows"),
+    (b"sku,name\n", "no rows"),
+    (b"[1, 2]", "list of objects"),
+    (b"{not json", "Invalid JSON"),
+    ("sku,name\nA,Sári\n".encode("utf-16"), "UTF-8"),
+])
+def test_bad_manifests(raw, message):
+    with pytest.raises(ManifestError, match=message):
+        parse_manifest(raw)
+
+
+def test_row_limit(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_ROWS", 2)
+    with pytest.raises(ManifestError, match="At most 2"):
+        parse_manifest(b"name\na\nb\nc\n")
+
+
+# ---------------------------------------------------------
+# Running a batch
+# ---------------------------------------------------------
+def run_batch(batches, batch_id, process_row):
+    async def collect():
+        return [event async for event in batches.run(batch_id, process_row)]
+    return asyncio.run(asyncio.wait_for(collect(), timeout=5))
+
+
+def test_resume_replays_successes_and_retries_failures():
+    batches = CatalogBatches(concurrency=2)
+    batch_id = batches.create(parse_manifest(b"name\nsaree\nkurta\ndiya\n"))
+
+    async def flaky(row):
+        if row["name"] == "kurta":
+            raise RuntimeError("groq down")
+        return {"name": row["name"]}
+
+    events = run_batch(batches, batch_id, flaky)
+    assert events[-1]["data"]["done"] == 2 and events[-1]["data"]["failed"] == 1
+
+    async def ok(row):
+        return {"name": row["name"]}
+
+    events = run_batch(batches, batch_id, ok)
+    items = [e["data"] for e in events if e["event"] == "item"]
+    assert sorted(item["sku"] for item in items if item.get("replayed")) == ["1", "3"]
+    assert [item["sku"] for item in items if not item.get("replayed")] == ["2"]
+    assert batches.status(batch_id)["done"] == 3
+
+
+def test_row_results_cannot_evict_manifests(monkeypatch):
+    monkeypatch.setattr(batch_store, "max_entries", 2)
+    batches = CatalogBatches(concurrency=4)
+    first = batches.create(parse_manifest(b"name\na\n"))
+    second = batches.create(parse_manifest(b"name\na\nb\nc\nd\n"))
+
+    async def ok(row):
+        return {}
+
+    run_batch(batches, second, ok)
+    assert batches.load(first) is not None
+
+
+def test_worker_dying_with_base_exception_fails_the_stream():
+    class Stop(BaseException):
+        pass
+
+    batches = CatalogBatches(concurrency=2)
+    batch_id = batches.create(parse_manifest(b"name\na\nb\nc\n"))
+
+    async def dies(row):
+        if row["name"] == "b":
+            raise Stop()
+        return {}
+
+    with pytest.raises(RuntimeError, match="workers stopped early"):
+        run_batch(batches, batch_id, dies)
+    assert not batches.is_running(batch_id)
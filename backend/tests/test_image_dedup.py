@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from app.services.image_dedup import dhash, hamming, match_representative
+
+
+def gradient(width=320, height=240, flip=False):
+    row = np.linspace(0, 255, width)
+    if flip:
+        row = row[::-1]
+    return np.tile(row, (height, 1)).astype(np.uint8)
+
+
+def test_dhash_is_a_64_bit_int():
+    value = dhash(gradient())
+    assert isinstance(value, int)
+    assert 0 <= value < 2 ** 64
+
+
+def test_near_duplicates_hash_close():
+    rng = np.random.default_rng(0)
+    base = gradient()
+    noisy = np.clip(base + rng.normal(0, 3, base.shape), 0, 255).astype(np.uint8)
+    assert hamming(dhash(base), dhash(noisy)) <= 6
+
+
+def test_different_images_hash_far_apart():
+    assert hamming(dhash(gradient()), dhash(gradient(flip=True))) > 32
+
+
+def test_hamming():
+    assert hamming(0b1011, 0b1011) == 0
+    assert hamming(0b1011, 0b0010) == 2
+
+
+def test_match_representative_returns_first_close_enough():
+    representatives = [(0, 0b1111), (3, 0b0000)]
+    assert match_representative(0b0111, representatives, threshold=1) == 0
+    assert match_representative(0b0001, representatives, threshold=1) == 3
+    assert match_representative(0b0011, representatives, threshold=1) is None
+
+
+@pytest.mark.parametrize("value, threshold", [(None, 6), (0b1111, -1)])
+def test_match_representative_disabled(value, threshold):
+    assert match_representative(value, [(0, 0b1111)], threshold) is None
@@ -0,0 +1,58 @@
+from app.services.llm_service import PRICE_PLACEHOLDER, _split_fused, fill_price_placeholder
+
+LISTINGS = {
+    "amazon": {"title": "Banarasi Silk Saree", "features": ["Pure silk", f"Only {PRICE_PLACEHOLDER}"]},
+    "instagram": f"New drop ✨ {PRICE_PLACEHOLDER}",
+    "whatsapp": "Hello! Available now.",
+}
+
+
+def fused(**overrides):
+    data = {
+        "pricing": {"recommended_price": 1450, "strategy": "Festive demand."},
+        "listings": LISTINGS,
+        "tips": ["Shoot near a window.", "Show the zari border up close."],
+    }
+    data.update(overrides)
+    return data
+
+
+def test_valid_response_keeps_every_section():
+    bundle = _split_fused(fused())
+    assert bundle["pricing"] == {"recommended_price": 1450, "strategy": "Festive demand."}
+    assert bundle["listings"] == LISTINGS
+    assert bundle["tips"] == ["Shoot near a window.", "Show the zari border up close."]
+
+
+def test_price_is_coerced_to_int():
+    bundle = _split_fused(fused(pricing={"recommended_price": "1299.0", "strategy": "Round number."}))
+    assert bundle["pricing"]["recommended_price"] == 1299
+
+
+def test_invalid_sections_fall_back_independently():
+    bundle = _split_fused(fused(
+        pricing={"recommended_price": -5, "strategy": "?"},
+        tips="Shoot near a window.",
+    ))
+    assert bundle["pricing"] is None
+    assert bundle["tips"] is None
+    assert bundle["listings"] == LISTINGS
+
+
+def test_listings_need_every_channel():
+    broken = {**LISTINGS, "amazon": {"title": "Saree", "features": []}}
+    assert _split_fused(fused(listings=broken))["listings"] is None
+    missing = {key: value for key, value in LISTINGS.items() if key != "whatsapp"}
+    assert _split_fused(fused(listings=missing))["listings"] is None
+
+
+def test_unusable_response_fails_every_section():
+    for data in (None, [], "not json", {}):
+        assert _split_fused(data) == {"pricing": None, "listings": None, "tips": None}
+
+
+def test_fill_price_placeholder_reaches_nested_strings():
+    filled = fill_price_placeholder(LISTINGS, "₹ 1449")
+    assert filled["amazon"]["features"][1] == "Only ₹ 1449"
+    assert filled["instagram"] == "New drop ✨ ₹ 1449"
+    assert PRICE_PLACEHOLDER not in str(filled)
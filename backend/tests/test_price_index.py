@@ -0,0 +1,71 @@
+import pytest
+
+from app.services.price_index import PriceIndex
+
+
+@pytest.fixture(params=["fts5", "like"])
+def index(request, tmp_path):
+    index = PriceIndex(str(tmp_path / "index.sqlite3"))
+    index.size()  # first connection creates the schema
+    if request.param == "like":
+        index.fts = False
+    elif not index.fts:
+        pytest.skip("SQLite built without FTS5")
+    return index
+
+
+def record(index, category, material, query, titles, price=1000, site="amazon.in"):
+    index.record(category, material, site, query, [(title, site, price + i) for i, title in enumerate(titles)])
+
+
+def test_lookup_matches_category_and_material(index):
+    record(index, "saree", "silk", "silk banarasi saree", ["Banarasi silk saree", "Red silk saree"])
+    record(index, "saree", "cotton", "cotton saree", ["Cotton saree"])
+
+    assert sorted(p for p, _ in index.lookup("saree", "Silk", "Banarasi Saree")) == [1000, 1001]
+    assert index.lookup("saree", "linen", "Saree") == []
+
+
+def test_lookup_requires_the_main_object(index):
+    # Both end in "set", so they share a category; the product words tell them apart
+    record(index, "set", "cotton", "cotton Cotton Kurta Set", ["Kurta set with dupatta"], price=1200)
+    record(index, "set", "cotton", "cotton Cotton Co-ord Set", ["Co-ord set, 2 piece"], price=2500)
+
+    assert [p for p, _ in index.lookup("set", "cotton", "Cotton Kurta Set")] == [1200]
+    assert [p for p, _ in index.lookup("set", "cotton", "Cotton Co-ord Set")] == [2500]
+
+
+def test_keywords_narrow_the_match(index):
+    record(index, "saree", "silk", "silk saree", ["Zari border silk saree", "Plain silk saree"])
+
+    matches = index.lookup("saree", "silk", "Saree", keywords=["zari border", "handloom"])
+    assert [p for p, _ in matches] == [1000]
+
+
+def test_exclusions_drop_titles(index):
+    record(index, "saree", "silk", "silk saree", ["Silk saree", "Silk saree with blouse and shoes"])
+
+    matches = index.lookup("saree", "silk", "Saree", exclusions=["shoes"])
+    assert [p for p, _ in matches] == [1000]
+
+
+def test_old_observations_are_ignored(index):
+    record(index, "saree", "silk", "silk saree", ["Silk saree"])
+    assert index.lookup("saree", "silk", "Saree", max_age=-1) == []
+
+
+def test_same_listing_under_another_category_keeps_both(index):
+    record(index, "kurta", "cotton", "cotton kurta", ["Cotton kurta set"])
+    record(index, "set", "cotton", "cotton kurta set", ["Cotton kurta set"])
+
+    assert index.lookup("kurta", "cotton", "Kurta") == [(1000, "amazon.in")]
+    assert index.lookup("set", "cotton", "Kurta Set") == [(1000, "amazon.in")]
+
+
+def test_repeat_observation_only_refreshes(index):
+    record(index, "saree", "silk", "silk saree", ["Silk saree"])
+    record(index, "saree", "silk", "banarasi silk saree", ["Silk saree"])
+
+    assert index.size() == 1
+    # The second query is remembered, so it can match later lookups too
+    assert len(index.lookup("saree", "silk", "Saree", keywords=["banarasi"])) == 1
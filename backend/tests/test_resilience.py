@@ -0,0 +1,137 @@
+import pytest
+
+from app.core import resilience
+from app.core.resilience import AdaptiveTokenBucket, CircuitBreaker, backoff_delay
+
+
+class Clock:
+    """Stands in for time.monotonic() so rates and cooldowns are deterministic."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+
+def make_bucket(**kwargs):
+    options = {"rate": 4.0, "min_rate": 0.5, "max_rate": 10.0, "burst": 2}
+    options.update(kwargs)
+    return AdaptiveTokenBucket("test", **options)
+
+
+# ---------------------------------------------------------
+# AdaptiveTokenBucket
+# ---------------------------------------------------------
+def test_bucket_serves_burst_then_rejects_beyond_timeout(clock):
+    bucket = make_bucket()
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    # The third token is 1/rate away
+    assert not bucket.acquire(timeout=0.1)
+    assert bucket.get_state()["rejected"] == 1
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = make_bucket()
+    bucket.acquire(timeout=0)
+    bucket.acquire(timeout=0)
+    clock.now += 0.25  # one token at 4/s
+    assert bucket.acquire(timeout=0)
+
+
+def test_success_increases_rate_additively_up_to_max(clock):
+    bucket = make_bucket(rate=9.95, increase=0.1)
+    bucket.on_success()
+    assert bucket.rate == 10.0
+    bucket.on_success()
+    assert bucket.rate == 10.0
+
+
+def test_throttle_halves_rate_once_per_window(clock):
+    bucket = make_bucket(rate=4.0, decrease_window=2.0)
+    bucket.on_throttle()
+    bucket.on_throttle()  # same burst of failures
+    assert bucket.rate == 2.0
+
+    clock.now += 2.0
+    bucket.on_throttle()
+    assert bucket.rate == 1.0
+    assert bucket.get_state()["throttled"] == 3
+
+
+def test_throttle_never_goes_below_min_rate(clock):
+    bucket = make_bucket(rate=0.6, min_rate=0.5)
+    bucket.on_throttle()
+    assert bucket.rate == 0.5
+
+
+# ---------------------------------------------------------
+# backoff_delay
+# ---------------------------------------------------------
+@pytest.mark.parametrize("attempt, ceiling", [(0, 0.5), (1, 1.0), (2, 2.0), (10, 8.0)])
+def test_backoff_is_jittered_below_the_capped_exponential(attempt, ceiling):
+    delays = [backoff_delay(attempt, base=0.5, cap=8.0) for _ in range(200)]
+    assert all(0 <= delay <= ceiling for delay in delays)
+    assert len(set(delays)) > 1
+
+
+# ---------------------------------------------------------
+# CircuitBreaker
+# ---------------------------------------------------------
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("site", failure_threshold=3, cooldown=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.get_state()["skipped"] == 1
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker("site", failure_threshold=2, cooldown=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert not breaker.is_open()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker("site", failure_threshold=1, cooldown=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.get_state()["state"] == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker("site", failure_threshold=3, cooldown=60)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.get_state()["state"] == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_release_frees_an_unused_probe(clock):
+    breaker = CircuitBreaker("site", failure_threshold=1, cooldown=60)
+    breaker.record_failure()
+    clock.now += 60
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return {"avg": 1000}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(flight.do, "saree", work) for _ in range(5)]
+        time.sleep(0.1)  # let every caller join the first one
+        release.set()
+        results = [f.result(timeout=2) for f in futures]
+
+    assert len(calls) == 1
+    assert all(result == {"avg": 1000} for result in results)
+    assert flight.get_stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_errors_are_shared_and_not_remembered():
+    flight = SingleFlight("test")
+
+    def fail():
+        raise RuntimeError("ddgs down")
+
+    with pytest.raises(RuntimeError, match="ddgs down"):
+        flight.do("k", fail)
+    # The next call runs again instead of replaying the failure
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.get_stats()["leaders"] == 2
+
+
+def test_async_callers_share_one_call():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "listing"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("k", work) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["listing"] * 4
+    assert len(calls) == 1
+    assert flight.get_stats()["in_flight"] == 0
+
+
+def test_async_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.ado("k", work))
+        second = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from app.services.voice_stream import PauseSegmenter
+
+RATE = 16000
+
+
+def recording(*parts, noise=0.002, seed=0):
+    """parts: ("speech" | "pause", seconds) in order, over a quiet noise bed."""
+    rng = np.random.default_rng(seed)
+    pieces = []
+    for kind, seconds in parts:
+        t = np.arange(int(seconds * RATE)) / RATE
+        piece = noise * rng.standard_normal(len(t))
+        if kind == "speech":
+            # Voiced tone with a syllable-rate envelope
+            piece += 0.3 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+        pieces.append(piece)
+    return np.concatenate(pieces).astype(np.float32)
+
+
+def segment(samples, chunk=1600, **kwargs):
+    kwargs.setdefault("pause_ms", 700)
+    kwargs.setdefault("max_seconds", 15)
+    kwargs.setdefault("min_speech_ms", 200)
+    segmenter = PauseSegmenter(RATE, **kwargs)
+    segments = []
+    for i in range(0, len(samples), chunk):
+        segments += segmenter.feed(samples[i:i + chunk])
+    tail = segmenter.flush()
+    return segments + ([tail] if tail else [])
+
+
+def test_pause_splits_utterances():
+    audio = recording(("pause", 1), ("speech", 2), ("pause", 1.5), ("speech", 1.5), ("pause", 1))
+    segments = segment(audio)
+    assert len(segments) == 2
+    (first_start, first), (second_start, second) = segments
+    # Start times include AUDIO_VAD_PAD_MS of pre-roll
+    assert first_start == pytest.approx(1.0, abs=0.3)
+    assert second_start == pytest.approx(4.5, abs=0.3)
+    assert len(first) / RATE == pytest.approx(2.0, abs=0.8)
+
+
+def test_short_gap_does_not_split():
+    audio = recording(("pause", 1), ("speech", 1), ("pause", 0.3), ("speech", 1), ("pause", 1))
+    assert len(segment(audio)) == 1
+
+
+def test_speech_from_the_first_frame_is_detected():
+    audio = recording(("speech", 3), ("pause", 1.5))
+    segments = segment(audio)
+    assert len(segments) == 1
+    assert segments[0][0] == 0
+
+
+def test_long_speech_is_cut_at_max_seconds():
+    audio = recording(("speech", 7), ("pause", 1))
+    segments = segment(audio, max_seconds=3)
+    assert len(segments) >= 2
+    assert all(len(samples) / RATE <= 3.5 for _, samples in segments)
+
+
+def test_noise_alone_is_not_speech():
+    assert segment(recording(("pause", 5))) == []
+
+
+def test_blips_shorter_than_min_speech_are_dropped():
+    audio = recording(("pause", 1), ("speech", 0.06), ("pause", 1.5))
+    assert segment(audio) == []
+
+
+def test_chunking_does_not_change_the_result():
+    audio = recording(("pause", 1), ("speech", 2), ("pause", 1.5), ("speech", 1), ("pause", 1))
+    whole = segment(audio, chunk=len(audio))
+    odd = segment(audio, chunk=777)
+    assert [start for start, _ in whole] == [start for start, _ in odd]
+    assert [len(s) for _, s in whole] == [len(s) for _, s in odd]
+
+
+def test_flush_returns_utterance_in_progress():
+    segmenter = PauseSegmenter(RATE, pause_ms=700, max_seconds=15, min_speech_ms=200)
+    assert segmenter.feed(recording(("pause", 1), ("speech", 1))) == []
+    start, samples = segmenter.flush()
+    assert start == pytest.approx(1.0, abs=0.3)
+    assert len(samples) / RATE >= 1.0
@@ -2,30 +2,113 @@ import { useState, useRef } from 'react';
 import { Mic, Square, Loader2 } from 'lucide-react';
 import axios from 'axios';
 
+const API_URL = import.meta.env.VITE_API_URL;
+
+// Float32 samples from the Web Audio graph -> 16-bit PCM for /ws/voice
+const toPcm16 = (samples) => {
+  const pcm = new Int16Array(samples.length);
+  for (let i = 0; i < samples.length; i++) {
+    const s = Math.max(-1, Math.min(1, samples[i]));
+    pcm[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
+  }
+  return pcm.buffer;
+};
+
 const AudioRecorder = ({ onTranscriptionComplete }) => {
   const [recording, setRecording] = useState(false);
   const [processing, setProcessing] = useState(false);
+  const [liveText, setLiveText] = useState("");
   const mediaRecorderRef = useRef(null);
   const chunksRef = useRef([]);
+  const socketRef = useRef(null);
+  const audioContextRef = useRef(null);
+  const streamedRef = useRef(false);
+
+  // Live path: PCM goes out while the seller talks, text comes back per pause.
+  // The whole clip is still recorded so /analyze-voice can take over if the socket fails.
+  const startStreaming = (stream) => {
+    // Built here so a missing VITE_API_URL only breaks recording, not the page
+    const socket = new WebSocket(`${API_URL.replace(/^http/, 'ws')}/ws/voice`);
+    socket.binaryType = 'arraybuffer';
+    socketRef.current = socket;
+    streamedRef.current = false;
+
+    const audioContext = new AudioContext();
+    audioContextRef.current = audioContext;
+    const source = audioContext.createMediaStreamSource(stream);
+    const processor = audioContext.createScriptProcessor(4096, 1, 1);
+
+    processor.onaudioprocess = (e) => {
+      if (socket.readyState === WebSocket.OPEN) {
+        socket.send(toPcm16(e.inputBuffer.getChannelData(0)));
+      }
+    };
+
+    socket.onopen = () => {
+      socket.send(JSON.stringify({ type: 'start', sample_rate: audioContext.sampleRate }));
+      source.connect(processor);
+      processor.connect(audioContext.destination);
+    };
+
+    socket.onmessage = (e) => {
+      const message = JSON.parse(e.data);
+      if (message.type === 'partial') {
+        setLiveText(message.text_so_far);
+      } else if (message.type === 'final') {
+        setLiveText("");
+        if (message.text) {
+          streamedRef.current = true;
+          setProcessing(false);
+          onTranscriptionComplete(message.text);
+        } else if (!message.audio_seconds) {
+          streamedRef.current = true;
+          setProcessing(false);
+        }
+        // Audio but no live text: leave streamedRef unset so onclose / onstop upload the whole clip
+        socket.close();
+      }
+    };
+
+    socket.onerror = (err) => console.error("Live transcription unavailable", err);
+
+    // Dropped before the final text: fall back to uploading the clip
+    socket.onclose = () => {
+      if (!streamedRef.current && mediaRecorderRef.current?.state === 'inactive') uploadRecording();
+    };
+  };
+
+  const stopStreaming = () => {
+    if (audioContextRef.current) {
+      audioContextRef.current.close();
+      audioContextRef.current = null;
+    }
+    const socket = socketRef.current;
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'stop' }));
+    }
+  };
 
   const startRecording = async () => {
     try {
       const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
       mediaRecorderRef.current = new MediaRecorder(stream);
       chunksRef.current = [];
+      setLiveText("");
 
       mediaRecorderRef.current.ondataavailable = (e) => {
         if (e.data.size > 0) chunksRef.current.push(e.data);
       };
 
       mediaRecorderRef.current.onstop = async () => {
-        const audioBlob = new Blob(chunksRef.current, { type: 'audio/wav' });
-        handleUpload(audioBlob);
-        
         // Stop all tracks to turn off the red mic light
         stream.getTracks().forEach(track => track.stop());
+
+        // Socket never opened or already dropped: upload the whole clip instead
+        const socket = socketRef.current;
+        if (!streamedRef.current && (!socket || socket.readyState !== WebSocket.OPEN)) uploadRecording();
       };
 
+      startStreaming(stream);
       mediaRecorderRef.current.start();
       setRecording(true);
     } catch (err) {
@@ -36,20 +119,28 @@ const AudioRecorder = ({ onTranscriptionComplete }) => {
 
   const stopRecording = () => {
     if (mediaRecorderRef.current && recording) {
+      setProcessing(true);
+      stopStreaming();
       mediaRecorderRef.current.stop();
       setRecording(false);
     }
   };
 
+  const uploadRecording = () => {
+    streamedRef.current = true; // only once
+    const audioBlob = new Blob(chunksRef.current, { type: mediaRecorderRef.current.mimeType || 'audio/webm' });
+    handleUpload(audioBlob);
+  };
+
   const handleUpload = async (audioBlob) => {
     setProcessing(true);
     const formData = new FormData();
-    formData.append("file", audioBlob, "voice_note.wav");
+    const extension = audioBlob.type.includes('ogg') ? 'ogg' : audioBlob.type.includes('mp4') ? 'm4a' : 'webm';
+    formData.append("file", audioBlob, `voice_note.${extension}`);
 
     try {
-      const API_URL = import.meta.env.VITE_API_URL;
       const response = await axios.post(`${API_URL}/analyze-voice`, formData);
-      
+
       if (response.data.status === 'success') {
         // Pass the translated text back to the parent component
         onTranscriptionComplete(response.data.detected_text);
@@ -82,8 +173,11 @@ const AudioRecorder = ({ onTranscriptionComplete }) => {
           <Square size={16} fill="currentColor" /> Stop & Send
         </button>
       )}
+      {liveText && (
+        <span className="text-sm text-gray-600 italic truncate max-w-xs">{liveText}</span>
+      )}
     </div>
   );
 };
 
-export default AudioRecorder;
\ No newline at end of file
+export default AudioRecorder;